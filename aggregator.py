@@ -0,0 +1,226 @@
+"""複数の shogun-gui バックエンドを1つのビューにまとめる集約モード"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+import httpx
+
+# バックエンド1台あたりの応答待ちの上限（秒）
+BACKEND_TIMEOUT = 2.0
+
+# 応答待ちを打ち切った後も、問い合わせ自体を続ける上限（秒）。
+# 遅れて届いた結果は次回以降の応答に使う
+BACKEND_REQUEST_TIMEOUT = 30.0
+
+# この秒数以内に取得した結果はバックエンドに問い合わせずに使う
+BACKEND_CACHE_TTL = 1.0
+
+# 失敗・タイムアウトしたバックエンドへ再び問い合わせるまでの間隔（秒）。
+# その間は待たずに前回の結果を返し、遅いバックエンドが毎回の応答を遅らせないようにする
+BACKEND_RETRY_INTERVAL = 5.0
+
+# バックエンドごとに保持するキープアライブ接続数
+BACKEND_KEEPALIVE_CONNECTIONS = 4
+
+# 行に "backend" を付けて連結するダッシュボードのセクション
+DASHBOARD_SECTIONS = (
+    "action_required",
+    "in_progress",
+    "completed_today",
+    "completed_reports",
+    "skill_candidates",
+    "generated_skills",
+    "waiting",
+    "inquiries",
+)
+
+
+@dataclass
+class Backend:
+    """集約対象のリモートバックエンド"""
+    name: str
+    url: str
+    timeout: float = BACKEND_TIMEOUT
+
+
+@dataclass
+class CachedResponse:
+    """バックエンドの1エンドポイント分の最新の取得結果"""
+    data: Optional[Any] = None
+    etag: Optional[str] = None
+    fetched_at: float = 0.0
+    failed_at: float = 0.0
+    error: Optional[str] = None
+
+    def fail(self, error: str) -> None:
+        self.error, self.failed_at = error, time.monotonic()
+
+
+def _tag_row(row: Any, backend: str) -> dict:
+    if isinstance(row, dict):
+        return {**row, "backend": backend}
+    return {"text": row, "backend": backend}
+
+
+def parse_backends(spec: str, timeout: float = BACKEND_TIMEOUT) -> list[Backend]:
+    """"name=url,name=url" 形式（name= は省略可）のバックエンド指定を解釈する
+
+    Raises:
+        ValueError: URLが http(s) でない、または名前が重複している場合
+    """
+    backends = []
+    for index, item in enumerate(filter(None, (part.strip() for part in spec.split(","))), start=1):
+        name, sep, url = item.partition("=")
+        if not sep:
+            name, url = f"backend{index}", item
+        name, url = name.strip(), url.strip().rstrip("/")
+        if not url.startswith(("http://", "https://")):
+            raise ValueError(f"Invalid backend URL for {name}: {url}")
+        if any(backend.name == name for backend in backends):
+            raise ValueError(f"Duplicate backend name: {name}")
+        backends.append(Backend(name, url, timeout))
+    return backends
+
+
+class Aggregator:
+    """複数バックエンドへ同時に問い合わせ、結果をまとめる
+
+    接続は httpx.AsyncClient でバックエンドをまたいでプールする。
+    取得結果はバックエンド・パスごとにキャッシュし、TTL内なら問い合わせない。
+    TTLを過ぎたら前回の ETag で再検証する（変化がなければ 304 で本文を受け取らない）。
+    同じバックエンドへの同時の問い合わせは1本にまとめる。
+
+    各バックエンドの待ち時間は個別の timeout で打ち切るため、遅い・落ちている
+    バックエンドがあっても他のバックエンドの結果は揃う。打ち切られたバックエンドは
+    前回の結果を stale として返し、BACKEND_RETRY_INTERVAL の間は待たずにそれを返す。
+    """
+
+    def __init__(
+        self,
+        backends: Iterable[Backend],
+        api_key: Optional[str] = None,
+        cache_ttl: float = BACKEND_CACHE_TTL,
+    ):
+        self.backends = list(backends)
+        self.api_key = api_key
+        self.cache_ttl = cache_ttl
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: dict[tuple[str, str], CachedResponse] = {}
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            count = max(len(self.backends), 1)
+            self._client = httpx.AsyncClient(
+                headers={"X-API-Key": self.api_key} if self.api_key else None,
+                limits=httpx.Limits(
+                    max_connections=count * BACKEND_KEEPALIVE_CONNECTIONS * 2,
+                    max_keepalive_connections=count * BACKEND_KEEPALIVE_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, path: str) -> dict[str, CachedResponse]:
+        """全バックエンドの path を同時に取得する
+
+        Returns:
+            バックエンド名 → 取得結果（失敗・タイムアウト時は前回の data と error）
+        """
+        results = await asyncio.gather(*(self._fetch_one(backend, path) for backend in self.backends))
+        return {backend.name: result for backend, result in zip(self.backends, results)}
+
+    async def _fetch_one(self, backend: Backend, path: str) -> CachedResponse:
+        key = (backend.name, path)
+        cached = self._cache.setdefault(key, CachedResponse())
+        now = time.monotonic()
+        if cached.error is None and now - cached.fetched_at < self.cache_ttl:
+            return cached
+        if cached.error is not None and now - cached.failed_at < BACKEND_RETRY_INTERVAL:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._request(backend, path, cached))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            # 打ち切っても問い合わせ自体は続け、届いた結果は次回以降に使う
+            await asyncio.wait_for(asyncio.shield(task), backend.timeout)
+        except asyncio.TimeoutError:
+            cached.fail("Backend timed out")
+        return cached
+
+    async def _request(self, backend: Backend, path: str, cached: CachedResponse) -> None:
+        headers = {"If-None-Match": cached.etag} if cached.etag and cached.data is not None else {}
+        try:
+            response = await self._get_client().get(
+                backend.url + path,
+                headers=headers,
+                timeout=httpx.Timeout(max(BACKEND_REQUEST_TIMEOUT, backend.timeout), connect=backend.timeout),
+            )
+            if response.status_code == 304:
+                cached.fetched_at, cached.error = time.monotonic(), None
+                return
+            response.raise_for_status()
+            cached.data = response.json()
+        except httpx.TimeoutException:
+            cached.fail("Backend timed out")
+            return
+        except (httpx.HTTPError, ValueError) as e:
+            cached.fail(f"Backend request failed: {e}")
+            return
+        cached.etag = response.headers.get("etag")
+        cached.fetched_at, cached.error = time.monotonic(), None
+
+    def backend_states(self, results: dict[str, CachedResponse]) -> dict[str, dict]:
+        """レスポンスに含めるバックエンドごとの状態"""
+        now = time.monotonic()
+        states = {}
+        for backend in self.backends:
+            result = results[backend.name]
+            states[backend.name] = {
+                "url": backend.url,
+                "ok": result.error is None,
+                "stale": result.error is not None and result.data is not None,
+                "age": round(now - result.fetched_at, 3) if result.data is not None else None,
+                "error": result.error,
+            }
+        return states
+
+    async def dashboard(self) -> dict:
+        """全バックエンドの /api/dashboard を1つにまとめる
+
+        各セクションの行には取得元の "backend" を付けて連結する（waiting 等の文字列の行は
+        {"text": 行, "backend": 名前} にする）。last_updated はバックエンド名 → 値。
+        """
+        results = await self.fetch("/api/dashboard")
+        merged: dict[str, Any] = {section: [] for section in DASHBOARD_SECTIONS}
+        merged["last_updated"] = {}
+        for backend in self.backends:
+            data = results[backend.name].data
+            if not isinstance(data, dict) or "error" in data:
+                continue
+            merged["last_updated"][backend.name] = data.get("last_updated", "")
+            for section in DASHBOARD_SECTIONS:
+                merged[section].extend(_tag_row(row, backend.name) for row in data.get(section, []))
+        return {"backends": self.backend_states(results), "dashboard": merged}
+
+    async def ashigaru_status(self) -> dict:
+        """全バックエンドの足軽ステータスを1つにまとめる（各要素に "backend" を付ける）"""
+        results = await self.fetch("/api/pane/ashigaru/status")
+        statuses = []
+        for backend in self.backends:
+            data = results[backend.name].data
+            if not isinstance(data, dict):
+                continue
+            statuses.extend({**status, "backend": backend.name} for status in data.get("statuses", []))
+        return {"backends": self.backend_states(results), "statuses": statuses, "total": len(statuses)}
@@ -1,22 +1,369 @@
 """multi-agent-shogun-gui: Webダッシュボード"""
 import argparse
+import asyncio
+import logging
 import os
-import subprocess
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Optional
 
 import yaml
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from pydantic import BaseModel
 
-from parser import parse_dashboard
+import metrics
+from aggregator import BACKEND_TIMEOUT, Aggregator, parse_backends
+from archive import ARCHIVE_INTERVAL, ENTRY_KINDS, SEARCH_LIMIT, DashboardArchive, parse_time
+from command_queue import (
+    COMMAND_IDLE_TIMEOUT,
+    COMMAND_QUEUE_DEPTH,
+    COMMAND_QUEUE_LENGTH,
+    CommandDeliveryError,
+    CommandQueue,
+    CommandQueueFull,
+)
+from encoding import COMPRESS_MIN_SIZE, ResponseEncoder, dumps, negotiate, variant_etag
+from inbox import Inbox
+from panes import (
+    SAMPLER_IDLE_TIMEOUT,
+    TMUX_COMMAND_TIMEOUT,
+    TMUX_NOT_FOUND_ERROR,
+    TMUX_TIMEOUT_ERROR,
+    PaneInfoCache,
+    PaneLog,
+    PaneSample,
+    PaneSampler,
+    send_keys,
+    set_backend,
+    set_control,
+)
+from parser import DashboardCache, make_etag
+from queue_index import QueueIndex
+from simulator import SimulatedBackend, parse_simulation_spec
+from static_assets import IMMUTABLE_CACHE_CONTROL, StaticAsset, StaticAssets
+from status_history import DEFAULT_HISTORY_WINDOWS, STATUS_HISTORY_CAPACITY, StatusHistory
+from stream import StreamHub
+from tmux_control import TmuxControl
+from topology import Topology, default_topology, discover_topology, load_topology
+
+logger = logging.getLogger(__name__)
 
 
 class CommandRequest(BaseModel):
     """将軍への指示リクエスト"""
     command: str
 
-app = FastAPI(title="multi-agent-shogun-gui")
+
+# 将軍・家老・足軽とペインの対応（起動時に load_configured_topology の結果で差し替える）
+topology = default_topology()
+
+# ペインID・PID・@agent_cli のキャッシュ（サンプラーとCLI種別の取得で共有）
+pane_info = PaneInfoCache()
+
+# ペインスナップショットのサンプリング対象（ターゲット → capture-pane 開始行）
+pane_sampler = PaneSampler(topology.capture_targets(), pane_info=pane_info)
+
+# ペインの構成が変わったことを示す tmux -C の通知（pane_info を破棄する）
+PANE_LAYOUT_NOTIFICATIONS = {
+    "%layout-change",
+    "%window-add",
+    "%window-close",
+    "%window-renamed",
+    "%unlinked-window-close",
+    "%sessions-changed",
+}
+
+
+def on_tmux_notification(kind: str, rest: str) -> None:
+    """tmux -C の通知からペイン情報キャッシュの鮮度を保つ"""
+    if kind in PANE_LAYOUT_NOTIFICATIONS:
+        pane_info.invalidate()
+    elif kind == "%subscription-changed":
+        # "pane_info $1 @2 0 %3 : %3 1234 claude"
+        name, _, value = rest.partition(" : ")
+        if name.split(" ", 1)[0] == "pane_info":
+            pane_id, pane_pid, agent_cli = (value.split(" ", 2) + ["", ""])[:3]
+            pane_info.observe(pane_id, pane_pid, agent_cli)
+
+# 監視対象のセッションに常駐する tmux -C クライアント（%output でサンプラーに変化を通知）
+tmux_control = TmuxControl(
+    topology.sessions(),
+    on_output=pane_sampler.mark_pane_dirty,
+    on_connect=pane_sampler.invalidate,
+    on_notification=on_tmux_notification,
+    # セッション内の全ペインの (ペインID, PID, @agent_cli) が変わるたびに通知させる
+    subscriptions={"pane_info": ("%*", "#{pane_id} #{pane_pid} #{@agent_cli}")},
+)
+
+# フィルタ済みのペイン出力（行番号付き。差分取得用）
+pane_logs = {target: PaneLog() for target in pane_sampler.targets}
+
+
+async def load_configured_topology() -> Optional[Topology]:
+    """環境変数 SHOGUN_GUI_TOPOLOGY の構成を読み込む
+
+    YAMLファイルのパスならその内容、"tmux" なら tmux のペインの @agent_id から
+    探した構成を返す。未設定、または tmux から見つからなければ None（標準構成のまま）。
+    """
+    source = os.environ.get("SHOGUN_GUI_TOPOLOGY", "")
+    if source == "tmux":
+        return await discover_topology()
+    if source:
+        return load_topology(source)
+    return None
+
+
+async def apply_topology(new_topology: Topology) -> None:
+    """構成を差し替え、サンプラーと tmux -C クライアントの対象を合わせる"""
+    global topology
+    topology = new_topology
+    pane_sampler.set_targets(topology.capture_targets())
+    _pane_bodies.clear()
+    for target in pane_sampler.targets:
+        pane_logs.setdefault(target, PaneLog())
+    if simulated_backend is not None:
+        simulated_backend.set_targets(pane_sampler.targets)
+    await tmux_control.set_sessions(topology.sessions())
+
+# /api/stream の既定の購読トピック（足軽の出力は ashigaru{N} を個別に指定する）
+DEFAULT_STREAM_TOPICS = ("dashboard", "shogun", "karo", "ashigaru_status")
+
+stream_hub = StreamHub()
+
+
+def get_status_history_capacity() -> int:
+    """環境変数からステータス履歴の保持件数を取得（未設定・0 なら記録しない）
+
+    記録する間は閲覧者がいなくても tmux のサンプリングを続けるため、既定では記録しない。
+    """
+    try:
+        return max(int(os.environ.get("SHOGUN_GUI_STATUS_HISTORY", 0)), 0)
+    except ValueError:
+        return 0
+
+
+# 家老・足軽のステータス遷移の履歴（記録しない設定なら None）
+status_history: Optional[StatusHistory] = None
+
+
+def get_archive_path() -> str:
+    """環境変数から履歴アーカイブの SQLite のパスを取得（未設定・空なら記録しない）"""
+    return os.environ.get("SHOGUN_GUI_ARCHIVE", "")
+
+
+# dashboard.md の履歴のアーカイブ（記録しない設定なら None）
+dashboard_archive: Optional[DashboardArchive] = None
+
+
+async def archive_dashboard_loop(archive: DashboardArchive) -> None:
+    """ARCHIVE_INTERVAL ごとに dashboard.md を確認し、パース結果が変わっていれば記録する
+
+    記録に失敗した場合（DBのロック・ディスクの空き不足など）は次の周期で再試行する。
+    同じエラーが続く間はログを1回だけ出す。
+    """
+    archived_version = None
+    last_error = None
+    while True:
+        cache = get_dashboard_cache()
+        if cache is not None:
+            try:
+                data, _ = cache.get()
+                if cache.version != archived_version:
+                    # SQLite への書き込みはイベントループを止めないようスレッドで行う
+                    await asyncio.to_thread(archive.record, data)
+                    archived_version = cache.version
+                last_error = None
+            except Exception as e:
+                if repr(e) != last_error:
+                    logger.exception("Failed to archive dashboard.md; retrying every %ss", ARCHIVE_INTERVAL)
+                    last_error = repr(e)
+        await asyncio.sleep(ARCHIVE_INTERVAL)
+
+
+def get_compress_min_size() -> int:
+    """環境変数からレスポンスを圧縮する最小の大きさ（バイト。0 なら圧縮しない）を取得"""
+    try:
+        return max(int(os.environ.get("SHOGUN_GUI_COMPRESS_MIN_SIZE", COMPRESS_MIN_SIZE)), 0)
+    except ValueError:
+        return COMPRESS_MIN_SIZE
+
+
+# JSONレスポンスの gzip / brotli 圧縮（圧縮した本文は ETag ごとに使い回す）
+response_encoder = ResponseEncoder()
+
+
+def get_command_queue_depth() -> int:
+    """環境変数からペインごとの未送信の指示の上限を取得"""
+    try:
+        return max(int(os.environ.get("SHOGUN_GUI_COMMAND_QUEUE_DEPTH", COMMAND_QUEUE_DEPTH)), 1)
+    except ValueError:
+        return COMMAND_QUEUE_DEPTH
+
+
+def get_command_idle_timeout() -> float:
+    """環境変数から指示の送信前に将軍が idle になるのを待つ上限（秒）を取得"""
+    try:
+        return max(float(os.environ.get("SHOGUN_GUI_COMMAND_IDLE_TIMEOUT", COMMAND_IDLE_TIMEOUT)), 0.0)
+    except ValueError:
+        return COMMAND_IDLE_TIMEOUT
+
+
+def get_sample_interval() -> float:
+    """環境変数からペインのサンプリング間隔（秒）を取得"""
+    try:
+        return max(float(os.environ.get("SHOGUN_GUI_SAMPLE_INTERVAL", "1.0")), 0.1)
+    except ValueError:
+        return 1.0
+
+
+def create_aggregator() -> Optional[Aggregator]:
+    """環境変数 SHOGUN_GUI_BACKENDS に集約対象のバックエンドがあれば集約器を作る
+
+    SHOGUN_GUI_BACKEND_TIMEOUT でバックエンドごとの応答待ち（秒）、
+    SHOGUN_GUI_BACKEND_API_KEY でバックエンドへ送るAPIキーを指定する。
+    """
+    spec = os.environ.get("SHOGUN_GUI_BACKENDS", "")
+    if not spec:
+        return None
+    try:
+        timeout = max(float(os.environ.get("SHOGUN_GUI_BACKEND_TIMEOUT", BACKEND_TIMEOUT)), 0.1)
+    except ValueError:
+        timeout = BACKEND_TIMEOUT
+    return Aggregator(
+        parse_backends(spec, timeout),
+        api_key=os.environ.get("SHOGUN_GUI_BACKEND_API_KEY") or None,
+    )
+
+
+# 複数バックエンドの集約（SHOGUN_GUI_BACKENDS 未設定なら None）
+aggregator: Optional[Aggregator] = None
+
+
+def tmux_control_enabled() -> bool:
+    """環境変数から tmux コントロールモードを使うかを取得（既定: 使う）"""
+    return os.environ.get("SHOGUN_GUI_TMUX_CONTROL", "1") != "0"
+
+
+def create_simulated_backend() -> Optional[SimulatedBackend]:
+    """環境変数 SHOGUN_GUI_PANE_BACKEND が simulated なら模擬バックエンドを作る
+
+    設定は SHOGUN_GUI_SIMULATION（"latency=0.01,churn=5" 形式。simulator.SimulationConfig 参照）。
+    """
+    if os.environ.get("SHOGUN_GUI_PANE_BACKEND", "tmux") != "simulated":
+        return None
+    config = parse_simulation_spec(os.environ.get("SHOGUN_GUI_SIMULATION", ""))
+    return SimulatedBackend(pane_sampler.targets, config)
+
+
+# tmux の代わりに使っている模擬バックエンド（tmux を使う場合は None）
+simulated_backend: Optional[SimulatedBackend] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """構成を読み込み、バックグラウンドのペインサンプラーと tmux -C クライアントを起動・停止する"""
+    global aggregator, status_history, simulated_backend, dashboard_archive
+    aggregator = create_aggregator()
+    capacity = get_status_history_capacity()
+    status_history = StatusHistory(capacity) if capacity else None
+    configured = await load_configured_topology()
+    if configured is not None:
+        await apply_topology(configured)
+    command_queue.max_depth = get_command_queue_depth()
+    command_queue.idle_timeout = get_command_idle_timeout()
+    response_encoder.min_size = get_compress_min_size()
+    # 静的ファイルは起動時に読み込んで圧縮しておく
+    static_assets.load_all()
+    archive_task = None
+    if get_archive_path():
+        dashboard_archive = DashboardArchive(get_archive_path())
+        archive_task = asyncio.create_task(archive_dashboard_loop(dashboard_archive))
+    simulated_backend = create_simulated_backend()
+    if simulated_backend is not None:
+        set_backend(simulated_backend)
+    # 模擬バックエンドでは tmux に接続しない
+    use_control = tmux_control_enabled() and simulated_backend is None
+    if use_control:
+        # 接続できない間は run_tmux・サンプラーともに従来のサブプロセス経由で動く
+        set_control(tmux_control)
+        pane_sampler.set_change_feed(tmux_control.watching)
+        tmux_control.start()
+    # 履歴を記録する間は閲覧者がいなくてもサンプリングを続ける
+    pane_sampler.start(
+        get_sample_interval(),
+        idle_timeout=None if status_history is not None else SAMPLER_IDLE_TIMEOUT,
+    )
+    yield
+    if archive_task is not None:
+        archive_task.cancel()
+        await asyncio.gather(archive_task, return_exceptions=True)
+        dashboard_archive.close()
+        dashboard_archive = None
+    await command_queue.close()
+    await pane_sampler.stop()
+    if use_control:
+        pane_sampler.set_change_feed(None)
+        set_control(None)
+        await tmux_control.stop()
+    if aggregator is not None:
+        await aggregator.close()
+        aggregator = None
+    if simulated_backend is not None:
+        set_backend(None)
+        simulated_backend = None
+
+
+class FastJSONResponse(JSONResponse):
+    """dict を返すエンドポイントの既定のレスポンス（orjson があれば使う）"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+app = FastAPI(title="multi-agent-shogun-gui", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "shogun_gui_http_request_duration_seconds",
+    "HTTP request latency until the response starts, by route template",
+    ("method", "route", "status"),
+)
+STREAM_VIEWERS = metrics.gauge(
+    "shogun_gui_stream_viewers",
+    "Connected /api/stream subscribers",
+)
+STREAM_VIEWERS.set_function(lambda: stream_hub.subscribers)
+AGENT_STATUS = metrics.gauge(
+    "shogun_gui_agent_status",
+    "1 for the current status of each karo / ashigaru pane (from the latest sample)",
+    ("agent", "status"),
+)
+
+
+def current_agent_statuses() -> dict[tuple[str, str], int]:
+    """サンプラーのスナップショットから各エージェントの現在のステータスを判定する（tmux は呼ばない）"""
+    values = {}
+    for agent in [topology.karo, *topology.ashigaru]:
+        sample = pane_sampler.snapshots.get(agent.target)
+        if sample is None or sample.error is not None:
+            current = "unknown"
+        else:
+            current = detect_pane_status(sample.output, resolve_cli_type(sample.agent_cli))
+        for status in ("busy", "idle", "unknown"):
+            values[(agent.id, status)] = int(status == current)
+    return values
+
+
+AGENT_STATUS.set_function(current_agent_statuses)
 
 
 @app.middleware("http")
@@ -45,6 +392,27 @@ async def api_key_auth(request: Request, call_next):
     return await call_next(request)
 
 
+# 後に登録したミドルウェアほど外側で動く。認証で弾いた 401 も記録するよう、認証より後に登録する
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """ルートごとのレイテンシを記録する（SSE等はレスポンス開始までの時間）"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # パスではなくルートのテンプレートで集計し、ラベルの種類が増え続けないようにする
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            request.method,
+            route.path if route is not None else "unmatched",
+            str(status),
+        )
+
+
 # サポートするCLI種別
 SUPPORTED_CLIS = {"claude", "codex", "copilot", "kimi"}
 
@@ -82,21 +450,81 @@ CLI_STATUS_INDICATORS = {
 }
 
 
-def get_agent_cli_type(pane_target: str) -> str:
-    """tmuxペインの@agent_cliオプションからCLI種別を取得"""
+def resolve_cli_type(agent_cli: str) -> str:
+    """@agent_cliの値をサポート対象のCLI種別に正規化（未知の値はclaude扱い）"""
+    cli_type = agent_cli.strip()
+    if cli_type in SUPPORTED_CLIS:
+        return cli_type
+    return "claude"
+
+
+async def get_agent_cli_type(pane_target: str) -> str:
+    """tmuxペインの@agent_cliオプションからCLI種別を取得（list-panes のキャッシュから引く）"""
     try:
-        result = subprocess.run(
-            ["tmux", "show-options", "-p", "-t", pane_target, "-v", "@agent_cli"],
-            capture_output=True, text=True, timeout=2
-        )
-        cli_type = result.stdout.strip()
-        if cli_type in SUPPORTED_CLIS:
-            return cli_type
+        return resolve_cli_type(await pane_info.agent_cli(pane_target))
     except Exception:
         pass
     return "claude"
 
 
+# ステータス判定で見る末尾の行数（スピナー等は古い出力での誤検出を防ぐため末尾だけを見る）
+STATUS_TAIL_LINES = 5
+
+
+class StatusDetector:
+    """1つのCLI種別のステータス検出パラメータをコンパイルしたもの
+
+    スピナー・thinking・busy キーワードは1つの正規表現に、❯プロンプトは
+    「行頭の空白の後にプロンプト文字」の正規表現にまとめ、キーワードごとの
+    ループを C 実装の1回の走査に置き換える。
+    """
+
+    def __init__(self, indicators: dict):
+        busy = [*indicators["spinners"], *indicators["thinking_keywords"], *indicators["busy_keywords"]]
+        self.busy = _compile_alternation(busy)
+        self.status_bar = _compile_alternation(indicators.get("status_bar_keywords", []))
+        prompts = "|".join(re.escape(p) for p in indicators["prompts"])
+        self.prompt = re.compile(rf"^\s*(?:{prompts})", re.MULTILINE) if prompts else None
+        self.prompt_chars = list(dict.fromkeys(indicators["prompts"]))
+
+    def detect(self, raw_output: str) -> str:
+        text = raw_output.strip()
+
+        # 末尾 STATUS_TAIL_LINES 行の開始位置（行の分割はせずに後ろから改行を探す）
+        tail = len(text)
+        for _ in range(STATUS_TAIL_LINES):
+            tail = text.rfind("\n", 0, tail)
+            if tail < 0:
+                break
+        tail += 1
+
+        if self.busy is not None and self.busy.search(text, tail):
+            return "busy"
+        # プロンプトは通常末尾付近にあるため、末尾を先に見てから残りを見る
+        if self.prompt is not None and self.prompt.search(text, tail):
+            return "idle"
+        if self.status_bar is not None and self.status_bar.search(text, tail):
+            return "idle"
+        # 残りにプロンプト文字が1つも無ければ正規表現での走査は省く
+        if (
+            self.prompt is not None
+            and any(text.find(p, 0, tail) >= 0 for p in self.prompt_chars)
+            and self.prompt.search(text, 0, tail)
+        ):
+            return "idle"
+        return "unknown"
+
+
+def _compile_alternation(keywords: list[str]) -> Optional[re.Pattern]:
+    if not keywords:
+        return None
+    return re.compile("|".join(re.escape(kw) for kw in dict.fromkeys(keywords)))
+
+
+# CLI種別 → コンパイル済みの検出器
+STATUS_DETECTORS = {cli: StatusDetector(indicators) for cli, indicators in CLI_STATUS_INDICATORS.items()}
+
+
 def detect_pane_status(raw_output: str, cli_type: str = "claude") -> str:
     """ペイン出力からエージェントのステータスを判定する（Multi-CLI対応）
 
@@ -106,36 +534,8 @@ def detect_pane_status(raw_output: str, cli_type: str = "claude") -> str:
     3. ステータスバー検出（❯もスピナーもなし） → "idle"（安全側に推定）
     4. 上記いずれもなし → "unknown"
     """
-    all_lines = raw_output.strip().split('\n')
-    last_lines = all_lines[-5:]
-    last_text = '\n'.join(last_lines)
-
-    indicators = CLI_STATUS_INDICATORS.get(cli_type, CLI_STATUS_INDICATORS["claude"])
-
-    # ❯プロンプトはキャプチャ全体から検索（表示範囲外に押し出される場合あり）
-    has_prompt = any(
-        line.strip().startswith(p) for line in all_lines
-        for p in indicators["prompts"]
-    )
-    # スピナー/thinking/busyは末尾5行のみ（古い出力での誤検出防止）
-    has_spinner = any(s in last_text for s in indicators["spinners"])
-    has_thinking = any(kw in last_text for kw in indicators["thinking_keywords"])
-    has_busy = any(kw in last_text for kw in indicators["busy_keywords"])
-    has_status_bar = any(
-        kw in last_text for kw in indicators.get("status_bar_keywords", [])
-    )
-
-    is_active = has_prompt or has_spinner or has_thinking or has_busy or has_status_bar
-
-    if not is_active:
-        return "unknown"
-    if has_thinking or has_busy or has_spinner:
-        return "busy"
-    if has_prompt:
-        return "idle"
-    if has_status_bar:
-        return "idle"
-    return "unknown"
+    detector = STATUS_DETECTORS.get(cli_type, STATUS_DETECTORS["claude"])
+    return detector.detect(raw_output)
 
 
 def filter_pane_output(output: str) -> str:
@@ -179,309 +579,909 @@ def filter_pane_output(output: str) -> str:
     return '\n'.join(filtered)
 
 
+def raise_for_tmux_failure(sample: PaneSample) -> None:
+    """tmux自体が使えない場合（タイムアウト・未インストール）はHTTPエラーにする"""
+    if sample.error == TMUX_TIMEOUT_ERROR:
+        raise HTTPException(status_code=504, detail="tmux command timed out")
+    if sample.error == TMUX_NOT_FOUND_ERROR:
+        raise HTTPException(status_code=500, detail="tmux not found")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match ヘッダーがETagに一致するか（弱い比較: W/ 付きも一致とみなす）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def conditional_json(request: Request, content, etag: Optional[str] = None) -> Response:
+    """JSONレスポンスにETagを付け、If-None-Match が一致すれば304を返す
+
+    Accept-Encoding に応じて圧縮し、圧縮した本文は ETag ごとに使い回す。
+    圧縮した本文の ETag には方式を付ける（'"<hash>-gzip"'）。If-None-Match は
+    圧縮の有無にかかわらず同じ本文なら一致とみなす。
+
+    Args:
+        content: レスポンスのdict、またはJSON化済みの本文(bytes)
+        etag: 本文に対応する計算済みETag（省略時は本文から計算）
+    """
+    body = content if isinstance(content, bytes) else dumps(content)
+    etag = etag or make_etag(body)
+    encoding = response_encoder.choose(len(body), request.headers.get("accept-encoding"))
+    headers = {"ETag": variant_etag(etag, encoding), "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, headers["ETag"]) or etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=response_encoder.encode(body, encoding, etag), media_type="application/json", headers=headers)
+
+
+def json_response(request: Request, content) -> Response:
+    """ETagを付けないJSONレスポンス（Accept-Encoding に応じて圧縮する）"""
+    body = dumps(content)
+    encoding = response_encoder.choose(len(body), request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=response_encoder.encode(body, encoding), media_type="application/json", headers=headers)
+
+
+# (種類, ペイン, リビジョン, cursor) → (ペイロード, JSON本文, ETag)。
+# 同じスナップショットを同じカーソルから取得する閲覧者の間でシリアライズを1回にする
+PANE_BODY_CACHE_ENTRIES = 256
+_pane_bodies: OrderedDict[tuple, tuple[dict, bytes, str]] = OrderedDict()
+
+
+def pane_body(kind: str, sample: PaneSample, cursor: Optional[str], build) -> tuple[dict, bytes, str]:
+    """ペインのレスポンスの (ペイロード, JSON本文, ETag)。build() でペイロードを組み立てる"""
+    key = (kind, sample.target, sample.revision, cursor)
+    cached = _pane_bodies.get(key) if sample.revision else None
+    if cached is not None:
+        _pane_bodies.move_to_end(key)
+        return cached
+    payload = build()
+    body = dumps(payload)
+    cached = (payload, body, make_etag(body))
+    if sample.revision:
+        _pane_bodies[key] = cached
+        while len(_pane_bodies) > PANE_BODY_CACHE_ENTRIES:
+            _pane_bodies.popitem(last=False)
+    return cached
+
+
 def get_dashboard_path() -> str:
     """環境変数からダッシュボードパスを取得"""
     return os.environ.get("SHOGUN_DASHBOARD_PATH", "")
 
 
+DASHBOARD_NOT_CONFIGURED = {
+    "error": "Dashboard path not configured. Set SHOGUN_DASHBOARD_PATH environment variable."
+}
+
+_dashboard_cache: Optional[DashboardCache] = None
+
+
+def get_dashboard_cache() -> Optional[DashboardCache]:
+    """設定中のダッシュボードパスに対応するパースキャッシュを返す（未設定なら None）"""
+    global _dashboard_cache
+    dashboard_path = get_dashboard_path()
+    if not dashboard_path:
+        return None
+    if _dashboard_cache is None or _dashboard_cache.filepath != dashboard_path:
+        _dashboard_cache = DashboardCache(dashboard_path)
+    return _dashboard_cache
+
+
+def get_queue_dir() -> str:
+    """queue/ ディレクトリのパス（SHOGUN_GUI_QUEUE_DIR、未設定なら dashboard.md と同じ場所の queue）"""
+    queue_dir = os.environ.get("SHOGUN_GUI_QUEUE_DIR", "")
+    if queue_dir:
+        return queue_dir
+    dashboard_path = get_dashboard_path()
+    return str(Path(dashboard_path).parent / "queue") if dashboard_path else ""
+
+
+_queue_index: Optional[QueueIndex] = None
+
+
+async def get_queue_index() -> QueueIndex:
+    """queue/ の索引を最新にして返す（ディレクトリが未設定なら404）
+
+    ファイルの stat と YAML のパースはイベントループを止めないようスレッドで行う。
+    """
+    global _queue_index
+    queue_dir = get_queue_dir()
+    if not queue_dir:
+        raise HTTPException(status_code=404, detail="Queue directory not configured. Set SHOGUN_GUI_QUEUE_DIR.")
+    if _queue_index is None or str(_queue_index.root) != queue_dir:
+        _queue_index = QueueIndex(queue_dir)
+    index = _queue_index
+    if index.due:
+        await asyncio.to_thread(index.refresh)
+    return index
+
+
+# queue/inbox/<agent>.yaml → メールボックス（未読の件数をファイルが変わった時だけ数え直す）
+_inboxes: dict[str, Inbox] = {}
+
+
+def get_inbox(queue_dir: str, agent_id: str) -> Inbox:
+    path = str(Path(queue_dir) / "inbox" / f"{agent_id}.yaml")
+    inbox = _inboxes.get(path)
+    if inbox is None:
+        # 既読カーソルは inbox_watcher.sh が保存するものと競合しないようメモリ上にだけ持つ
+        inbox = _inboxes[path] = Inbox(path, persist_cursor=False)
+    return inbox
+
+
+def pane_output_fields(sample: PaneSample, cursor: Optional[str]) -> dict:
+    """ペイン出力のレスポンス項目を組み立てる
+
+    cursor 未指定なら出力全体（output）と次回用の cursor を返す。
+    指定された場合はそのカーソル以降の差分（PaneLog.delta の項目）を返す。
+    """
+    log = pane_logs[sample.target]
+    if cursor is None:
+        return {"output": log.text(), "cursor": log.cursor}
+    return log.delta(cursor)
+
+
+def ashigaru_output_payload(ashigaru_id: str, sample: PaneSample, cursor: Optional[str] = None) -> dict:
+    """/api/ashigaru/{id}/output のレスポンスを組み立てる"""
+    pane_index = topology.ashigaru_by_id[ashigaru_id].num
+    if sample.error is not None:
+        return {
+            "ashigaru_id": ashigaru_id,
+            "pane_index": pane_index,
+            "output": "",
+            "error": sample.error
+        }
+
+    return {
+        "ashigaru_id": ashigaru_id,
+        "pane_index": pane_index,
+        **pane_output_fields(sample, cursor),
+        "error": None
+    }
+
+
+def shogun_payload(sample: PaneSample, cursor: Optional[str] = None) -> dict:
+    """/api/pane/shogun のレスポンスを組み立てる"""
+    if sample.error is not None:
+        return {
+            "pane": "shogun",
+            "output": "",
+            "error": sample.error
+        }
+
+    return {
+        "pane": "shogun",
+        **pane_output_fields(sample, cursor),
+        "error": None
+    }
+
+
+def karo_payload(sample: PaneSample, cursor: Optional[str] = None) -> dict:
+    """/api/pane/karo のレスポンスを組み立てる"""
+    if sample.error is not None:
+        return {
+            "pane": "karo",
+            "output": "",
+            "status": "idle",
+            "error": sample.error
+        }
+
+    # CLI種別を取得してステータス判定
+    karo_cli = resolve_cli_type(sample.agent_cli)
+    status = detect_pane_status(sample.output, karo_cli)
+
+    return {
+        "pane": "karo",
+        **pane_output_fields(sample, cursor),
+        "status": status,
+        "cli_type": karo_cli,
+        "error": None
+    }
+
+
+def ashigaru_status(agent, sample: Optional[PaneSample]) -> dict:
+    """足軽1体分のステータス"""
+    if sample is None or sample.error is not None:
+        return {
+            "id": agent.id,
+            "num": agent.num,
+            "status": "unknown"
+        }
+
+    cli_type = resolve_cli_type(sample.agent_cli)
+    status = detect_pane_status(sample.output, cli_type)
+
+    return {
+        "id": agent.id,
+        "num": agent.num,
+        "status": status,
+        "cli_type": cli_type
+    }
+
+
+def ashigaru_status_payload(samples: dict[str, PaneSample], agents: Optional[list] = None) -> dict:
+    """/api/pane/ashigaru/status のレスポンスを組み立てる
+
+    Args:
+        samples: ペインターゲット → スナップショット
+        agents: 対象の足軽（省略時は全足軽）
+    """
+    if agents is None:
+        agents = topology.ashigaru
+    return {"statuses": [ashigaru_status(agent, samples.get(agent.target)) for agent in agents]}
+
+
+# ストリームへ配信済みのパースキャッシュのバージョン
+_published_dashboard_version = None
+
+
+def publish_dashboard() -> None:
+    """dashboard.md が更新されていればストリームへ配信する"""
+    global _published_dashboard_version
+    cache = get_dashboard_cache()
+    if cache is None:
+        stream_hub.publish("dashboard", "dashboard", DASHBOARD_NOT_CONFIGURED)
+        stream_hub.publish("dashboard_diff", "dashboard_diff", dashboard_diff_payload(None))
+        return
+
+    _, body = cache.get()
+    if cache.version == _published_dashboard_version and stream_hub.latest("dashboard") is not None:
+        return
+    _published_dashboard_version = cache.version
+    stream_hub.publish_json("dashboard", "dashboard", body.decode("utf-8"))
+    # 差分は購読者ごとに stream_delta で計算する。ここではカーソルだけを載せて変化を通知する
+    stream_hub.publish("dashboard_diff", "dashboard_diff", {"cursor": cache.cursor})
+
+
+def dashboard_diff_payload(since: Optional[str]) -> dict:
+    """dashboard.md のカーソル以降の差分"""
+    cache = get_dashboard_cache()
+    if cache is None:
+        return {
+            "since": None,
+            "cursor": "",
+            "reset": True,
+            "last_updated": "",
+            "sections": {},
+            "dashboard": DASHBOARD_NOT_CONFIGURED,
+        }
+    cache.get()
+    return cache.diff(since)
+
+
+def record_status_history(changed: dict[str, PaneSample]) -> None:
+    """変化した家老・足軽ペインのステータスを履歴に記録する（取得エラーは unknown）"""
+    now = time.time()
+    for agent in [topology.karo, *topology.ashigaru]:
+        sample = changed.get(agent.target)
+        if sample is None:
+            continue
+        if sample.error is not None:
+            status = "unknown"
+        else:
+            status = detect_pane_status(sample.output, resolve_cli_type(sample.agent_cli))
+        status_history.record(agent.id, status, now)
+
+
+def publish_pane_updates(changed: dict[str, PaneSample]) -> None:
+    """サンプリング結果のうち変化したペインをストリームへ配信する"""
+    # フィルタは出力が変化した時に1回だけ行い、結果を行単位で保持する
+    for target, sample in changed.items():
+        if sample.error is None:
+            pane_logs[target].update(filter_pane_output(sample.output).split("\n"))
+
+    if status_history is not None:
+        record_status_history(changed)
+
+    if topology.shogun.target in changed:
+        stream_hub.publish("shogun", "shogun", shogun_payload(changed[topology.shogun.target]))
+    if topology.karo.target in changed:
+        stream_hub.publish("karo", "karo", karo_payload(changed[topology.karo.target]))
+
+    ashigaru_changed = False
+    for agent in topology.ashigaru:
+        if agent.target in changed:
+            ashigaru_changed = True
+            stream_hub.publish(
+                agent.id, "ashigaru_output",
+                ashigaru_output_payload(agent.id, changed[agent.target]),
+            )
+    if ashigaru_changed:
+        stream_hub.publish(
+            "ashigaru_status", "ashigaru_status",
+            ashigaru_status_payload(pane_sampler.snapshots),
+        )
+
+    # dashboard.md の更新もサンプリング周期でチェックする
+    publish_dashboard()
+
+
+pane_sampler.add_listener(publish_pane_updates)
+
+
+def pane_stream_delta(topic: str, data: str, sent_cursors: dict) -> str:
+    """ペイン系トピックのストリームイベントを購読者ごとの差分に差し替える
+
+    購読者が最後に受け取ったカーソルからの差分だけを送る。初回は reset=true で全行を送る。
+    """
+    cursor = sent_cursors.get(topic, "")
+    if topic == "shogun":
+        sample = pane_sampler.snapshots.get(topology.shogun.target)
+        build = lambda: shogun_payload(sample, cursor)  # noqa: E731
+    elif topic == "karo":
+        sample = pane_sampler.snapshots.get(topology.karo.target)
+        build = lambda: karo_payload(sample, cursor)  # noqa: E731
+    elif topic in topology.ashigaru_by_id:
+        sample = pane_sampler.snapshots.get(topology.ashigaru_by_id[topic].target)
+        build = lambda: ashigaru_output_payload(topic, sample, cursor)  # noqa: E731
+    else:
+        return data
+    if sample is None:
+        # 構成の差し替え直後でまだサンプリングされていない
+        return data
+
+    payload, body, _ = pane_body(topic, sample, cursor, build)
+    # エラー時はカーソルを破棄し、復旧後は全行から送り直す
+    sent_cursors[topic] = payload.get("cursor", "")
+    return body.decode("utf-8")
+
+
+def stream_delta(topic: str, data: str, sent_cursors: dict) -> str:
+    """ストリームイベントを購読者ごとの差分に差し替える
+
+    dashboard_diff は購読者が最後に受け取ったカーソルからの差分を、
+    ペイン系トピックは pane_stream_delta の差分を送る。
+    """
+    if topic != "dashboard_diff":
+        return pane_stream_delta(topic, data, sent_cursors)
+    payload = dashboard_diff_payload(sent_cursors.get(topic))
+    sent_cursors[topic] = payload["cursor"]
+    return dumps(payload).decode("utf-8")
+
+
+# static/ のファイル（メモリ上に保持し、変わった時だけ読み直す）
+static_assets = StaticAssets(Path(__file__).parent / "static")
+
+
+def static_response(request: Request, asset: StaticAsset, immutable: bool = False) -> Response:
+    """静的ファイルのレスポンス（圧縮済みの本文を選び、ETag が一致すれば304）
+
+    Args:
+        immutable: 版付きURLで、内容が変わらないことが保証されている場合 True
+    """
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    if encoding not in asset.variants:
+        encoding = "identity"
+    headers = {
+        "ETag": variant_etag(asset.etag, encoding),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, headers["ETag"]) or etag_matches(if_none_match, asset.etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=asset.variants.get(encoding, asset.body), media_type=asset.media_type, headers=headers
+    )
+
+
 @app.get("/", response_class=HTMLResponse)
-async def root():
-    """メインページを返す"""
-    static_dir = Path(__file__).parent / "static"
-    index_path = static_dir / "index.html"
-    if index_path.exists():
-        return HTMLResponse(content=index_path.read_text(encoding="utf-8"))
+async def root(request: Request):
+    """メインページを返す（静的ファイルへの参照は版付きURLに書き換える）"""
+    page = static_assets.index()
+    if page is not None:
+        return static_response(request, page)
     return HTMLResponse(content="<h1>multi-agent-shogun-gui</h1><p>static/index.html not found</p>")
 
 
 @app.get("/api/dashboard")
-async def get_dashboard():
-    """dashboard.md をパースしてJSONで返す"""
-    dashboard_path = get_dashboard_path()
-    if not dashboard_path:
-        return {"error": "Dashboard path not configured. Set SHOGUN_DASHBOARD_PATH environment variable."}
-    return parse_dashboard(dashboard_path)
+async def get_dashboard(request: Request):
+    """dashboard.md をパースしてJSONで返す（ファイルが変わるまではキャッシュを返す）"""
+    cache = get_dashboard_cache()
+    if cache is None:
+        return DASHBOARD_NOT_CONFIGURED
+    _, body = cache.get()
+    return conditional_json(request, body, cache.etag)
 
 
-@app.get("/api/cli-config")
-async def get_cli_config():
-    """各エージェントのCLI設定を返す
+@app.get("/api/dashboard/diff")
+async def get_dashboard_diff(request: Request, since: Optional[str] = None):
+    """前回取得したカーソル以降の dashboard.md の差分をセクションごとに返す
+
+    Args:
+        since: 前回のレスポンスの cursor（省略時や期限切れの場合は reset=true で全体を返す）
 
     Returns:
-        エージェントごとのCLI種別とモデル情報をJSON形式で返す
+        since, cursor, reset, last_updated, sections（セクション → added / removed /
+        changed / rows）。reset=true の場合は dashboard に全体を含む。
     """
-    agents = {}
+    return json_response(request, dashboard_diff_payload(since))
 
-    # 将軍
-    shogun_cli = get_agent_cli_type("shogun:0.0")
-    agents["shogun"] = {"cli_type": shogun_cli}
 
-    # 家老
-    karo_cli = get_agent_cli_type("multiagent:0.0")
-    agents["karo"] = {"cli_type": karo_cli}
+@app.get("/api/cli-config")
+async def get_cli_config(request: Request):
+    """各エージェントのCLI設定を返す
 
-    # 足軽1-8
-    for i in range(1, 9):
-        target = f"multiagent:agents.{i}"
-        cli = get_agent_cli_type(target)
-        agents[f"ashigaru{i}"] = {"cli_type": cli}
+    Returns:
+        エージェントごとのCLI種別とモデル情報をJSON形式で返す
+    """
+    # 将軍・家老・全足軽（list-panes のキャッシュを共有するため tmux 呼び出しは高々1回）
+    targets = {agent.id: agent.target for agent in topology.agents()}
+    cli_types = await asyncio.gather(*(get_agent_cli_type(target) for target in targets.values()))
+    agents = {name: {"cli_type": cli} for name, cli in zip(targets, cli_types)}
 
-    return {"agents": agents}
+    return conditional_json(request, {"agents": agents})
 
 
 @app.get("/api/ashigaru/{ashigaru_id}/output")
-async def get_ashigaru_output(ashigaru_id: str):
+async def get_ashigaru_output(ashigaru_id: str, request: Request, cursor: Optional[str] = None):
     """足軽ペインの最新出力を取得する
 
     Args:
         ashigaru_id: 足軽ID (例: "ashigaru1", "ashigaru2", ...)
+        cursor: 前回のレスポンスの cursor。指定するとそれ以降の差分だけを返す
 
     Returns:
         足軽ペインの最新50行の出力をJSON形式で返す
+        （cursor 指定時は base/from/lines/cursor/reset の差分形式）
     """
-    # ashigaru_id からペインインデックスを算出
-    # ashigaru1 -> pane 1, ashigaru2 -> pane 2, ...
-    if not ashigaru_id.startswith("ashigaru"):
-        raise HTTPException(status_code=400, detail="Invalid ashigaru_id format")
-
-    try:
-        pane_index = int(ashigaru_id.replace("ashigaru", ""))
-        if pane_index < 1 or pane_index > 8:
-            raise HTTPException(status_code=400, detail="ashigaru_id must be between 1 and 8")
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid ashigaru_id format")
-
-    # tmux capture-pane で出力を取得
-    target = f"multiagent:agents.{pane_index}"
-    try:
-        result = subprocess.run(
-            ["tmux", "capture-pane", "-t", target, "-p", "-S", "-50"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode != 0:
-            return {
-                "ashigaru_id": ashigaru_id,
-                "pane_index": pane_index,
-                "output": "",
-                "error": f"Failed to capture pane: {result.stderr.strip() or 'Pane not found'}"
-            }
-
-        return {
-            "ashigaru_id": ashigaru_id,
-            "pane_index": pane_index,
-            "output": filter_pane_output(result.stdout),
-            "error": None
-        }
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=504, detail="tmux command timed out")
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="tmux not found")
+    # 構成に無い足軽は受け付けない
+    agent = topology.ashigaru_by_id.get(ashigaru_id)
+    if agent is None:
+        raise HTTPException(status_code=400, detail=f"Unknown ashigaru_id: {ashigaru_id}")
+
+    # サンプラーのスナップショットから出力を取得
+    sample = await pane_sampler.get(agent.target)
+    raise_for_tmux_failure(sample)
+    _, body, etag = pane_body(
+        ashigaru_id, sample, cursor, lambda: ashigaru_output_payload(ashigaru_id, sample, cursor)
+    )
+    return conditional_json(request, body, etag)
 
 
 @app.get("/api/pane/shogun")
-async def get_shogun_output():
+async def get_shogun_output(request: Request, cursor: Optional[str] = None):
     """将軍ペインの最新出力を取得する
 
+    Args:
+        cursor: 前回のレスポンスの cursor。指定するとそれ以降の差分だけを返す
+
     Returns:
         将軍ペインの最新100行の出力をJSON形式で返す
+        （cursor 指定時は base/from/lines/cursor/reset の差分形式）
     """
-    target = "shogun:0.0"
-    try:
-        result = subprocess.run(
-            ["tmux", "capture-pane", "-t", target, "-p", "-S", "-100"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode != 0:
-            return {
-                "pane": "shogun",
-                "output": "",
-                "error": f"Failed to capture pane: {result.stderr.strip() or 'Pane not found'}"
-            }
-
-        return {
-            "pane": "shogun",
-            "output": filter_pane_output(result.stdout),
-            "error": None
-        }
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=504, detail="tmux command timed out")
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="tmux not found")
+    sample = await pane_sampler.get(topology.shogun.target)
+    raise_for_tmux_failure(sample)
+    _, body, etag = pane_body("shogun", sample, cursor, lambda: shogun_payload(sample, cursor))
+    return conditional_json(request, body, etag)
 
 
 @app.get("/api/pane/karo")
-async def get_karo_output():
+async def get_karo_output(request: Request, cursor: Optional[str] = None):
     """家老ペインの最新出力を取得する
 
+    Args:
+        cursor: 前回のレスポンスの cursor。指定するとそれ以降の差分だけを返す
+
     Returns:
         家老ペインの最新50行の出力とステータスをJSON形式で返す
+        （cursor 指定時は base/from/lines/cursor/reset の差分形式）
     """
-    target = "multiagent:0.0"
+    sample = await pane_sampler.get(topology.karo.target)
+    raise_for_tmux_failure(sample)
+    _, body, etag = pane_body("karo", sample, cursor, lambda: karo_payload(sample, cursor))
+    return conditional_json(request, body, etag)
+
+
+@app.get("/api/pane/ashigaru/status")
+async def get_ashigaru_status(
+    request: Request,
+    ids: Optional[str] = None,
+    status: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+):
+    """足軽ペインのステータスを取得する
+
+    Args:
+        ids: カンマ区切りの足軽ID（省略時は全足軽）
+        status: この状態(busy/idle/unknown)の足軽だけを返す
+        offset: 先頭から読み飛ばす件数
+        limit: 返す最大件数（省略時は全件）
+
+    Returns:
+        足軽の状態(busy/idle/unknown)の一覧と、絞り込み後の総数 total を含むJSON
+    """
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset and limit must not be negative")
+
+    agents = topology.ashigaru
+    if ids:
+        wanted = set(ids.split(","))
+        agents = [agent for agent in agents if agent.id in wanted]
+
+    # サンプラーのスナップショットから判定（古ければ全ペインをまとめて1回だけ取得する）
+    samples = await pane_sampler.get_many([agent.target for agent in agents])
+    payload = ashigaru_status_payload(samples, agents)
+    if status:
+        payload["statuses"] = [s for s in payload["statuses"] if s["status"] == status]
+    payload["total"] = len(payload["statuses"])
+    end = None if limit is None else offset + limit
+    payload["statuses"] = payload["statuses"][offset:end]
+    return conditional_json(request, payload)
+
+
+def require_aggregator() -> Aggregator:
+    if aggregator is None:
+        raise HTTPException(status_code=404, detail="Aggregation not configured. Set SHOGUN_GUI_BACKENDS.")
+    return aggregator
+
+
+@app.get("/api/aggregate/dashboard")
+async def get_aggregate_dashboard(request: Request):
+    """全バックエンドのダッシュボードをまとめて返す
+
+    Returns:
+        backends（バックエンド名 → url / ok / stale / age / error）と
+        dashboard（各セクションの行に取得元の backend を付けて連結したもの）
+    """
+    return conditional_json(request, await require_aggregator().dashboard())
+
+
+@app.get("/api/aggregate/ashigaru/status")
+async def get_aggregate_ashigaru_status(request: Request):
+    """全バックエンドの足軽ステータスをまとめて返す
+
+    Returns:
+        backends と、各ステータスに取得元の backend を付けた statuses、その総数 total
+    """
+    return conditional_json(request, await require_aggregator().ashigaru_status())
+
+
+# /api/status/history で一度に指定できる集計期間の数
+MAX_HISTORY_WINDOWS = 8
+
+
+def parse_history_windows(windows: Optional[str]) -> list[int]:
+    """カンマ区切りの集計期間（秒）を解釈する（不正なら400）"""
+    if not windows:
+        return list(DEFAULT_HISTORY_WINDOWS)
     try:
-        result = subprocess.run(
-            ["tmux", "capture-pane", "-t", target, "-p", "-S", "-50"],
-            capture_output=True,
-            text=True,
-            timeout=5
+        parsed = [int(window) for window in windows.split(",") if window]
+    except ValueError:
+        parsed = []
+    if not parsed or len(parsed) > MAX_HISTORY_WINDOWS or any(window <= 0 for window in parsed):
+        raise HTTPException(
+            status_code=400,
+            detail=f"windows must be 1-{MAX_HISTORY_WINDOWS} comma-separated positive seconds",
         )
-        if result.returncode != 0:
-            return {
-                "pane": "karo",
-                "output": "",
-                "status": "idle",
-                "error": f"Failed to capture pane: {result.stderr.strip() or 'Pane not found'}"
-            }
+    return parsed
 
-        raw_output = result.stdout
-        filtered_output = filter_pane_output(raw_output)
 
-        # CLI種別を取得してステータス判定
-        karo_cli = get_agent_cli_type("multiagent:0.0")
-        status = detect_pane_status(raw_output, karo_cli)
+@app.get("/api/status/history")
+async def get_status_history(
+    request: Request,
+    windows: Optional[str] = None,
+    ids: Optional[str] = None,
+    timeline: bool = False,
+):
+    """家老・足軽のステータス遷移の履歴から稼働状況を集計する
 
-        return {
-            "pane": "karo",
-            "output": filtered_output,
-            "status": status,
-            "cli_type": karo_cli,
-            "error": None
+    Args:
+        windows: カンマ区切りの集計期間（秒。既定: 300,3600,86400）
+        ids: カンマ区切りのエージェントID（省略時は家老と全足軽）
+        timeline: true なら最長の期間内の遷移 [時刻, ステータス] の一覧も返す
+
+    Returns:
+        agents（エージェントID → 現在の status と since、期間ごとの observed /
+        seconds / utilization / busy_streaks / idle_gaps）と、履歴の
+        recorded_since（最も古い遷移の時刻）・transitions・capacity
+    """
+    if status_history is None:
+        raise HTTPException(status_code=404, detail="Status history disabled. Start with --status-history N.")
+    window_list = parse_history_windows(windows)
+
+    agent_ids = [topology.karo.id, *(agent.id for agent in topology.ashigaru)]
+    if ids:
+        wanted = set(ids.split(","))
+        agent_ids = [agent_id for agent_id in agent_ids if agent_id in wanted]
+
+    now = time.time()
+    summary = status_history.summary(window_list, agent_ids, now)
+    agents = {}
+    for agent_id in agent_ids:
+        current = status_history.current(agent_id)
+        agents[agent_id] = {
+            "status": current[1] if current else "unknown",
+            "since": current[0] if current else None,
+            "windows": summary[agent_id],
         }
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=504, detail="tmux command timed out")
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="tmux not found")
+        if timeline:
+            agents[agent_id]["timeline"] = status_history.transitions(agent_id, now - max(window_list))
+
+    return json_response(request, {
+        "recorded_since": status_history.oldest(),
+        "transitions": len(status_history),
+        "capacity": status_history.capacity,
+        "agents": agents,
+    })
+
+
+@app.get("/api/history/search")
+async def search_history(
+    request: Request,
+    q: str = "",
+    kind: Optional[str] = None,
+    cmd: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = SEARCH_LIMIT,
+):
+    """過去の dashboard.md に載った項目を全文検索する
+
+    例: 先月 gui に触れた指示 → /api/history/search?q=gui&kind=order&since=30d
 
+    Args:
+        q: 空白区切りの語（すべてを含む項目）
+        kind: カンマ区切りの種類（order / result / completed / skill / action）
+        cmd: 指示ID（cmd_XXX）
+        since: この時刻以降も載っていた項目（YYYY-MM-DD / ISO 8601 / 30d・12h・2w）
+        until: この時刻より前に現れた項目（同上）
+        limit: 件数の上限（最大 500）
 
-@app.get("/api/pane/ashigaru/status")
-async def get_ashigaru_status():
-    """全足軽ペインのステータスを取得する
+    Returns:
+        results（新しく見えていた順。kind / cmd_id / title / body / first_seen /
+        last_seen / current）と、count・fts（全文索引を使えるか）
+    """
+    if dashboard_archive is None:
+        raise HTTPException(status_code=404, detail="History archive disabled. Set SHOGUN_GUI_ARCHIVE.")
+    kinds = split_filter(kind)
+    invalid = [value for value in kinds or () if value not in ENTRY_KINDS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid kind: {', '.join(invalid)}")
+    try:
+        since_time = parse_time(since) if since else None
+        until_time = parse_time(until) if until else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # SQLite の検索はイベントループを止めないようスレッドで行う
+    results = await asyncio.to_thread(dashboard_archive.search, q, kinds, cmd, since_time, until_time, limit)
+    return json_response(request, {"results": results, "count": len(results), "fts": dashboard_archive.fts})
+
+
+def split_filter(value: Optional[str]) -> Optional[list[str]]:
+    """カンマ区切りの絞り込み条件（未指定なら None）"""
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+@app.get("/api/commands")
+async def get_commands(request: Request, status: Optional[str] = None):
+    """queue/shogun_to_karo.yaml の指示の一覧を返す
+
+    Args:
+        status: カンマ区切りのステータス（pending,in_progress 等）で絞り込む
+
+    Returns:
+        commands（id / status / purpose / priority / project / timestamp と、
+        サブタスクの件数 subtasks・ステータスごとの件数 progress）、
+        revision（索引の版）、errors（読めなかったファイル → エラー）
+    """
+    index = await get_queue_index()
+    commands = index.find_commands(split_filter(status))
+    return conditional_json(request, {
+        "commands": commands,
+        "total": len(commands),
+        "revision": index.revision,
+        "errors": index.errors,
+    })
+
+
+@app.get("/api/commands/{cmd_id}")
+async def get_command_detail(request: Request, cmd_id: str):
+    """指示の全項目と、サブタスク（タスクYAML）とその報告を返す"""
+    detail = (await get_queue_index()).command_detail(cmd_id)
+    if detail is None:
+        raise HTTPException(status_code=404, detail=f"Unknown command: {cmd_id}")
+    return conditional_json(request, detail)
+
+
+@app.get("/api/tasks")
+async def get_tasks(
+    request: Request,
+    cmd: Optional[str] = None,
+    status: Optional[str] = None,
+    assignee: Optional[str] = None,
+):
+    """queue/tasks/ のタスクを、報告（queue/reports/）と合わせて返す
+
+    報告だけが残っているタスク（担当者が次のタスクに移った後など）も含む。
+
+    Args:
+        cmd: 親の指示ID（parent_cmd）
+        status: カンマ区切りのステータス（assigned,blocked,done 等）
+        assignee: カンマ区切りの担当者（ashigaru1 等）
 
     Returns:
-        全8体の足軽の状態(busy/idle/unknown)を含むJSON
+        tasks（task_id 順。各タスクに report）、total、revision
     """
-    statuses = []
+    index = await get_queue_index()
+    tasks = index.find_tasks(cmd, split_filter(status), split_filter(assignee))
+    return conditional_json(request, {"tasks": tasks, "total": len(tasks), "revision": index.revision})
 
-    for pane_num in range(1, 9):
-        ashigaru_id = f"ashigaru{pane_num}"
-        target = f"multiagent:agents.{pane_num}"
 
+@app.get("/api/inbox")
+async def get_inbox_counts(request: Request):
+    """将軍・家老・足軽ごとのメールボックス（queue/inbox/<agent>.yaml）の未読の件数を返す
+
+    ファイルの履歴全体はパースせず、既読カーソル以降の "read: false" だけを数える。
+    変わっていないファイルは stat だけで前回の件数を返す。
+
+    Returns:
+        agents（id / role / unread）と、未読の合計 total_unread
+    """
+    queue_dir = get_queue_dir()
+    if not queue_dir:
+        raise HTTPException(status_code=404, detail="Queue directory not configured. Set SHOGUN_GUI_QUEUE_DIR.")
+    agents = []
+    for agent in topology.agents():
         try:
-            result = subprocess.run(
-                ["tmux", "capture-pane", "-t", target, "-p", "-S", "-50"],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
+            unread = get_inbox(queue_dir, agent.id).peek_unread_count()
+        except OSError:
+            unread = None
+        agents.append({"id": agent.id, "role": agent.role, "unread": unread})
+    return conditional_json(request, {
+        "agents": agents,
+        "total_unread": sum(agent["unread"] or 0 for agent in agents),
+    })
 
-            if result.returncode != 0:
-                statuses.append({
-                    "id": ashigaru_id,
-                    "num": pane_num,
-                    "status": "unknown"
-                })
-                continue
 
-            raw_output = result.stdout
+@app.get("/api/stream")
+async def stream_updates(topics: str = ",".join(DEFAULT_STREAM_TOPICS)):
+    """ダッシュボード・ペイン出力・足軽ステータスの変化をSSEでプッシュする
+
+    Args:
+        topics: カンマ区切りの購読トピック
+            (dashboard, dashboard_diff, shogun, karo, ashigaru_status, 各足軽のID)
+
+    Returns:
+        text/event-stream。イベント名は dashboard / dashboard_diff / shogun / karo /
+        ashigaru_status / ashigaru_output で、data は対応するREST APIと同じJSON。
+        ペイン出力は cursor 付きで取得した場合と同じ差分形式で送られる。
+        dashboard_diff は /api/dashboard/diff と同じ形式で、初回は reset=true で全体を送る。
+        内容が変化した時だけ送信される。
+    """
+    requested = [topic for topic in topics.split(",") if topic]
+    available = set(DEFAULT_STREAM_TOPICS) | {"dashboard_diff"} | set(topology.ashigaru_by_id)
+    invalid = [topic for topic in requested if topic not in available]
+    if not requested or invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid topics: {', '.join(invalid) or topics}")
+
+    # 最新状態を用意してから購読を開始（休止中のサンプラーはここで再開する）
+    await pane_sampler.get(topology.shogun.target)
+    publish_dashboard()
+
+    return StreamingResponse(
+        stream_hub.subscribe(requested, on_wake=pane_sampler.touch, transform=stream_delta),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-            # CLI種別を取得してステータス判定
-            cli_type = get_agent_cli_type(target)
-            status = detect_pane_status(raw_output, cli_type)
 
-            statuses.append({
-                "id": ashigaru_id,
-                "num": pane_num,
-                "status": status,
-                "cli_type": cli_type
-            })
+async def deliver_command(target: str, command: str) -> None:
+    """ペインに指示の文字列と Enter を送る（command_queue の送信タスクから呼ばれる）"""
+    try:
+        # メッセージを送信
+        returncode, _, stderr = await send_keys(target, command, timeout=TMUX_COMMAND_TIMEOUT)
+        if returncode != 0:
+            raise CommandDeliveryError(f"Failed to send command: {stderr.strip() or 'Unknown error'}")
 
-        except subprocess.TimeoutExpired:
-            statuses.append({
-                "id": ashigaru_id,
-                "num": pane_num,
-                "status": "unknown"
-            })
-        except Exception:
-            statuses.append({
-                "id": ashigaru_id,
-                "num": pane_num,
-                "status": "unknown"
-            })
+        # Enterを送信
+        returncode, _, stderr = await send_keys(target, "Enter", timeout=TMUX_COMMAND_TIMEOUT)
+        if returncode != 0:
+            raise CommandDeliveryError(f"Failed to send Enter: {stderr.strip() or 'Unknown error'}")
+    except asyncio.TimeoutError:
+        raise CommandDeliveryError(TMUX_TIMEOUT_ERROR)
+    except FileNotFoundError:
+        raise CommandDeliveryError(TMUX_NOT_FOUND_ERROR)
+
+
+async def command_pane_status(target: str, not_before: float) -> str:
+    """not_before 以降に取得したキャプチャからペインのステータスを判定する"""
+    sample = await pane_sampler.get(target)
+    if sample.captured_at < not_before:
+        await pane_sampler.refresh()
+        sample = pane_sampler.snapshots.get(target, sample)
+    if sample.error == TMUX_NOT_FOUND_ERROR:
+        raise CommandDeliveryError(TMUX_NOT_FOUND_ERROR)
+    if sample.error is not None:
+        return "unknown"
+    return detect_pane_status(sample.output, resolve_cli_type(sample.agent_cli))
 
-    return {"statuses": statuses}
 
+# 将軍への指示のキュー（ペインごとに1件ずつ、idle になってから送る）
+command_queue = CommandQueue(deliver_command, command_pane_status)
+COMMAND_QUEUE_LENGTH.set_function(command_queue.depths)
 
-@app.post("/api/command")
+
+@app.post("/api/command", status_code=202)
 async def send_command(request: CommandRequest):
-    """将軍ペインに指示を送信する
+    """将軍ペインへの指示をキューに入れる
+
+    指示は将軍が idle になってから1件ずつ送信される。送信結果は
+    /api/command/queue/{id} で確認する。
 
     Args:
         request: CommandRequest with command field
 
     Returns:
-        送信結果をJSON形式で返す
+        受け付けた指示のIDと状態（/api/command/queue/{id} と同じ形式）
+
+    Raises:
+        HTTPException: 400（空の指示）、429（キューが満杯）
     """
     if not request.command or not request.command.strip():
         raise HTTPException(status_code=400, detail="Command cannot be empty")
 
     command = request.command.strip()
-    target = "shogun:0.0"
-
     try:
-        # メッセージを送信
-        result1 = subprocess.run(
-            ["tmux", "send-keys", "-t", target, command],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result1.returncode != 0:
-            return {
-                "success": False,
-                "command": command,
-                "error": f"Failed to send command: {result1.stderr.strip() or 'Unknown error'}"
-            }
+        queued = command_queue.submit(topology.shogun.target, command)
+    except CommandQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return {"success": True, **command_queue.describe(queued)}
 
-        # Enterを送信
-        result2 = subprocess.run(
-            ["tmux", "send-keys", "-t", target, "Enter"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result2.returncode != 0:
-            return {
-                "success": False,
-                "command": command,
-                "error": f"Failed to send Enter: {result2.stderr.strip() or 'Unknown error'}"
-            }
 
-        return {
-            "success": True,
-            "command": command,
-            "target": target,
-            "error": None
-        }
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=504, detail="tmux command timed out")
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="tmux not found")
+@app.get("/api/command/queue/{command_id}")
+async def get_command_status(command_id: str):
+    """キューに入れた指示の状態を返す
+
+    Returns:
+        status（queued / delivering / delivered / failed）、position（先に送られる
+        指示の件数。送信済みなら null）、queued_at / delivered_at（UNIX時刻）、
+        latency（受け付けから送信までの秒数）、error、pane_status（送信を待つ間に
+        最後に確認した将軍のステータス。unknown が続いた場合は idle を待たずに送る）
+    """
+    queued = command_queue.get(command_id)
+    if queued is None:
+        raise HTTPException(status_code=404, detail=f"Unknown command: {command_id}")
+    return command_queue.describe(queued)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus のテキスト形式でメトリクスを返す"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/static/{path:path}")
-async def static_files(path: str):
-    """静的ファイルを返す（パストラバーサル防止付き）"""
-    static_dir = Path(__file__).parent / "static"
-    file_path = (static_dir / path).resolve()
-    # パストラバーサル防止: static_dir配下のファイルのみ許可
-    if not str(file_path).startswith(str(static_dir.resolve())):
+async def static_files(request: Request, path: str, v: Optional[str] = None):
+    """静的ファイルを返す（パストラバーサル防止付き）
+
+    Args:
+        v: 版（index.html の版付きURL）。現在の内容の版と一致すれば immutable で返す
+    """
+    try:
+        asset = static_assets.get(path)
+    except PermissionError:
+        # パストラバーサル防止: static/ 配下のファイルのみ許可
         raise HTTPException(status_code=403, detail="Access denied")
-    if file_path.exists():
-        return FileResponse(file_path)
-    raise HTTPException(status_code=404, detail="File not found")
+    if asset is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return static_response(request, asset, immutable=v is not None and v == asset.version)
 
 
 def main():
@@ -502,6 +1502,85 @@ def main():
         default="127.0.0.1",
         help="Host address (default: 127.0.0.1)",
     )
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=1.0,
+        help="tmux pane sampling interval in seconds (default: 1.0)",
+    )
+    parser.add_argument(
+        "--queue-dir",
+        help="multi-agent-shogun queue/ directory for /api/commands and /api/tasks "
+             "(default: queue/ next to dashboard.md)",
+    )
+    parser.add_argument(
+        "--topology",
+        help="Agent topology: path to a YAML file, or 'tmux' to discover panes by @agent_id "
+             "(default: shogun + karo + 8 ashigaru)",
+    )
+    parser.add_argument(
+        "--status-history",
+        type=int,
+        default=0,
+        help=f"Status transitions kept for /api/status/history (e.g. {STATUS_HISTORY_CAPACITY}); "
+             "recording keeps sampling tmux even when nobody is watching (default: 0, disabled)",
+    )
+    parser.add_argument(
+        "--command-queue-depth",
+        type=int,
+        default=COMMAND_QUEUE_DEPTH,
+        help="Undelivered commands allowed per pane before /api/command returns 429 "
+             f"(default: {COMMAND_QUEUE_DEPTH})",
+    )
+    parser.add_argument(
+        "--command-idle-timeout",
+        type=float,
+        default=COMMAND_IDLE_TIMEOUT,
+        help="Seconds a queued command waits for the Shogun pane to become idle before it fails "
+             f"(default: {COMMAND_IDLE_TIMEOUT:g})",
+    )
+    parser.add_argument(
+        "--compress-min-size",
+        type=int,
+        default=COMPRESS_MIN_SIZE,
+        help="Compress JSON responses (gzip, or br with the brotli package) of at least this many "
+             f"bytes; 0 disables compression (default: {COMPRESS_MIN_SIZE})",
+    )
+    parser.add_argument(
+        "--archive",
+        help="SQLite file recording dashboard.md history for /api/history/search "
+             "(default: dashboard_archive.sqlite3 next to dashboard.md)",
+    )
+    parser.add_argument(
+        "--no-archive",
+        action="store_true",
+        help="Do not record dashboard.md history",
+    )
+    parser.add_argument(
+        "--backends",
+        help="Aggregate remote shogun-gui backends: comma-separated name=url list "
+             "(served at /api/aggregate/*)",
+    )
+    parser.add_argument(
+        "--backend-timeout",
+        type=float,
+        default=BACKEND_TIMEOUT,
+        help=f"Per-backend response timeout in seconds for aggregation (default: {BACKEND_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--simulate",
+        nargs="?",
+        const="",
+        metavar="OPTIONS",
+        help="Serve simulated agent panes instead of tmux (load testing). OPTIONS: "
+             "latency,jitter,stall_rate,stall,churn,busy,idle,seed as key=value,... "
+             "e.g. latency=0.01,churn=5",
+    )
+    parser.add_argument(
+        "--no-tmux-control",
+        action="store_true",
+        help="Spawn a tmux process per call instead of keeping a tmux -C connection",
+    )
     parser.add_argument(
         "--reload",
         action="store_true",
@@ -518,6 +1597,49 @@ def main():
 
     # 環境変数にセット
     os.environ["SHOGUN_DASHBOARD_PATH"] = str(dashboard_path.absolute())
+    os.environ["SHOGUN_GUI_SAMPLE_INTERVAL"] = str(args.sample_interval)
+    os.environ["SHOGUN_GUI_STATUS_HISTORY"] = str(args.status_history)
+    os.environ["SHOGUN_GUI_COMMAND_QUEUE_DEPTH"] = str(args.command_queue_depth)
+    os.environ["SHOGUN_GUI_COMMAND_IDLE_TIMEOUT"] = str(args.command_idle_timeout)
+    os.environ["SHOGUN_GUI_COMPRESS_MIN_SIZE"] = str(args.compress_min_size)
+    if args.queue_dir:
+        os.environ["SHOGUN_GUI_QUEUE_DIR"] = str(Path(args.queue_dir).absolute())
+    if args.no_tmux_control:
+        os.environ["SHOGUN_GUI_TMUX_CONTROL"] = "0"
+    if args.no_archive:
+        os.environ["SHOGUN_GUI_ARCHIVE"] = ""
+    else:
+        archive_path = Path(args.archive) if args.archive else dashboard_path.parent / "dashboard_archive.sqlite3"
+        os.environ["SHOGUN_GUI_ARCHIVE"] = str(archive_path.absolute())
+    if args.simulate is not None:
+        try:
+            parse_simulation_spec(args.simulate)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+        os.environ["SHOGUN_GUI_PANE_BACKEND"] = "simulated"
+        os.environ["SHOGUN_GUI_SIMULATION"] = args.simulate
+
+    # 構成ファイルを検証
+    if args.topology:
+        if args.topology != "tmux":
+            try:
+                load_topology(args.topology)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return 1
+            args.topology = str(Path(args.topology).absolute())
+        os.environ["SHOGUN_GUI_TOPOLOGY"] = args.topology
+
+    # 集約対象のバックエンドを検証
+    if args.backends:
+        try:
+            parse_backends(args.backends)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+        os.environ["SHOGUN_GUI_BACKENDS"] = args.backends
+        os.environ["SHOGUN_GUI_BACKEND_TIMEOUT"] = str(args.backend_timeout)
 
     print(f"Dashboard: {os.environ['SHOGUN_DASHBOARD_PATH']}")
     print(f"Server: http://{args.host}:{args.port}")
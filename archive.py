@@ -0,0 +1,334 @@
+"""dashboard.md の履歴のアーカイブ（SQLite + FTS5 の全文検索）
+
+dashboard.md は日ごとに書き換えられ、parse_dashboard は当日の完了報告しか返さない。
+ここではパース結果が変わるたびに、指令・結果・戦果・スキル化候補・要対応の項目を
+SQLite に記録し、過去の分も含めて全文検索できるようにする。
+
+同じ項目はダッシュボードが何度書き換えられても1行だけ記録し、初めて現れた時刻
+（first_seen）と消えた時刻（last_seen。まだ載っていれば NULL）を持つ。
+そのため1回の記録の書き込みは、前回から増えた・消えた項目の件数に比例する。
+
+全文検索には FTS5 の trigram トークナイザーを使う（日本語は単語に分かち書き
+されないため、部分文字列で引けるようにする）。3文字未満の語と、FTS5 が使えない
+SQLite では LIKE で探す。
+
+検索は記録とは別の読み取り専用の接続で行う（WAL のため、書き込み中でも
+記録のロックを待たずに直前までの内容を読める）。
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import metrics
+
+# dashboard.md の変化を確認して記録する間隔（秒）。閲覧者がいなくても記録を続ける
+ARCHIVE_INTERVAL = 5.0
+
+# /api/history/search が返す件数の既定値と上限
+SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 500
+
+# 記録する項目の種類
+ENTRY_KINDS = ("order", "result", "completed", "skill", "action")
+
+# FTS5 の trigram は3文字以上の語しか引けない
+TRIGRAM_MIN_CHARS = 3
+
+_CMD_PATTERN = re.compile(r"\bcmd_\d+\b")
+
+# 相対的な期間の指定（"30d" / "12h" / "2w"）
+_RELATIVE_PATTERN = re.compile(r"^(\d+)\s*([hdw])$")
+_RELATIVE_UNITS = {"h": "hours", "d": "days", "w": "weeks"}
+
+ARCHIVE_ENTRIES = metrics.counter(
+    "shogun_gui_archive_entries_total",
+    "Dashboard items added to the history archive, by kind",
+    ("kind",),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    captured_at REAL NOT NULL,
+    last_updated TEXT NOT NULL,
+    added INTEGER NOT NULL,
+    removed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    identity TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    cmd_id TEXT,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL,
+    snapshot_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_cmd ON entries (cmd_id);
+CREATE INDEX IF NOT EXISTS entries_last_seen ON entries (last_seen);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    title, body, content='entries', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS entries_fts_insert AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+"""
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _row_text(row: Any) -> str:
+    """テーブル行（dict）の値を " | " でつないだ本文"""
+    if isinstance(row, dict):
+        return " | ".join(_text(value) for value in row.values() if _text(value))
+    return _text(row)
+
+
+def _find_cmd(*texts: str) -> Optional[str]:
+    for text in texts:
+        match = _CMD_PATTERN.search(text)
+        if match:
+            return match.group(0)
+    return None
+
+
+def extract_entries(data: dict[str, Any]) -> list[dict]:
+    """パース結果から記録する項目を取り出す（kind / cmd_id / title / body）"""
+    entries = []
+    for report in data.get("completed_reports", []):
+        cmd_id = _text(report.get("cmd_id")) or None
+        content = report.get("content") or {}
+        for kind in ("order", "result"):
+            if content.get(kind):
+                entries.append({"kind": kind, "cmd_id": cmd_id, "title": cmd_id or "", "body": _text(content[kind])})
+    for row in data.get("completed_today", []):
+        body = _row_text(row)
+        title = _text(row.get("task")) if isinstance(row, dict) else ""
+        entries.append({"kind": "completed", "cmd_id": _find_cmd(body), "title": title, "body": body})
+    for row in data.get("skill_candidates", []):
+        body = _row_text(row)
+        title = _text(row.get("name")) if isinstance(row, dict) else ""
+        entries.append({"kind": "skill", "cmd_id": _find_cmd(body), "title": title, "body": body})
+    for item in data.get("action_required", []):
+        title = _text(item.get("title")) if isinstance(item, dict) else _text(item)
+        body = _text(item.get("content")) if isinstance(item, dict) else ""
+        entries.append({"kind": "action", "cmd_id": _find_cmd(title, body), "title": title, "body": body})
+    return [entry for entry in entries if entry["title"] or entry["body"]]
+
+
+def _identity(entry: dict) -> str:
+    key = "\0".join((entry["kind"], entry["cmd_id"] or "", entry["title"], entry["body"]))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """"2026-09-01" / "2026-09-01T12:00" / "30d" / "12h" / "2w" を epoch 秒にする
+
+    Raises:
+        ValueError: 解釈できない場合
+    """
+    value = value.strip()
+    match = _RELATIVE_PATTERN.match(value)
+    if match:
+        delta = timedelta(**{_RELATIVE_UNITS[match.group(2)]: int(match.group(1))})
+        return (now if now is not None else time.time()) - delta.total_seconds()
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time: {value!r} (use YYYY-MM-DD, ISO 8601, or e.g. 30d / 12h / 2w)")
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class DashboardArchive:
+    """dashboard.md の項目の履歴
+
+    Args:
+        path: SQLite のファイル（":memory:" も可）
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # 記録（書き込み用の接続）のロック
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self.fts = self._enable_fts()
+        # まだダッシュボードに載っている項目の identity → id
+        self._current: dict[str, int] = {
+            row["identity"]: row["id"]
+            for row in self._db.execute("SELECT id, identity FROM entries WHERE last_seen IS NULL")
+        }
+        # 検索用の接続とそのロック（":memory:" は接続ごとに別のDBになるため書き込み用を使う）
+        if path == ":memory:":
+            self._reader, self._read_lock = self._db, self._lock
+        else:
+            self._reader = sqlite3.connect(
+                Path(path).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False
+            )
+            self._reader.row_factory = sqlite3.Row
+            self._read_lock = threading.Lock()
+
+    def _enable_fts(self) -> bool:
+        """FTS5（trigram）の索引を用意する。使えない SQLite なら False"""
+        exists = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries_fts'"
+        ).fetchone()
+        try:
+            self._db.executescript(_FTS_SCHEMA)
+            if not exists:
+                # 索引より前に記録された項目も引けるようにする
+                self._db.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+                self._db.commit()
+            return True
+        except sqlite3.OperationalError:
+            # 索引のない SQLite で開いた場合、挿入時のトリガーが失敗しないように外す
+            self._db.execute("DROP TRIGGER IF EXISTS entries_fts_insert")
+            self._db.commit()
+            return False
+
+    def close(self) -> None:
+        with self._read_lock:
+            self._reader.close()
+        with self._lock:
+            self._db.close()
+
+    def record(self, data: dict[str, Any], now: Optional[float] = None) -> int:
+        """パース結果を記録する（増えた項目を追加し、消えた項目に last_seen を付ける）
+
+        Returns:
+            追加した項目の件数
+        """
+        if "error" in data:
+            return 0
+        now = time.time() if now is None else now
+        entries = {_identity(entry): entry for entry in extract_entries(data)}
+        with self._lock:
+            added = [identity for identity in entries if identity not in self._current]
+            removed = [identity for identity in self._current if identity not in entries]
+            if not added and not removed:
+                return 0
+            with self._db:
+                snapshot_id = self._db.execute(
+                    "INSERT INTO snapshots (captured_at, last_updated, added, removed) VALUES (?, ?, ?, ?)",
+                    (now, _text(data.get("last_updated")), len(added), len(removed)),
+                ).lastrowid
+                self._db.executemany(
+                    "UPDATE entries SET last_seen = ? WHERE id = ?",
+                    [(now, self._current[identity]) for identity in removed],
+                )
+                for identity in added:
+                    entry = entries[identity]
+                    # 一度消えて再び載った項目は、最初に現れた時刻のまま「載っている」に戻す
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO entries"
+                        " (identity, kind, cmd_id, title, body, first_seen, snapshot_id)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (identity, entry["kind"], entry["cmd_id"], entry["title"], entry["body"], now, snapshot_id),
+                    )
+                    if cursor.rowcount:
+                        self._current[identity] = cursor.lastrowid
+                        continue
+                    self._db.execute("UPDATE entries SET last_seen = NULL WHERE identity = ?", (identity,))
+                    self._current[identity] = self._db.execute(
+                        "SELECT id FROM entries WHERE identity = ?", (identity,)
+                    ).fetchone()["id"]
+            for identity in removed:
+                del self._current[identity]
+        for identity in added:
+            ARCHIVE_ENTRIES.inc(entries[identity]["kind"])
+        return len(added)
+
+    def search(
+        self,
+        query: str = "",
+        kinds: Optional[Iterable[str]] = None,
+        cmd: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = SEARCH_LIMIT,
+    ) -> list[dict]:
+        """項目を検索する（新しく見えていた順）
+
+        Args:
+            query: 空白区切りの語（すべてを含む項目。大文字・小文字は区別しない）
+            kinds: 項目の種類（ENTRY_KINDS。複数指定で OR）
+            cmd: 指示ID
+            since: この時刻以降もダッシュボードに載っていた項目
+            until: この時刻より前にダッシュボードに現れた項目
+        """
+        now = time.time()
+        clauses, params = [], []
+        fts_terms = []
+        for term in query.split():
+            if self.fts and len(term) >= TRIGRAM_MIN_CHARS:
+                fts_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                clauses.append("(title LIKE ? ESCAPE '\\' OR body LIKE ? ESCAPE '\\')")
+                params += [_like_pattern(term)] * 2
+        if fts_terms:
+            clauses.append("id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)")
+            params.append(" ".join(fts_terms))
+        if kinds is not None:
+            kinds = list(kinds)
+            clauses.append(f"kind IN ({', '.join('?' * len(kinds))})")
+            params += kinds
+        if cmd is not None:
+            clauses.append("cmd_id = ?")
+            params.append(cmd)
+        if since is not None:
+            clauses.append("COALESCE(last_seen, ?) >= ?")
+            params += [now, since]
+        if until is not None:
+            clauses.append("first_seen < ?")
+            params.append(until)
+
+        sql = "SELECT kind, cmd_id, title, body, first_seen, last_seen FROM entries"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY COALESCE(last_seen, ?) DESC, id DESC LIMIT ?"
+        params += [now, max(1, min(limit, MAX_SEARCH_LIMIT))]
+        with self._read_lock:
+            rows = self._reader.execute(sql, params).fetchall()
+        return [
+            {
+                "kind": row["kind"],
+                "cmd_id": row["cmd_id"],
+                "title": row["title"],
+                "body": row["body"],
+                "first_seen": _isoformat(row["first_seen"]),
+                "last_seen": _isoformat(row["last_seen"]),
+                "current": row["last_seen"] is None,
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> dict:
+        """記録した項目・スナップショットの件数"""
+        with self._read_lock:
+            entries = self._reader.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            snapshots = self._reader.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+        return {"entries": entries, "current": len(self._current), "snapshots": snapshots, "fts": self.fts}
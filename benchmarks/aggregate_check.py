@@ -0,0 +1,232 @@
+"""集約モード（--backends）をローカルの代役バックエンドで確かめる
+
+app.py --simulate を空いているポートに N 台起動し（dashboard.md の本日の戦果の
+行数はバックエンドごとに変える）、さらに次の2台を加えて集約サーバーを起動する。
+
+  slow: 1台目へのリクエストを --slow-delay 秒遅らせて転送する代役
+  dead: 何も待ち受けていないポート
+
+集約サーバーの /api/aggregate/dashboard と /api/aggregate/ashigaru/status について:
+
+- 応答が --backend-timeout（と少しの余裕）以内に返る（slow に待たされない）
+- 正常なバックエンドの行・ステータスが漏れなく "backend" 付きでまとめられる
+- slow は "Backend timed out"、dead は失敗として ok: false になる
+- slow の遅れて届いた結果は、次の問い合わせがまた打ち切られても stale として使われる
+
+を確かめる。失敗した項目があれば終了コード 1。--output でJSONに書き出す。
+
+Usage:
+    python benchmarks/aggregate_check.py [--backends 3] [--backend-timeout 1] [--slow-delay 3]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from load_test import free_port, spawn_server  # noqa: E402
+
+from aggregator import BACKEND_CACHE_TTL  # noqa: E402
+
+# 1台目のバックエンドの本日の戦果の行数（2台目以降はその倍数）
+BACKEND_ROWS = 10
+
+# 集約の応答時間に許す、--backend-timeout を超える余裕（秒）
+TIMEOUT_MARGIN = 0.5
+
+
+class SlowProxyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        headers = {"If-None-Match": self.headers["If-None-Match"]} if self.headers["If-None-Match"] else {}
+        try:
+            response = httpx.get(self.server.upstream + self.path, headers=headers, timeout=10.0)
+        except httpx.HTTPError:
+            self.send_error(502)
+            return
+        try:
+            self.send_response(response.status_code)
+            for name in ("content-type", "etag"):
+                if name in response.headers:
+                    self.send_header(name, response.headers[name])
+            self.send_header("Content-Length", str(len(response.content)))
+            self.end_headers()
+            self.wfile.write(response.content)
+        except (BrokenPipeError, ConnectionResetError):
+            # 集約サーバーが接続を閉じた（終了時など）
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SlowProxy(ThreadingHTTPServer):
+    """upstream へのリクエストを delay 秒遅らせて転送する、応答の遅いバックエンドの代役"""
+    daemon_threads = True
+
+    def __init__(self, upstream: str, delay: float):
+        super().__init__(("127.0.0.1", 0), SlowProxyHandler)
+        self.upstream = upstream
+        self.delay = delay
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class Checks:
+    """確認項目の結果"""
+
+    def __init__(self):
+        self.results: list[dict] = []
+
+    def check(self, name: str, ok: bool, detail: str = "") -> None:
+        self.results.append({"name": name, "ok": bool(ok), "detail": detail})
+        print(f"{'PASS' if ok else 'FAIL'}  {name}" + (f"  ({detail})" if detail else ""), file=sys.stderr)
+
+    @property
+    def failed(self) -> int:
+        return sum(not result["ok"] for result in self.results)
+
+
+def count_by_backend(rows: list[dict]) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for row in rows:
+        counts[row.get("backend")] = counts.get(row.get("backend"), 0) + 1
+    return counts
+
+
+def timed_get(client: httpx.Client, url: str) -> tuple[dict, float]:
+    start = time.perf_counter()
+    response = client.get(url)
+    response.raise_for_status()
+    return response.json(), time.perf_counter() - start
+
+
+def run_checks(aggregate_url: str, backends: dict[str, str], timeout: float, slow_delay: float) -> Checks:
+    """backends: 正常なバックエンドの名前 → URL（slow は1台目の結果を返す）"""
+    checks = Checks()
+    first = next(iter(backends))
+    with httpx.Client(timeout=30.0) as client:
+        expected_rows = {
+            name: len(client.get(f"{url}/api/dashboard").json()["completed_today"])
+            for name, url in backends.items()
+        }
+        expected_statuses = {
+            name: len(client.get(f"{url}/api/pane/ashigaru/status").json()["statuses"])
+            for name, url in backends.items()
+        }
+
+        started = time.monotonic()
+        body, elapsed = timed_get(client, f"{aggregate_url}/api/aggregate/dashboard")
+        states = body["backends"]
+        checks.check("dashboard: answered within the backend timeout", elapsed < timeout + TIMEOUT_MARGIN,
+                     f"{elapsed:.2f}s, timeout {timeout:g}s")
+        checks.check("dashboard: live backends ok", all(states[name]["ok"] for name in backends),
+                     ", ".join(f"{name}={states[name]['ok']}" for name in backends))
+        checks.check("dashboard: slow backend timed out",
+                     not states["slow"]["ok"] and states["slow"]["error"] == "Backend timed out",
+                     str(states["slow"]["error"]))
+        checks.check("dashboard: dead backend failed",
+                     not states["dead"]["ok"] and (states["dead"]["error"] or "").startswith("Backend request failed"),
+                     str(states["dead"]["error"]))
+        counts = count_by_backend(body["dashboard"]["completed_today"])
+        checks.check("dashboard: rows merged and tagged per backend", counts == expected_rows,
+                     f"got {counts}, expected {expected_rows}")
+        checks.check("dashboard: last_updated per live backend",
+                     sorted(body["dashboard"]["last_updated"]) == sorted(backends),
+                     ", ".join(body["dashboard"]["last_updated"]))
+
+        body, elapsed = timed_get(client, f"{aggregate_url}/api/aggregate/ashigaru/status")
+        counts = count_by_backend(body["statuses"])
+        checks.check("ashigaru/status: answered within the backend timeout", elapsed < timeout + TIMEOUT_MARGIN,
+                     f"{elapsed:.2f}s, timeout {timeout:g}s")
+        checks.check("ashigaru/status: statuses merged and tagged per backend",
+                     counts == expected_statuses and body["total"] == sum(expected_statuses.values()),
+                     f"got {counts}, expected {expected_statuses}")
+
+        # slow への打ち切った問い合わせは続いている。届いた結果がキャッシュの TTL を
+        # 過ぎてから問い合わせると、再びの打ち切り中も前回の結果が stale として使われる
+        time.sleep(max(started + slow_delay + BACKEND_CACHE_TTL + TIMEOUT_MARGIN - time.monotonic(), 0.0))
+        body, elapsed = timed_get(client, f"{aggregate_url}/api/aggregate/dashboard")
+        slow = body["backends"]["slow"]
+        counts = count_by_backend(body["dashboard"]["completed_today"])
+        checks.check("dashboard: late slow result served as stale",
+                     not slow["ok"] and slow["stale"] and counts.get("slow") == expected_rows[first],
+                     f"ok={slow['ok']} stale={slow['stale']} rows={counts.get('slow')}")
+        checks.check("dashboard: stale round answered within the backend timeout",
+                     elapsed < timeout + TIMEOUT_MARGIN, f"{elapsed:.2f}s")
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check aggregator mode against local stand-in backends")
+    parser.add_argument("--backends", type=int, default=3, help="Simulated app.py backends to start (default: 3)")
+    parser.add_argument("--backend-timeout", type=float, default=1.0,
+                        help="Aggregator --backend-timeout in seconds (default: 1)")
+    parser.add_argument("--slow-delay", type=float, default=3.0,
+                        help="Seconds the slow backend delays each response (default: 3)")
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    args = parser.parse_args()
+
+    if args.slow_delay <= args.backend_timeout:
+        parser.error("--slow-delay must be longer than --backend-timeout")
+
+    processes = []
+    slow = None
+    with tempfile.TemporaryDirectory(prefix="shogun-gui-aggregate-") as tmp:
+        try:
+            backends = {}
+            for index in range(1, args.backends + 1):
+                workdir = Path(tmp) / f"backend{index}"
+                workdir.mkdir()
+                process, url = spawn_server(workdir, "", rows=BACKEND_ROWS * index)
+                processes.append(process)
+                backends[f"backend{index}"] = url
+
+            slow = SlowProxy(next(iter(backends.values())), args.slow_delay)
+            threading.Thread(target=slow.serve_forever, daemon=True).start()
+            spec = ",".join(
+                [f"{name}={url}" for name, url in backends.items()]
+                + [f"slow={slow.url}", f"dead=http://127.0.0.1:{free_port()}"]
+            )
+
+            workdir = Path(tmp) / "aggregator"
+            workdir.mkdir()
+            process, aggregate_url = spawn_server(
+                workdir, "", rows=1, extra_args=("--backends", spec, "--backend-timeout", str(args.backend_timeout))
+            )
+            processes.append(process)
+
+            checks = run_checks(aggregate_url, backends, args.backend_timeout, args.slow_delay)
+        finally:
+            if slow is not None:
+                slow.shutdown()
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=10)
+
+    print(f"{len(checks.results) - checks.failed}/{len(checks.results)} checks passed", file=sys.stderr)
+    if args.output:
+        report = {
+            "meta": {
+                "backends": args.backends,
+                "backend_timeout": args.backend_timeout,
+                "slow_delay": args.slow_delay,
+            },
+            "checks": checks.results,
+        }
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return 1 if checks.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
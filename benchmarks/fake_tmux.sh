@@ -0,0 +1,23 @@
+#!/bin/sh
+# ベンチマーク用の tmux の代役（suite.py が PATH の先頭に "tmux" として置く）
+#
+# $FAKE_TMUX_DIR/list-panes と $FAKE_TMUX_DIR/capture/<ターゲット> の内容を返す。
+# コントロールモード（-C）には対応しないため、サーバーはサブプロセス経由で動く。
+case "$1" in
+    list-panes)
+        cat "$FAKE_TMUX_DIR/list-panes"
+        ;;
+    capture-pane)
+        # capture-pane -t <ターゲット> -p -S <開始行>
+        cat "$FAKE_TMUX_DIR/capture/$3" 2>/dev/null || {
+            echo "can't find pane: $3" >&2
+            exit 1
+        }
+        ;;
+    send-keys)
+        ;;
+    *)
+        echo "fake tmux: unsupported command: $1" >&2
+        exit 1
+        ;;
+esac
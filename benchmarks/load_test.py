@@ -0,0 +1,260 @@
+"""多数の閲覧者を模した負荷試験
+
+app.js と同じ使い方をする閲覧者を非同期に N 人走らせ、エンドポイントごとの
+スループット・レイテンシ（p50 / p95 / p99 / 最大）・エラー数を計測する。
+
+  poll:   ダッシュボード・足軽ステータス・将軍・家老のペインを --poll-interval ごとに取得する
+  stream: /api/stream を購読し、受信したイベントを数える
+  mixed:  半数ずつ poll と stream
+
+--spawn を付けると app.py を模擬バックエンド（--simulate）と合成した dashboard.md で
+空いているポートに起動し、終了後に止める。tmux のない環境でも数百人規模の
+閲覧者の負荷を再現できる。
+
+Usage:
+    python benchmarks/load_test.py --spawn [--simulate latency=0.005,churn=5] --viewers 200
+    python benchmarks/load_test.py --url http://127.0.0.1:1059 --viewers 50 --mode stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import build_dashboard  # noqa: E402
+
+# app.js のポーリングで取得するエンドポイント
+POLL_PATHS = ("/api/dashboard", "/api/pane/ashigaru/status", "/api/pane/shogun", "/api/pane/karo")
+
+# --spawn で使う dashboard.md の本日の戦果の行数
+SPAWN_DASHBOARD_ROWS = 200
+
+
+class Stats:
+    """エンドポイントごとのレイテンシとエラーの集計"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.stream_events = 0
+        self.stream_bytes = 0
+
+    def record(self, name: str, latency: float) -> None:
+        self.latencies.setdefault(name, []).append(latency)
+
+    def error(self, name: str) -> None:
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, duration: float) -> dict:
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            endpoints[name] = {
+                "requests": len(values),
+                "rps": round(len(values) / duration, 1),
+                "p50_ms": round(_percentile(values, 50) * 1000, 2),
+                "p95_ms": round(_percentile(values, 95) * 1000, 2),
+                "p99_ms": round(_percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            "requests": total,
+            "rps": round(total / duration, 1),
+            "errors": dict(sorted(self.errors.items())),
+            "stream_events": self.stream_events,
+            "stream_bytes": self.stream_bytes,
+            "endpoints": endpoints,
+        }
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """昇順に並んだ values の percent パーセンタイル（最近傍法）"""
+    if not values:
+        return 0.0
+    index = max(int(round(percent / 100 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+async def poll_viewer(client: httpx.AsyncClient, stats: Stats, interval: float, deadline: float) -> None:
+    """app.js のポーリングと同じく、ETag 付きで各エンドポイントを取得し続ける"""
+    etags: dict[str, str] = {}
+    # 閲覧者ごとに開始をずらし、全員が同時に取得しないようにする
+    await asyncio.sleep(random.random() * interval)
+    while time.monotonic() < deadline:
+        for path in POLL_PATHS:
+            headers = {"If-None-Match": etags[path]} if path in etags else {}
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+            except httpx.HTTPError as e:
+                stats.error(f"{path}: {type(e).__name__}")
+                continue
+            stats.record(path, time.perf_counter() - start)
+            if response.status_code >= 400:
+                stats.error(f"{path}: HTTP {response.status_code}")
+            elif "etag" in response.headers:
+                etags[path] = response.headers["etag"]
+        await asyncio.sleep(interval)
+
+
+async def stream_viewer(client: httpx.AsyncClient, stats: Stats, deadline: float) -> None:
+    """/api/stream を購読し、最初のイベントまでの時間とイベント数を記録する"""
+    start = time.perf_counter()
+    first = True
+    try:
+        async with client.stream("GET", "/api/stream", timeout=httpx.Timeout(10.0, read=None)) as response:
+            if response.status_code != 200:
+                stats.error(f"/api/stream: HTTP {response.status_code}")
+                return
+            lines = response.aiter_lines()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    line = await asyncio.wait_for(lines.__anext__(), remaining)
+                except (asyncio.TimeoutError, StopAsyncIteration):
+                    return
+                stats.stream_bytes += len(line) + 1
+                if line.startswith("event:"):
+                    stats.stream_events += 1
+                    if first:
+                        stats.record("/api/stream (first event)", time.perf_counter() - start)
+                        first = False
+    except httpx.HTTPError as e:
+        stats.error(f"/api/stream: {type(e).__name__}")
+
+
+async def run_load(url: str, viewers: int, duration: float, mode: str, interval: float) -> dict:
+    stats = Stats()
+    limits = httpx.Limits(max_connections=viewers * 2, max_keepalive_connections=viewers * 2)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=10.0) as client:
+        start = time.monotonic()
+        deadline = start + duration
+        tasks = []
+        for number in range(viewers):
+            streaming = mode == "stream" or (mode == "mixed" and number % 2)
+            if streaming:
+                tasks.append(stream_viewer(client, stats, deadline))
+            else:
+                tasks.append(poll_viewer(client, stats, interval, deadline))
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+    report = stats.report(elapsed)
+    report["meta"] = {
+        "url": url, "viewers": viewers, "mode": mode, "duration": round(elapsed, 2),
+        "poll_interval": interval,
+    }
+    return report
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(
+    workdir: Path,
+    simulate: str,
+    rows: int = SPAWN_DASHBOARD_ROWS,
+    extra_args: Sequence[str] = (),
+) -> tuple[subprocess.Popen, str]:
+    """模擬バックエンドで app.py を起動し、応答するまで待つ
+
+    Args:
+        rows: 合成する dashboard.md の本日の戦果の行数
+        extra_args: app.py に追加で渡す引数
+    """
+    dashboard = workdir / "dashboard.md"
+    dashboard.write_text(build_dashboard(rows), encoding="utf-8")
+    port = free_port()
+    root = Path(__file__).resolve().parent.parent
+    process = subprocess.Popen(
+        [sys.executable, "app.py", "--dashboard", str(dashboard), "--port", str(port),
+         "--host", "127.0.0.1", f"--simulate={simulate}", "--no-archive", *extra_args],
+        cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, "GUI_API_KEY": ""},
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        if process.poll() is not None:
+            raise RuntimeError(f"app.py exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/api/cli-config", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("app.py did not start")
+
+
+def print_report(report: dict) -> None:
+    print(f"{'endpoint':<34} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}",
+          file=sys.stderr)
+    for name, result in report["endpoints"].items():
+        print(
+            f"{name:<34} {result['requests']:>9} {result['rps']:>8} {result['p50_ms']:>8} "
+            f"{result['p95_ms']:>8} {result['p99_ms']:>8} {result['max_ms']:>8}",
+            file=sys.stderr,
+        )
+    print(
+        f"total {report['requests']} requests ({report['rps']} rps), "
+        f"{report['stream_events']} stream events, errors: {report['errors'] or 'none'}",
+        file=sys.stderr,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-agent-shogun-gui load test")
+    parser.add_argument("--url", help="Server URL (e.g. http://127.0.0.1:1059)")
+    parser.add_argument("--spawn", action="store_true", help="Start app.py with simulated panes on a free port")
+    parser.add_argument(
+        "--simulate", default="latency=0.005,jitter=0.005,churn=5,busy=10,idle=10",
+        help="Simulation options for --spawn (see app.py --simulate)",
+    )
+    parser.add_argument("--viewers", type=int, default=100, help="Concurrent viewers (default: 100)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run (default: 20)")
+    parser.add_argument("--mode", choices=("poll", "stream", "mixed"), default="mixed")
+    parser.add_argument("--poll-interval", type=float, default=3.0, help="Seconds between polls per viewer")
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    args = parser.parse_args()
+
+    if bool(args.url) == args.spawn:
+        parser.error("specify exactly one of --url or --spawn")
+
+    process: Optional[subprocess.Popen] = None
+    with tempfile.TemporaryDirectory(prefix="shogun-gui-load-") as tmp:
+        url = args.url
+        if args.spawn:
+            process, url = spawn_server(Path(tmp), args.simulate)
+        try:
+            report = asyncio.run(run_load(url, args.viewers, args.duration, args.mode, args.poll_interval))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    if args.spawn:
+        report["meta"]["simulate"] = args.simulate
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""dashboard.md パーサーのスケーリング計測
+
+本日の戦果の行数と完了報告の数を増やしながら parse_dashboard_content を計測し、
+1行あたりの所要時間がサイズによらずほぼ一定（線形）であることを確認する。
+
+Usage:
+    python benchmarks/parser_scaling.py [--sizes 10,100,1000,10000] [--repeat 5]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parser import parse_dashboard_content  # noqa: E402
+from synthetic import build_dashboard  # noqa: E402
+
+
+def measure(content: str, repeat: int) -> float:
+    """パース1回あたりの所要時間（秒、中央値）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_dashboard_content(content)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dashboard.md parser scaling benchmark")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per size (median is reported)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'lines':>8} {'bytes':>10} {'ms':>10} {'us/line':>10}")
+    for rows in (int(size) for size in args.sizes.split(",")):
+        content = build_dashboard(rows)
+        line_count = content.count("\n") + 1
+        seconds = measure(content, args.repeat)
+        print(
+            f"{rows:>8} {line_count:>8} {len(content.encode('utf-8')):>10} "
+            f"{seconds * 1000:>10.2f} {seconds * 1e6 / line_count:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
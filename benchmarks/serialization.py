@@ -0,0 +1,119 @@
+"""JSONのシリアライズ時間と転送量の計測
+
+合成した dashboard.md（本日の戦果の行数を変えたもの）のパース結果と、
+100行の将軍ペインのレスポンスについて:
+
+- シリアライズ: FastAPI の既定の経路（jsonable_encoder + json.dumps）、
+  標準の json.dumps、encoding.dumps（orjson があれば orjson）の所要時間
+- 転送量: 圧縮なし・gzip・br（brotli があれば）のバイト数と圧縮時間
+
+を計測する。--output でJSONに書き出す。
+
+Usage:
+    python benchmarks/serialization.py [--sizes 10,100,1000,10000] [--output result.json]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+import encoding  # noqa: E402
+from parser import parse_dashboard_content  # noqa: E402
+from synthetic import build_captures, build_dashboard  # noqa: E402
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_time: float) -> float:
+    """fn 1回あたりの所要時間（マイクロ秒、中央値）"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_time or number >= 1 << 16:
+            break
+        number *= 2
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return round(statistics.median(timings) * 1e6, 2)
+
+
+def stdlib_dumps(content: Any) -> bytes:
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fastapi_default(content: Any) -> bytes:
+    """FastAPI が dict を返すエンドポイントで行う変換（JSONResponse.render と同じ引数）"""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def bench_payload(payload: Any, repeat: int, min_time: float) -> dict:
+    body = encoding.dumps(payload)
+    result = {
+        "serialize_us": {
+            "fastapi_default": measure(lambda: fastapi_default(payload), repeat, min_time),
+            "json": measure(lambda: stdlib_dumps(payload), repeat, min_time),
+            "encoding.dumps": measure(lambda: encoding.dumps(payload), repeat, min_time),
+        },
+        "bytes": {"identity": len(body)},
+        "compress_us": {},
+    }
+    for name in encoding.ENCODINGS:
+        result["bytes"][name] = len(encoding.compress(body, name))
+        result["compress_us"][name] = measure(lambda: encoding.compress(body, name), repeat, min_time)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON serialization and compression benchmark")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated 戦果 row counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per case (median is reported)")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per measurement")
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    args = parser.parse_args()
+
+    cases = {
+        f"dashboard ({rows} rows)": parse_dashboard_content(build_dashboard(rows))
+        for rows in (int(size) for size in args.sizes.split(","))
+    }
+    shogun = build_captures("claude", 100)["busy"]
+    cases["pane/shogun (100 lines)"] = {"pane": "shogun", "output": shogun, "cursor": "0123abcd:42", "error": None}
+
+    results = {name: bench_payload(payload, args.repeat, args.min_time) for name, payload in cases.items()}
+    report = {
+        "meta": {
+            "orjson": encoding.orjson is not None,
+            "brotli": encoding.brotli is not None,
+            "gzip_level": encoding.GZIP_LEVEL,
+            "brotli_quality": encoding.BROTLI_QUALITY,
+        },
+        "results": results,
+    }
+
+    columns = ["fastapi us", "json us", "dumps us", "bytes", *(f"{name} bytes" for name in encoding.ENCODINGS),
+               *(f"{name} us" for name in encoding.ENCODINGS)]
+    print(f"{'case':<26}" + "".join(f"{column:>12}" for column in columns), file=sys.stderr)
+    for name, result in results.items():
+        values = [*result["serialize_us"].values(), *result["bytes"].values(), *result["compress_us"].values()]
+        print(f"{name:<26}" + "".join(f"{value:>12}" for value in values), file=sys.stderr)
+    if not encoding.orjson:
+        print("orjson is not installed: encoding.dumps uses the json module", file=sys.stderr)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
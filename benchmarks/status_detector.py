@@ -0,0 +1,82 @@
+"""ペインのステータス判定（detect_pane_status）の計測
+
+CLI種別ごとに busy / idle / unknown の典型的なキャプチャを生成し、
+コンパイル済みの検出器と、キーワードごとに any(...) で走査する従来の実装を
+比較する。計測の前に両者の判定が全ケースで一致することを確認する。
+
+Usage:
+    python benchmarks/status_detector.py [--lines 50] [--number 2000]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import CLI_STATUS_INDICATORS, detect_pane_status  # noqa: E402
+from synthetic import build_captures  # noqa: E402
+
+
+def legacy_detect_pane_status(raw_output: str, cli_type: str = "claude") -> str:
+    """従来の実装（行に分割し、キーワードの種類ごとに走査する）"""
+    all_lines = raw_output.strip().split('\n')
+    last_lines = all_lines[-5:]
+    last_text = '\n'.join(last_lines)
+
+    indicators = CLI_STATUS_INDICATORS.get(cli_type, CLI_STATUS_INDICATORS["claude"])
+
+    has_prompt = any(
+        line.strip().startswith(p) for line in all_lines
+        for p in indicators["prompts"]
+    )
+    has_spinner = any(s in last_text for s in indicators["spinners"])
+    has_thinking = any(kw in last_text for kw in indicators["thinking_keywords"])
+    has_busy = any(kw in last_text for kw in indicators["busy_keywords"])
+    has_status_bar = any(
+        kw in last_text for kw in indicators.get("status_bar_keywords", [])
+    )
+
+    is_active = has_prompt or has_spinner or has_thinking or has_busy or has_status_bar
+
+    if not is_active:
+        return "unknown"
+    if has_thinking or has_busy or has_spinner:
+        return "busy"
+    if has_prompt:
+        return "idle"
+    if has_status_bar:
+        return "idle"
+    return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pane status detector benchmark")
+    parser.add_argument("--lines", type=int, default=50, help="Lines per capture (default: 50)")
+    parser.add_argument("--number", type=int, default=2000, help="Calls per measurement")
+    args = parser.parse_args()
+
+    print(f"{'cli':>8} {'case':>14} {'status':>8} {'legacy us':>10} {'compiled us':>12} {'speedup':>8}")
+    for cli_type in CLI_STATUS_INDICATORS:
+        for case, capture in build_captures(cli_type, args.lines).items():
+            expected = legacy_detect_pane_status(capture, cli_type)
+            actual = detect_pane_status(capture, cli_type)
+            if actual != expected:
+                print(f"MISMATCH {cli_type} {case}: legacy={expected} compiled={actual}")
+                return 1
+
+            legacy = timeit.timeit(
+                lambda: legacy_detect_pane_status(capture, cli_type), number=args.number
+            ) / args.number
+            compiled = timeit.timeit(
+                lambda: detect_pane_status(capture, cli_type), number=args.number
+            ) / args.number
+            print(
+                f"{cli_type:>8} {case:>14} {actual:>8} {legacy * 1e6:>10.2f} "
+                f"{compiled * 1e6:>12.2f} {legacy / compiled:>7.1f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
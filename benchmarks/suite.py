@@ -0,0 +1,351 @@
+"""パーサー・ペイン処理・APIのホットパスのベンチマークスイート
+
+合成した dashboard.md（本日の戦果 10〜10,000 行・完了報告・スキル化候補の3形式）と
+CLI種別ごとのペインのキャプチャで parse_dashboard / filter_pane_output /
+detect_pane_status を、合成した queue/ のYAMLで QueueIndex と Inbox を、
+DashboardArchive の記録と全文検索を計測し、
+偽の tmux（fake_tmux.sh）を PATH に置いた状態で FastAPI のエンドポイントを
+プロセス内のクライアントから計測する。
+
+結果はJSONで出力し、--compare で以前の結果と比較して遅くなった項目を報告する
+（しきい値を超えた項目があれば終了コード 1）。バージョン間の比較には
+--quick ではなく既定の設定で取った結果を使うこと。
+
+Usage:
+    python benchmarks/suite.py [--quick] [--output result.json]
+    python benchmarks/suite.py --compare baseline.json [--threshold 1.25]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app as app_module  # noqa: E402
+from archive import DashboardArchive  # noqa: E402
+from parser import DashboardCache, parse_dashboard, parse_dashboard_content  # noqa: E402
+from inbox import Inbox  # noqa: E402
+from queue_index import QueueIndex  # noqa: E402
+from status_history import STATUS_HISTORY_CAPACITY  # noqa: E402
+from synthetic import SKILL_FORMATS, build_captures, build_dashboard, build_queue  # noqa: E402
+
+# 結果JSONの形式のバージョン（項目の意味を変えたら上げる）
+RESULT_SCHEMA = 1
+
+# API計測に使う dashboard.md の本日の戦果の行数
+API_DASHBOARD_ROWS = 1000
+
+# DashboardArchive の計測で記録する日数と、1日分のダッシュボードの本日の戦果の行数
+ARCHIVE_DAYS = 30
+ARCHIVE_ROWS = 200
+
+# Inbox の計測の前に書き込んでおくメッセージ数（圧縮の上限に近い件数）
+INBOX_MESSAGES = 90
+
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """fn 1回あたりの所要時間（マイクロ秒）を計測する
+
+    1回の計測が min_time 秒以上になるまで呼び出し回数を倍にしてから、
+    repeat 回計測した中央値と最小値を返す。
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "median_us": round(statistics.median(timings), 3),
+        "min_us": round(min(timings), 3),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def setup_fake_tmux(workdir: Path) -> None:
+    """偽の tmux とペインのキャプチャを用意し、PATH 等の環境変数を設定する
+
+    ペインごとに CLI 種別と状態（busy / idle / unknown）を順に割り当てる。
+    """
+    fake_dir = workdir / "tmux"
+    (fake_dir / "capture").mkdir(parents=True)
+    bin_dir = workdir / "bin"
+    bin_dir.mkdir()
+    shim = bin_dir / "tmux"
+    shutil.copy(Path(__file__).with_name("fake_tmux.sh"), shim)
+    shim.chmod(0o755)
+
+    topology = app_module.topology
+    cli_types = list(app_module.CLI_STATUS_INDICATORS)
+    cases = ("busy", "idle", "idle_scrolled", "unknown")
+    list_lines = []
+    for number, agent in enumerate(topology.agents()):
+        cli_type = cli_types[number % len(cli_types)]
+        capture = build_captures(cli_type, 100 if agent is topology.shogun else 50)
+        (fake_dir / "capture" / agent.target).write_text(
+            capture[cases[number % len(cases)]], encoding="utf-8"
+        )
+        session, _, rest = agent.target.partition(":")
+        window, _, pane_index = rest.partition(".")
+        # ターゲットのウィンドウ部分（番号か名前）を番号・名前の両方に入れて同じキーで引けるようにする
+        list_lines.append("\t".join([
+            session, window, window, pane_index, f"%{number}", str(10000 + number), cli_type,
+        ]))
+    (fake_dir / "list-panes").write_text("\n".join(list_lines) + "\n", encoding="utf-8")
+
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+    os.environ["FAKE_TMUX_DIR"] = str(fake_dir)
+
+
+def bench_parser(results: dict, workdir: Path, sizes: list[int], repeat: int, min_time: float) -> None:
+    for skill_format in SKILL_FORMATS:
+        for rows in sizes:
+            path = workdir / f"dashboard-{skill_format}-{rows}.md"
+            content = build_dashboard(rows, skill_format)
+            path.write_text(content, encoding="utf-8")
+            result = measure(lambda: parse_dashboard(str(path)), repeat, min_time)
+            result["lines"] = content.count("\n") + 1
+            result["bytes"] = len(content.encode("utf-8"))
+            results[f"parse_dashboard/{skill_format}/rows={rows}"] = result
+
+    cache = DashboardCache(str(workdir / f"dashboard-bullets-{sizes[-1]}.md"))
+    cache.get()
+    results[f"dashboard_cache_hit/rows={sizes[-1]}"] = measure(cache.get, repeat, min_time)
+
+
+def bench_queue(results: dict, workdir: Path, repeat: int, min_time: float) -> None:
+    root = workdir / "queue"
+    build_queue(root, commands=200)
+    results["queue_index/load (200 cmds, 8 ashigaru)"] = measure(
+        lambda: QueueIndex(str(root)).refresh(), repeat, min_time
+    )
+    index = QueueIndex(str(root))
+    index.refresh()
+    results["queue_index/rescan unchanged"] = measure(lambda: index.refresh(force=True), repeat, min_time)
+    results["queue_index/find_tasks cmd+status"] = measure(
+        lambda: index.find_tasks(cmd="cmd_200", status=["assigned", "done"]), repeat, min_time
+    )
+
+
+def bench_inbox(results: dict, workdir: Path, repeat: int, min_time: float) -> None:
+    inbox = Inbox(str(workdir / "inbox" / "karo.yaml"), persist_cursor=False)
+    for number in range(INBOX_MESSAGES):
+        inbox.append(f"足軽{number % 8 + 1}号、任務完了でござる。報告書を確認されよ。", "report_received", "ashigaru1")
+        if number < INBOX_MESSAGES - 5:
+            inbox.mark_read()
+    results[f"inbox/append ({INBOX_MESSAGES} msgs)"] = measure(
+        lambda: inbox.append("足軽1号、任務完了", "report_received", "ashigaru1"), repeat, min_time
+    )
+    inbox.mark_read()
+    inbox.append("足軽1号、任務完了", "report_received", "ashigaru1")
+    results["inbox/unread_count"] = measure(inbox.unread_count, repeat, min_time)
+    results["inbox/peek_unread_count unchanged"] = measure(inbox.peek_unread_count, repeat, min_time)
+
+
+def bench_archive(results: dict, workdir: Path, repeat: int, min_time: float) -> None:
+    archive = DashboardArchive(str(workdir / "archive.sqlite3"))
+    # 日ごとに書き換わるダッシュボードを30日分記録してから検索する
+    for day in range(ARCHIVE_DAYS):
+        content = build_dashboard(ARCHIVE_ROWS).replace("内容", f"内容 day{day:02d}")
+        archive.record(parse_dashboard_content(content), now=day * 86400.0)
+    data = parse_dashboard_content(build_dashboard(ARCHIVE_ROWS))
+    results[f"archive/record unchanged ({ARCHIVE_ROWS} rows)"] = measure(
+        lambda: archive.record(data), repeat, min_time
+    )
+    results[f"archive/search fts ({ARCHIVE_DAYS} days)"] = measure(
+        lambda: archive.search("指令12の内容 day07"), repeat, min_time
+    )
+    results[f"archive/search like ({ARCHIVE_DAYS} days)"] = measure(
+        lambda: archive.search("12"), repeat, min_time
+    )
+    archive.close()
+
+
+def bench_panes(results: dict, repeat: int, min_time: float) -> None:
+    for cli_type in app_module.CLI_STATUS_INDICATORS:
+        for case, capture in build_captures(cli_type, 50).items():
+            results[f"filter_pane_output/{cli_type}/{case}"] = measure(
+                lambda: app_module.filter_pane_output(capture), repeat, min_time
+            )
+            results[f"detect_pane_status/{cli_type}/{case}"] = measure(
+                lambda: app_module.detect_pane_status(capture, cli_type), repeat, min_time
+            )
+
+
+def bench_api(results: dict, workdir: Path, repeat: int, min_time: float) -> None:
+    from fastapi.testclient import TestClient
+
+    dashboard = workdir / "dashboard-api.md"
+    dashboard.write_text(build_dashboard(API_DASHBOARD_ROWS), encoding="utf-8")
+    os.environ["SHOGUN_DASHBOARD_PATH"] = str(dashboard)
+    os.environ["SHOGUN_GUI_TMUX_CONTROL"] = "0"
+    # 初回のサンプリング以降は計測中に裏でサンプリングが走らないようにする
+    os.environ["SHOGUN_GUI_SAMPLE_INTERVAL"] = "3600"
+    os.environ["SHOGUN_GUI_STATUS_HISTORY"] = str(STATUS_HISTORY_CAPACITY)
+    os.environ.pop("GUI_API_KEY", None)
+
+    with TestClient(app_module.app) as client:
+        etag = client.get("/api/dashboard").headers["etag"]
+        dashboard_cursor = client.get("/api/dashboard/diff").json()["cursor"]
+        pane_cursor = client.get("/api/ashigaru/ashigaru1/output").json()["cursor"]
+        page_etag = client.get("/").headers["etag"]
+        script = app_module.static_assets.get("app.js")
+
+        requests: dict[str, tuple[Callable, int]] = {
+            "GET /api/dashboard": (lambda: client.get("/api/dashboard"), 200),
+            "GET /api/dashboard (304)": (
+                lambda: client.get("/api/dashboard", headers={"If-None-Match": etag}), 304
+            ),
+            "GET /api/dashboard/diff?since": (
+                lambda: client.get("/api/dashboard/diff", params={"since": dashboard_cursor}), 200
+            ),
+            "GET /api/pane/shogun": (lambda: client.get("/api/pane/shogun"), 200),
+            "GET /api/pane/karo": (lambda: client.get("/api/pane/karo"), 200),
+            "GET /api/ashigaru/{id}/output": (lambda: client.get("/api/ashigaru/ashigaru1/output"), 200),
+            "GET /api/ashigaru/{id}/output?cursor": (
+                lambda: client.get("/api/ashigaru/ashigaru1/output", params={"cursor": pane_cursor}), 200
+            ),
+            "GET /api/pane/ashigaru/status": (lambda: client.get("/api/pane/ashigaru/status"), 200),
+            "GET /api/cli-config": (lambda: client.get("/api/cli-config"), 200),
+            "GET /api/status/history": (lambda: client.get("/api/status/history"), 200),
+            "GET /metrics": (lambda: client.get("/metrics"), 200),
+            "GET /": (lambda: client.get("/"), 200),
+            "GET / (304)": (lambda: client.get("/", headers={"If-None-Match": page_etag}), 304),
+            "GET /static/app.js?v": (
+                lambda: client.get("/static/app.js", params={"v": script.version}), 200
+            ),
+        }
+        for name, (request, expected) in requests.items():
+            status = request().status_code
+            if status != expected:
+                raise RuntimeError(f"{name}: expected HTTP {expected}, got {status}")
+            results[f"api/{name}"] = measure(request, repeat, min_time)
+
+        # /api/command はキューに入れるだけなので、送信（send-keys 2回）を直接計測する
+        shogun = app_module.topology.shogun.target
+        results["command/deliver (fake tmux)"] = measure(
+            lambda: client.portal.call(app_module.deliver_command, shogun, "echo bench"), repeat, min_time
+        )
+
+        # 全ペインのサンプリング1回分（偽の tmux のプロセス起動を含む）
+        results["sampler/refresh (fake tmux)"] = measure(
+            lambda: client.portal.call(app_module.pane_sampler.refresh), repeat, min_time
+        )
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """baseline より threshold 倍を超えて遅くなった項目を表示して返す
+
+    比較には最小値を使う（他のプロセスの影響を受けにくく、中央値よりぶれが小さい）。
+    """
+    regressions = []
+    print(f"{'benchmark':<60} {'baseline us':>12} {'current us':>12} {'ratio':>7}", file=sys.stderr)
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        ratio = result["min_us"] / before["min_us"] if before["min_us"] else 1.0
+        mark = ""
+        if ratio > threshold:
+            regressions.append(name)
+            mark = "  REGRESSION"
+        print(
+            f"{name:<60} {before['min_us']:>12.2f} {result['min_us']:>12.2f} {ratio:>6.2f}x{mark}",
+            file=sys.stderr,
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-agent-shogun-gui benchmark suite")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated 本日の戦果 row counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per benchmark (median is reported)")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per measurement")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes and fewer repeats (smoke run)")
+    parser.add_argument("--output", help="Write the JSON result to this file (default: stdout)")
+    parser.add_argument("--compare", help="Baseline JSON result to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=1.25,
+        help="Slowdown ratio (of the per-call minimum) reported as a regression (default: 1.25)",
+    )
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    repeat, min_time = args.repeat, args.min_time
+    if args.quick:
+        sizes, repeat, min_time = [10, 100, 1000], 3, 0.01
+
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="shogun-gui-bench-") as tmp:
+        workdir = Path(tmp)
+        setup_fake_tmux(workdir)
+        bench_parser(results, workdir, sizes, repeat, min_time)
+        bench_queue(results, workdir, repeat, min_time)
+        bench_inbox(results, workdir, repeat, min_time)
+        bench_archive(results, workdir, repeat, min_time)
+        bench_panes(results, repeat, min_time)
+        bench_api(results, workdir, repeat, min_time)
+
+    report = {
+        "schema": RESULT_SCHEMA,
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "sizes": sizes,
+            "repeat": repeat,
+            "min_time": min_time,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline.get("schema") != RESULT_SCHEMA:
+            print(f"Error: baseline schema {baseline.get('schema')} != {RESULT_SCHEMA}", file=sys.stderr)
+            return 1
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold}x", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
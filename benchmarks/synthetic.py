@@ -0,0 +1,135 @@
+"""ベンチマーク用の合成データ（dashboard.md・ペインのキャプチャ・queue/ のYAML）"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import CLI_STATUS_INDICATORS  # noqa: E402
+
+# パーサーが対応しているスキル化候補の3形式
+SKILL_FORMATS = ("headings", "bullets", "table")
+
+
+def build_dashboard(rows: int, skill_format: str = "bullets") -> str:
+    """本日の戦果 rows 行・完了報告 rows/2 件を含む dashboard.md を生成する
+
+    Args:
+        skill_format: スキル化候補の書式（SKILL_FORMATS のいずれか）
+    """
+    lines = [
+        "# 📊 戦況報告",
+        "最終更新: 2026-10-18 10:00",
+        "",
+        "## 🚨 要対応 - 殿のご判断をお待ちしております",
+        "**【承認】スキル化候補の確認**",
+        "詳細はスキル化候補セクション参照",
+        "---",
+        "",
+        "## 🔄 進行中 - 只今、戦闘中でござる",
+        "| 担当 | プロジェクト | タスク | 状態 |",
+        "|------|------|------|------|",
+    ]
+    for i in range(1, 9):
+        lines.append(f"| 足軽{i} | gui | タスク{i} | 作業中 |")
+
+    lines += [
+        "",
+        "## ✅ 本日の戦果",
+        "| 時刻 | 戦場 | 任務 | 結果 |",
+        "|------|------|------|------|",
+    ]
+    for i in range(rows):
+        lines.append(f"| {i // 60 % 24:02d}:{i % 60:02d} | gui | 任務{i} | 完了 |")
+    for i in range(rows // 2):
+        lines += [
+            "",
+            f"### cmd_{i:04d} 完了報告",
+            f"**指令**: 指令{i}の内容",
+            f"**結果**: 結果{i}の内容",
+        ]
+
+    lines += ["", "## 🎯 スキル化候補 - 承認待ち"]
+    lines += build_skill_candidates(max(rows // 10, 1), skill_format)
+
+    lines += ["", "## ⏸️ 待機中", "- 足軽5", "", "## ❓ 伺い事項", "なし", ""]
+    return "\n".join(lines)
+
+
+def build_skill_candidates(count: int, skill_format: str) -> list[str]:
+    """スキル化候補セクションの本文を指定の形式で count 件生成する"""
+    lines = []
+    if skill_format == "headings":
+        # ### 見出し + 項目テーブル
+        for i in range(count):
+            lines += [
+                f"### skill-{i}（新規）",
+                "| 項目 | 内容 |",
+                "|------|------|",
+                f"| 説明 | 説明{i} |",
+                f"| 発見元 | cmd_{i:04d} / 足軽{i % 8 + 1} |",
+                "| 汎用性 | 高 |",
+                "",
+            ]
+    elif skill_format == "bullets":
+        for i in range(count):
+            lines.append(f"- **skill-{i}**（cmd_{i:04d} / 足軽{i % 8 + 1}）— 説明{i}")
+    elif skill_format == "table":
+        lines += ["| スキル名 | 概要 | 検出元 | 状態 |", "|------|------|------|------|"]
+        for i in range(count):
+            lines.append(f"| skill-{i} | 説明{i} | cmd_{i:04d} | 承認待ち |")
+    else:
+        raise ValueError(f"Unknown skill format: {skill_format}")
+    return lines
+
+
+def build_captures(cli_type: str, lines: int) -> dict[str, str]:
+    """CLI種別ごとの典型的なキャプチャ（busy / idle / unknown）を生成する"""
+    body = [f"  ログ出力 {i}: src/module_{i % 7}.py を更新しました" for i in range(lines - 6)]
+    prompt = CLI_STATUS_INDICATORS[cli_type]["prompts"][0]
+    return {
+        "busy": "\n".join(body + ["", "⠹ Thinking… (12s · esc to interrupt)", "", "", "", ""]),
+        "idle": "\n".join(body + ["─" * 40, f"{prompt} ", "─" * 40, "  ⏵⏵ bypass permissions on", ""]),
+        # プロンプトが末尾から押し出され、キャプチャの先頭付近にだけ残っている
+        "idle_scrolled": "\n".join([f"{prompt} 前の指示"] + body + ["", "出力の続き", "", "", ""]),
+        "unknown": "\n".join(body + ["$ ls", "app.py  panes.py", "$ ", ""]),
+    }
+
+
+def build_queue(root: Path, commands: int, ashigaru: int = 8) -> None:
+    """queue/ の指示・タスク・報告のYAMLを生成する
+
+    指示 commands 件を shogun_to_karo.yaml に書き、足軽ごとのタスクYAMLに最新の
+    タスク、報告YAMLにその1つ前のタスクの報告を置く（実機と同じ1人1ファイル）。
+    """
+    (root / "tasks").mkdir(parents=True, exist_ok=True)
+    (root / "reports").mkdir(parents=True, exist_ok=True)
+    lines = ["queue:"]
+    for number in range(1, commands + 1):
+        lines += [
+            f"  - id: cmd_{number:03d}",
+            f'    timestamp: "2026-10-18T{number % 24:02d}:00:00"',
+            f'    purpose: "合成した指示 {number}"',
+            "    acceptance_criteria:",
+            '      - "テストが通ること"',
+            "    command: |",
+            f"      指示 {number} の詳細",
+            "    project: bench",
+            "    priority: medium",
+            f"    status: {'done' if number < commands else 'in_progress'}",
+        ]
+    (root / "shogun_to_karo.yaml").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    for number in range(1, ashigaru + 1):
+        cmd = f"cmd_{max(commands - number % 3, 1):03d}"
+        (root / "tasks" / f"ashigaru{number}.yaml").write_text(
+            f"task:\n  task_id: subtask_{number:03d}b\n  parent_cmd: {cmd}\n"
+            f'  description: "足軽{number}の作業"\n  status: assigned\n'
+            f'  timestamp: "2026-10-18T10:00:00"\n',
+            encoding="utf-8",
+        )
+        (root / "reports" / f"ashigaru{number}_report.yaml").write_text(
+            f"worker_id: ashigaru{number}\ntask_id: subtask_{number:03d}a\nparent_cmd: {cmd}\n"
+            f'timestamp: "2026-10-18T09:00:00"\nstatus: done\nresult:\n  summary: "完了"\n'
+            f"skill_candidate:\n  found: false\n",
+            encoding="utf-8",
+        )
@@ -0,0 +1,237 @@
+"""ペインへの指示の送信キュー（ペインごとに1つの書き手・idle になってから送信）"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import metrics
+
+# ペインごとに溜められる未送信の指示の上限（超えると 429）
+COMMAND_QUEUE_DEPTH = 32
+
+# 送信済み・失敗した指示の記録を残す件数（ステータスの問い合わせ用）
+COMMAND_RECORDS = 256
+
+# ペインが idle になるのを待つ上限（秒）。超えた指示は失敗にする
+COMMAND_IDLE_TIMEOUT = 120.0
+
+# ステータスを判定できない（unknown）状態がこの秒数続いたら、idle を待たずに送信する
+# （ステータス表示に対応していない CLI や、プロンプトが画面外に流れた場合）
+COMMAND_UNKNOWN_GRACE = 5.0
+
+# idle になったかを確認する間隔（秒）
+COMMAND_POLL_INTERVAL = 0.5
+
+# 送信後、CLI が入力を受け付けて busy 表示になるまでの猶予（秒）。
+# この間に取得したキャプチャは送信前の idle 表示のことがあるため、次の指示の判定に使わない
+COMMAND_SETTLE = 1.0
+
+COMMANDS = metrics.counter(
+    "shogun_gui_commands_total",
+    "Commands accepted by /api/command, by final result (delivered, failed, rejected)",
+    ("result",),
+)
+COMMAND_DELIVERY_LATENCY = metrics.histogram(
+    "shogun_gui_command_delivery_latency_seconds",
+    "Seconds from queueing a command until it was typed into the pane",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+COMMAND_QUEUE_LENGTH = metrics.gauge(
+    "shogun_gui_command_queue_length",
+    "Commands waiting to be delivered, by target pane",
+    ("target",),
+)
+
+
+class CommandQueueFull(Exception):
+    """ペインの未送信の指示が上限に達している"""
+
+
+class CommandDeliveryError(Exception):
+    """指示を送信できなかった（メッセージは利用者向けのエラー文）"""
+
+
+@dataclass
+class QueuedCommand:
+    """キューに入った指示1件"""
+    id: str
+    command: str
+    target: str
+    status: str = "queued"
+    queued_at: float = 0.0
+    delivered_at: Optional[float] = None
+    error: Optional[str] = None
+    # 送信を待つ間に最後に確認したペインのステータス（idle / busy / unknown）
+    pane_status: Optional[str] = None
+
+    @property
+    def latency(self) -> Optional[float]:
+        """キューに入ってから送信し終えるまでの秒数"""
+        if self.delivered_at is None:
+            return None
+        return self.delivered_at - self.queued_at
+
+    def to_dict(self, position: Optional[int] = None) -> dict:
+        return {
+            "id": self.id,
+            "command": self.command,
+            "target": self.target,
+            "status": self.status,
+            "position": position,
+            "queued_at": self.queued_at,
+            "delivered_at": self.delivered_at,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "error": self.error,
+            "pane_status": self.pane_status,
+        }
+
+
+class CommandQueue:
+    """ペインごとの指示のキュー
+
+    ペインごとに送信タスクを1つだけ動かし、指示を受け付けた順に1件ずつ送る。
+    複数の利用者が同時に送っても文字と Enter が混ざらず、CLI が作業中の間に
+    届いた指示は idle になるまで待ってから送る。送信タスクはキューが空になると
+    終わり、次の指示で作り直す。
+
+    Args:
+        deliver: ペインに指示を入力する関数（失敗時は CommandDeliveryError）
+        pane_status: ペインのステータスを返す関数。第2引数の時刻以降に取得した
+            キャプチャで判定すること（取得できない場合は CommandDeliveryError）
+        max_depth: ペインごとの未送信の指示の上限
+        idle_timeout: idle になるのを待つ上限（秒）
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[str, str], Awaitable[None]],
+        pane_status: Callable[[str, float], Awaitable[str]],
+        max_depth: int = COMMAND_QUEUE_DEPTH,
+        idle_timeout: float = COMMAND_IDLE_TIMEOUT,
+    ):
+        self.deliver = deliver
+        self.pane_status = pane_status
+        self.max_depth = max_depth
+        self.idle_timeout = idle_timeout
+        self.commands: OrderedDict[str, QueuedCommand] = OrderedDict()
+        self._pending: dict[str, deque[QueuedCommand]] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        # ペイン → この時刻以降のキャプチャでないと idle とみなさない（time.time()）
+        self._settle_until: dict[str, float] = {}
+
+    def submit(self, target: str, command: str) -> QueuedCommand:
+        """指示をキューに入れて、すぐに返す
+
+        Raises:
+            CommandQueueFull: ペインの未送信の指示が max_depth 件に達している場合
+        """
+        pending = self._pending.setdefault(target, deque())
+        if len(pending) >= self.max_depth:
+            COMMANDS.inc("rejected")
+            raise CommandQueueFull(f"Command queue for {target} is full ({self.max_depth} pending)")
+
+        queued = QueuedCommand(os.urandom(8).hex(), command, target, queued_at=time.time())
+        pending.append(queued)
+        self.commands[queued.id] = queued
+        self._trim()
+
+        worker = self._workers.get(target)
+        if worker is None or worker.done():
+            self._workers[target] = asyncio.create_task(self._run(target))
+        return queued
+
+    def get(self, command_id: str) -> Optional[QueuedCommand]:
+        return self.commands.get(command_id)
+
+    def position(self, queued: QueuedCommand) -> Optional[int]:
+        """先に送られる指示の件数（0 なら次に送る。送信済み・失敗なら None）"""
+        if queued.status not in ("queued", "delivering"):
+            return None
+        for index, pending in enumerate(self._pending.get(queued.target, ())):
+            if pending is queued:
+                return index
+        return None
+
+    def describe(self, queued: QueuedCommand) -> dict:
+        return queued.to_dict(self.position(queued))
+
+    def depths(self) -> dict[tuple[str], int]:
+        """ペインごとの未送信の指示の件数（メトリクス用）"""
+        return {(target,): len(pending) for target, pending in self._pending.items()}
+
+    async def close(self) -> None:
+        """送信タスクを止め、未送信の指示を失敗にする"""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        for pending in self._pending.values():
+            while pending:
+                self._finish(pending.popleft(), error="Server is shutting down")
+
+    async def _run(self, target: str) -> None:
+        pending = self._pending[target]
+        while pending:
+            queued = pending[0]
+            try:
+                await self._wait_idle(queued)
+                queued.status = "delivering"
+                await self.deliver(target, queued.command)
+            except Exception as e:
+                pending.popleft()
+                self._finish(queued, error=str(e) or type(e).__name__)
+                continue
+            pending.popleft()
+            self._finish(queued)
+            self._settle_until[target] = time.time() + COMMAND_SETTLE
+
+    async def _wait_idle(self, queued: QueuedCommand) -> None:
+        """ペインが idle になるまで待つ（unknown が COMMAND_UNKNOWN_GRACE 秒続いた場合も返る）"""
+        target = queued.target
+        deadline = time.monotonic() + self.idle_timeout
+        unknown_since = None
+        not_before = self._settle_until.get(target, 0.0)
+        delay = not_before - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        while True:
+            status = await self.pane_status(target, not_before)
+            queued.pane_status = status
+            if status == "idle":
+                return
+            if status != "unknown":
+                unknown_since = None
+            elif unknown_since is None:
+                unknown_since = time.monotonic()
+            elif time.monotonic() - unknown_since >= COMMAND_UNKNOWN_GRACE:
+                return
+            if time.monotonic() >= deadline:
+                raise CommandDeliveryError(
+                    f"Pane did not become idle within {self.idle_timeout:g}s (last status: {status})"
+                )
+            await asyncio.sleep(COMMAND_POLL_INTERVAL)
+
+    def _finish(self, queued: QueuedCommand, error: Optional[str] = None) -> None:
+        if error is None:
+            queued.status = "delivered"
+            queued.delivered_at = time.time()
+            COMMANDS.inc("delivered")
+            COMMAND_DELIVERY_LATENCY.observe(queued.latency)
+        else:
+            queued.status = "failed"
+            queued.error = error
+            COMMANDS.inc("failed")
+
+    def _trim(self) -> None:
+        """古い送信済み・失敗の記録を COMMAND_RECORDS 件まで減らす（未送信のものは残す）"""
+        excess = len(self.commands) - COMMAND_RECORDS
+        if excess <= 0:
+            return
+        for command_id in [
+            command_id for command_id, queued in self.commands.items()
+            if queued.status in ("delivered", "failed")
+        ][:excess]:
+            del self.commands[command_id]
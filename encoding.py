@@ -0,0 +1,143 @@
+"""レスポンス本文のエンコード（JSON のシリアライズと gzip / brotli 圧縮）
+
+- JSON: orjson があれば使う（標準の json より数倍速い）。出力は標準の json の
+  ensure_ascii=False・区切り文字を詰めた形と同じ（日本語はエスケープしない）
+- 圧縮: Accept-Encoding から br（brotli があれば）/ gzip を選ぶ。
+  min_size バイト未満の本文は圧縮しない（小さい本文は圧縮の手間に見合わない）
+- キャッシュ: 圧縮した本文を ETag（本文のハッシュ）ごとに保持し、同じ本文を
+  何人が取得しても圧縮は1回にする
+
+orjson・brotli はどちらも任意（requirements.txt には含めない）。
+"""
+import gzip
+import json
+from collections import OrderedDict
+from typing import Any, Optional
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# この大きさ（バイト）未満の本文は圧縮しない
+COMPRESS_MIN_SIZE = 1024
+
+# 圧縮レベル（毎回圧縮する本文向けに、速度と圧縮率の釣り合う値）
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# 圧縮済みの本文を保持する件数
+COMPRESSED_CACHE_ENTRIES = 256
+
+# 使える圧縮方式（同じ q 値ならこの順に選ぶ）
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+RESPONSE_BYTES = metrics.counter(
+    "shogun_gui_response_bytes_total",
+    "JSON response body bytes sent, by content encoding (identity, gzip, br)",
+    ("encoding",),
+)
+COMPRESSION_CACHE_REQUESTS = metrics.counter(
+    "shogun_gui_compression_cache_requests_total",
+    "Compressed response body lookups by result (hit, miss)",
+    ("result",),
+)
+
+
+def dumps(content: Any) -> bytes:
+    """JSON にする（orjson が扱えない値は標準の json で）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # 64ビットを超える整数など
+            pass
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def negotiate(accept_encoding: Optional[str]) -> str:
+    """Accept-Encoding から圧縮方式を選ぶ（"br" / "gzip"。使えるものがなければ "identity"）"""
+    if not accept_encoding:
+        return "identity"
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    chosen, chosen_weight = "identity", 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > chosen_weight:
+            chosen, chosen_weight = encoding, weight
+    return chosen
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0: 同じ本文からは同じバイト列にする
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """圧縮した本文の ETag（'"<hash>"' → '"<hash>-gzip"'。圧縮しない場合はそのまま）"""
+    if encoding == "identity" or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+class ResponseEncoder:
+    """JSON レスポンスの圧縮方式の選択と、圧縮した本文のキャッシュ
+
+    Args:
+        min_size: この大きさ（バイト）未満の本文は圧縮しない（0 なら圧縮しない）
+    """
+
+    def __init__(self, min_size: int = COMPRESS_MIN_SIZE, cache_entries: int = COMPRESSED_CACHE_ENTRIES):
+        self.min_size = min_size
+        self.cache_entries = cache_entries
+        # (ETag, 圧縮方式) → 圧縮した本文
+        self._compressed: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+    def choose(self, size: int, accept_encoding: Optional[str]) -> str:
+        """本文の大きさと Accept-Encoding から圧縮方式を選ぶ"""
+        if self.min_size <= 0 or size < self.min_size:
+            return "identity"
+        return negotiate(accept_encoding)
+
+    def encode(self, body: bytes, encoding: str, etag: Optional[str] = None) -> bytes:
+        """本文を圧縮する（etag があれば同じ本文の圧縮結果を使い回す）"""
+        if encoding == "identity":
+            encoded = body
+        elif etag is None:
+            encoded = compress(body, encoding)
+        else:
+            key = (etag, encoding)
+            encoded = self._compressed.get(key)
+            if encoded is not None:
+                self._compressed.move_to_end(key)
+                COMPRESSION_CACHE_REQUESTS.inc("hit")
+            else:
+                COMPRESSION_CACHE_REQUESTS.inc("miss")
+                encoded = self._compressed[key] = compress(body, encoding)
+                while len(self._compressed) > self.cache_entries:
+                    self._compressed.popitem(last=False)
+        RESPONSE_BYTES.inc(encoding, amount=len(encoded))
+        return encoded
@@ -0,0 +1,422 @@
+"""エージェントのメールボックス（queue/inbox/<agent>.yaml）の追記型ストア
+
+inbox_write.sh / inbox_watcher.sh は従来、メッセージ1通・既読化1回ごとに
+ファイル全体を yaml.safe_load して yaml.dump し直していた。ここでは:
+
+- 追記: メッセージは1キー1行の決まった書式のレコードとしてファイル末尾に追記する
+  （ファイル全体は読まない）。エージェントは今まで通りYAMLとして Read できる。
+- 既読化: "read: false" の "false" を同じ長さの "true " で上書きする（書き直さない）。
+  エージェントが Edit ツールで read: true にする運用もそのまま使える。
+- 既読カーソル: 「ここより前のレコードはすべて既読」というバイト位置を
+  <agent>.cursor に保存し、未読の数え上げはそれ以降のテキストだけを走査する。
+  YAMLとしてパースするのは未読レコードの本文が必要な時だけ。
+- 圧縮: レコードが INBOX_COMPACT_AT 件を超えたら、未読すべてと新しい既読
+  INBOX_KEEP_READ 件だけを残して書き直す（残し方は従来の「50件を超えたら
+  未読 + 既読30件」と同じ。書き直しの回数を減らすため上限を広げた）。
+
+書き込みは従来のスクリプトと同じ <agent>.yaml.lock の flock で排他する。
+
+CLI（shogun/scripts から使う）:
+    python3 inbox.py write <inbox.yaml> <content> [--type T] [--from F]
+    python3 inbox.py unread <inbox.yaml> [--take-specials]
+    python3 inbox.py mark-read <inbox.yaml> [--id ID ...]
+    python3 inbox.py compact <inbox.yaml>
+"""
+import argparse
+import fcntl
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+import yaml
+
+# レコードがこの件数を超えたら圧縮する
+INBOX_COMPACT_AT = 100
+
+# ファイルがこのバイト数未満ならレコードを数えない（追記のたびに全体を読まないように）
+INBOX_COMPACT_CHECK_BYTES = 16 * 1024
+
+# 圧縮後に残す既読メッセージの件数（未読はすべて残す）
+INBOX_KEEP_READ = 30
+
+# ロックを待つ上限（秒。従来の flock -w 5 と同じ）
+INBOX_LOCK_TIMEOUT = 5.0
+
+# 既読化せず watcher が send-keys で直接届ける種類
+SPECIAL_TYPES = ("clear_command", "model_switch")
+
+# レコードを書く時のキーの順（それ以外のキーは後ろに続ける）
+RECORD_KEYS = ("id", "from", "timestamp", "type", "content", "read")
+
+INBOX_HEADER = "messages:\n"
+
+# C実装のローダーがあれば使う
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# レコードの先頭（"messages:" 直下のリスト要素）と、レコードの read キー。
+# yaml.dump の書式（キーがアルファベット順）でも、本文の折り返し行は4桁以上
+# 字下げされるため、2桁字下げの "read:" はレコード自身のキーに限られる
+_RECORD_START = re.compile(rb"^- ", re.MULTILINE)
+_READ_FALSE = re.compile(rb"^(?:- |  )read: (false)[ \t]*\r?$", re.MULTILINE)
+_READ_TRUE = re.compile(rb"^(?:- |  )read: true\b", re.MULTILINE)
+
+# 二重引用符のYAML文字列で改行として扱われるため、JSONのままでは書けない文字
+_YAML_LINE_BREAKS = {"\u0085": "\\N", "\u2028": "\\L", "\u2029": "\\P"}
+
+
+def _scalar(value) -> str:
+    """1行に収まるYAMLの値（文字列・リスト等はJSON互換の二重引用符・フロー形式）"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    text = json.dumps(value, ensure_ascii=False)
+    for char, escape in _YAML_LINE_BREAKS.items():
+        text = text.replace(char, escape)
+    return text
+
+
+def format_record(message: dict) -> bytes:
+    """メッセージを1キー1行のレコードにする"""
+    keys = [key for key in RECORD_KEYS if key in message]
+    keys += [key for key in message if key not in RECORD_KEYS]
+    lines = [
+        f"{'- ' if number == 0 else '  '}{key}: {_scalar(message[key])}"
+        for number, key in enumerate(keys)
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def new_message_id(now: Optional[datetime] = None) -> str:
+    """inbox_write.sh と同じ形式のメッセージID"""
+    now = now or datetime.now()
+    return f"msg_{now:%Y%m%d_%H%M%S}_{os.urandom(4).hex()}"
+
+
+class Inbox:
+    """1エージェント分のメールボックス
+
+    Args:
+        path: queue/inbox/<agent>.yaml
+        persist_cursor: 既読カーソルを <agent>.cursor に保存するか（CLI用。
+            常駐プロセスはメモリ上に持てば足りる）
+    """
+
+    def __init__(self, path: str, persist_cursor: bool = True):
+        self.path = Path(path)
+        self.lock_path = Path(f"{path}.lock")
+        self.cursor_path = self.path.with_suffix(".cursor")
+        self.persist_cursor = persist_cursor
+        # (inode, バイト位置, 位置の直前のバイト列)。直前のバイト列が一致しない場合は
+        # ファイルが書き換えられたとみなして先頭から数え直す
+        self._cursor: Optional[tuple[int, int, str]] = None
+        # peek_unread_count 用: ((inode, mtime_ns, size), 件数)
+        self._counted: Optional[tuple[tuple[int, int, int], int]] = None
+
+    @contextmanager
+    def _locked(self, timeout: float = INBOX_LOCK_TIMEOUT):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"Timed out waiting for {self.lock_path}")
+                    time.sleep(0.05)
+            yield
+        finally:
+            os.close(fd)
+
+    # ─── 書き込み ───
+
+    def append(self, content: str, type: str = "wake_up", sender: str = "unknown") -> dict:
+        """メッセージを追記する（ファイル全体は読まない）"""
+        message = {
+            "id": new_message_id(),
+            "from": sender,
+            "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            "type": type,
+            "content": content,
+            "read": False,
+        }
+        with self._locked():
+            self._ensure_appendable()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, format_record(message))
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            if size >= INBOX_COMPACT_CHECK_BYTES and self._needs_compaction():
+                self._compact()
+        return message
+
+    def _ensure_appendable(self) -> None:
+        """末尾にレコードを追記できる形（"messages:" のブロック形式で改行終わり）にする"""
+        try:
+            with open(self.path, "rb") as f:
+                head = f.read(4096)
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size:
+                    f.seek(size - 1)
+                    last = f.read(1)
+        except FileNotFoundError:
+            self._replace(INBOX_HEADER.encode("utf-8"))
+            return
+
+        first = next(
+            (line.strip() for line in head.splitlines() if line.strip() and not line.startswith(b"#")),
+            b"",
+        )
+        if first == b"messages:":
+            if size and last != b"\n":
+                with open(self.path, "ab") as f:
+                    f.write(b"\n")
+            return
+        if first in (b"", b"messages: []", b"messages:[]", b"messages: null"):
+            self._replace(INBOX_HEADER.encode("utf-8"))
+            return
+        # フロー形式など追記できない書式はパースして書き直す（初回のみ）
+        self._rewrite(self._load_messages())
+
+    def mark_read(self, ids: Optional[Iterable[str]] = None, types: Optional[Iterable[str]] = None) -> list[dict]:
+        """未読メッセージを既読にする（"false" を "true " で上書きし、ファイルは書き直さない）
+
+        Args:
+            ids: 既読にするメッセージID（省略時はすべて）
+            types: 既読にするメッセージの種類（省略時はすべて）
+
+        Returns:
+            既読にしたメッセージ
+        """
+        wanted_ids = set(ids) if ids is not None else None
+        wanted_types = set(types) if types is not None else None
+        with self._locked():
+            marked = []
+            positions = []
+            for message, position in self._unread_records():
+                if wanted_ids is not None and message.get("id") not in wanted_ids:
+                    continue
+                if wanted_types is not None and message.get("type") not in wanted_types:
+                    continue
+                message["read"] = True
+                marked.append(message)
+                positions.append(position)
+            if positions:
+                with open(self.path, "r+b") as f:
+                    for position in positions:
+                        f.seek(position)
+                        f.write(b"true ")
+        return marked
+
+    def take_specials(self) -> tuple[int, list[dict]]:
+        """send-keys で直接届ける種類の未読を既読にして返す
+
+        Returns:
+            (それ以外の未読の件数, 既読にした特別なメッセージ)
+        """
+        specials = self.mark_read(types=SPECIAL_TYPES)
+        return self.unread_count(), specials
+
+    def compact(self) -> bool:
+        """未読すべてと新しい既読 INBOX_KEEP_READ 件だけを残す（減らなければ書き直さない）"""
+        with self._locked():
+            return self._compact()
+
+    def _compact(self) -> bool:
+        messages = self._load_messages()
+        unread = [m for m in messages if not m.get("read", False)]
+        read = [m for m in messages if m.get("read", False)]
+        if len(read) <= INBOX_KEEP_READ:
+            return False
+        kept = set(map(id, unread + read[-INBOX_KEEP_READ:]))
+        self._rewrite([m for m in messages if id(m) in kept])
+        return True
+
+    def _rewrite(self, messages: list[dict]) -> None:
+        body = INBOX_HEADER.encode("utf-8") + b"".join(format_record(m) for m in messages)
+        self._replace(body)
+
+    def _replace(self, body: bytes) -> None:
+        """tmpファイル + rename で置き換える（読み手が書きかけの内容を見ないように）"""
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, self.path)
+        self._cursor = None
+
+    # ─── 読み込み ───
+
+    def _read(self) -> tuple[int, bytes]:
+        try:
+            with open(self.path, "rb") as f:
+                return os.fstat(f.fileno()).st_ino, f.read()
+        except FileNotFoundError:
+            return 0, b""
+
+    def _start(self, inode: int, data: bytes) -> int:
+        """既読カーソルの位置（検証できなければ 0）"""
+        cursor = self._cursor
+        if cursor is None and self.persist_cursor:
+            try:
+                saved = json.loads(self.cursor_path.read_text(encoding="utf-8"))
+                cursor = (int(saved["inode"]), int(saved["offset"]), str(saved["anchor"]))
+            except (OSError, ValueError, KeyError, TypeError):
+                cursor = None
+        if cursor is None:
+            return 0
+        cursor_inode, offset, anchor = cursor
+        anchor_bytes = anchor.encode("latin-1")
+        if (
+            cursor_inode != inode
+            or offset > len(data)
+            or data[max(offset - len(anchor_bytes), 0):offset] != anchor_bytes
+        ):
+            return 0
+        return offset
+
+    def _advance(self, inode: int, data: bytes, offset: int) -> None:
+        """既読カーソルを offset に進める（変わらなければ保存しない）"""
+        anchor = data[max(offset - 32, 0):offset].decode("latin-1")
+        cursor = (inode, offset, anchor)
+        if cursor == self._cursor:
+            return
+        self._cursor = cursor
+        if self.persist_cursor:
+            tmp = self.cursor_path.with_name(f".{self.cursor_path.name}.{os.getpid()}.tmp")
+            try:
+                tmp.write_text(json.dumps({"inode": inode, "offset": offset, "anchor": anchor}), encoding="utf-8")
+                os.replace(tmp, self.cursor_path)
+            except OSError:
+                pass
+
+    def unread_count(self) -> int:
+        """未読の件数（既読カーソル以降のテキストだけを走査し、YAMLはパースしない）"""
+        inode, data = self._read()
+        start = self._start(inode, data)
+        first = _READ_FALSE.search(data, start)
+        if first is None:
+            self._advance(inode, data, len(data))
+            return 0
+        record = data.rfind(b"\n- ", start, first.start() + 2)
+        self._advance(inode, data, record + 1 if record >= 0 else start)
+        return 1 + sum(1 for _ in _READ_FALSE.finditer(data, first.end()))
+
+    def peek_unread_count(self) -> int:
+        """未読の件数（ファイルが前回から変わっていなければ stat だけで答える）"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self._counted is None or self._counted[0] != key:
+            self._counted = (key, self.unread_count())
+        return self._counted[1]
+
+    def unread(self) -> list[dict]:
+        """未読メッセージ（未読レコードだけをパースする）"""
+        return [message for message, _ in self._unread_records()]
+
+    def _unread_records(self) -> list[tuple[dict, int]]:
+        """(未読メッセージ, "false" のバイト位置) の一覧"""
+        inode, data = self._read()
+        start = self._start(inode, data)
+        starts = [match.start() for match in _RECORD_START.finditer(data, start)]
+        records = []
+        # 最初の未読レコードより前はすべて既読
+        first_unread = len(data)
+        for number, record_start in enumerate(starts):
+            record_end = starts[number + 1] if number + 1 < len(starts) else len(data)
+            flag = _READ_FALSE.search(data, record_start, record_end)
+            if flag is None:
+                continue
+            first_unread = min(first_unread, record_start)
+            try:
+                parsed = yaml.load(data[record_start:record_end], Loader=_YAML_LOADER)
+            except yaml.YAMLError:
+                continue
+            if isinstance(parsed, list) and parsed and isinstance(parsed[0], dict):
+                records.append((parsed[0], flag.start(1)))
+        self._advance(inode, data, first_unread)
+        return records
+
+    def _needs_compaction(self) -> bool:
+        """レコードが INBOX_COMPACT_AT 件を超え、減らせる既読があるか（YAMLはパースしない）
+
+        未読が溜まっているだけの時に、何も減らない圧縮を追記のたびに繰り返さないようにする
+        """
+        _, data = self._read()
+        if data.count(b"\n- ") <= INBOX_COMPACT_AT:
+            return False
+        return len(_READ_TRUE.findall(data)) > INBOX_KEEP_READ
+
+    def _load_messages(self) -> list[dict]:
+        """ファイル全体をパースする（圧縮と書式の変換の時だけ）"""
+        _, data = self._read()
+        raw = yaml.load(data, Loader=_YAML_LOADER) if data else None
+        messages = raw.get("messages") if isinstance(raw, dict) else None
+        return [m for m in messages or [] if isinstance(m, dict)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-agent-shogun inbox store")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    write = subparsers.add_parser("write", help="Append a message")
+    write.add_argument("inbox")
+    write.add_argument("content")
+    write.add_argument("--type", default="wake_up")
+    write.add_argument("--from", dest="sender", default="unknown")
+
+    unread = subparsers.add_parser("unread", help="Print unread info as JSON")
+    unread.add_argument("inbox")
+    unread.add_argument(
+        "--take-specials", action="store_true",
+        help=f"Mark {', '.join(SPECIAL_TYPES)} messages read and return them (inbox_watcher.sh)",
+    )
+
+    mark = subparsers.add_parser("mark-read", help="Mark unread messages read")
+    mark.add_argument("inbox")
+    mark.add_argument("--id", dest="ids", action="append", help="Message ID (repeatable; default: all)")
+
+    compact = subparsers.add_parser("compact", help="Drop old read messages")
+    compact.add_argument("inbox")
+
+    args = parser.parse_args()
+    inbox = Inbox(args.inbox)
+    try:
+        if args.action == "write":
+            print(inbox.append(args.content, args.type, args.sender)["id"])
+        elif args.action == "unread":
+            if args.take_specials:
+                count, specials = inbox.take_specials()
+            else:
+                count, specials = inbox.unread_count(), []
+            print(json.dumps({
+                "count": count,
+                "specials": [{"type": m.get("type", ""), "content": m.get("content", "")} for m in specials],
+            }, ensure_ascii=False))
+        elif args.action == "mark-read":
+            print(len(inbox.mark_read(ids=args.ids)))
+        elif args.action == "compact":
+            print("compacted" if inbox.compact() else "unchanged")
+    except (OSError, TimeoutError, yaml.YAMLError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,658 @@
+"""tmuxペインのサンプリング"""
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import metrics
+
+# tmux 呼び出し1回あたりのタイムアウト（秒）。実行枠の空き待ちを含む
+TMUX_TIMEOUT = 2
+
+# 指示送信（send-keys）のタイムアウト（秒）
+TMUX_COMMAND_TIMEOUT = 5
+
+# 同時に実行する tmux プロセスの上限
+TMUX_MAX_CONCURRENCY = 8
+
+# tmux 呼び出し失敗時のエラーメッセージ（APIのHTTPステータス判定にも使う）
+TMUX_TIMEOUT_ERROR = "tmux command timed out"
+TMUX_NOT_FOUND_ERROR = "tmux not found"
+
+# 最後のアクセスからこの秒数が経過したらバックグラウンドサンプリングを休止する
+SAMPLER_IDLE_TIMEOUT = 60
+
+# PaneLog が差分計算用に保持する変更履歴の件数
+PANE_LOG_HISTORY = 256
+
+# list-panes で取得したペイン情報（@agent_cli 等）をキャッシュする秒数
+PANE_INFO_TTL = 30
+
+# 変化通知（%output）を受けている間も、この秒数ごとに全ペインを取得し直す
+FULL_RESAMPLE_INTERVAL = 10
+
+# list-panes の出力フォーマット（タブ区切り）
+PANE_FORMAT = "\t".join([
+    "#{session_name}",
+    "#{window_index}",
+    "#{window_name}",
+    "#{pane_index}",
+    "#{pane_id}",
+    "#{pane_pid}",
+    "#{@agent_cli}",
+])
+
+
+@dataclass
+class PaneInfo:
+    """list-panes で取得する1ペイン分の情報"""
+    pane_id: str
+    pane_pid: str
+    agent_cli: str
+
+
+@dataclass
+class PaneSample:
+    """1ペイン分のサンプリング結果"""
+    target: str
+    output: str = ""
+    agent_cli: str = ""
+    pane_id: str = ""
+    error: Optional[str] = None
+    captured_at: float = 0.0
+    revision: int = 0
+
+    def same_content(self, other: "PaneSample") -> bool:
+        """出力・CLI種別・エラーが同一か"""
+        return (
+            self.output == other.output
+            and self.agent_cli == other.agent_cli
+            and self.error == other.error
+        )
+
+
+_tmux_slots = asyncio.Semaphore(TMUX_MAX_CONCURRENCY)
+
+TMUX_COMMANDS = metrics.counter(
+    "shogun_gui_tmux_commands_total",
+    "tmux commands run, by command, transport (control/subprocess) and result",
+    ("command", "transport", "result"),
+)
+TMUX_COMMAND_DURATION = metrics.histogram(
+    "shogun_gui_tmux_command_duration_seconds",
+    "tmux command duration including the wait for a subprocess slot",
+    ("command", "transport"),
+)
+
+# 常駐の tmux -C クライアント（接続中は run_tmux がプロセスを起動せずにこちらを使う）
+_control = None
+
+
+def set_control(control) -> None:
+    """run_tmux が使う tmux_control.TmuxControl を設定する（None で解除）"""
+    global _control
+    _control = control
+
+
+async def run_tmux(*args: str, timeout: float = TMUX_TIMEOUT) -> tuple[int, str, str]:
+    """tmuxを非同期サブプロセスで実行する
+
+    イベントループをブロックしないよう、tmux の呼び出しはすべてここを通す。
+    コントロールモードのクライアントが接続中ならそのパイプで実行し、
+    そうでなければサブプロセスを起動する。サブプロセスの同時実行数は
+    TMUX_MAX_CONCURRENCY に制限し、溢れた呼び出しは空きを待つ。
+
+    Returns:
+        (終了コード, stdout, stderr)
+
+    Raises:
+        asyncio.TimeoutError: timeout 秒以内に終了しなかった場合（プロセスはkill済み）
+        FileNotFoundError: tmux が見つからない場合
+    """
+    command = args[0] if args else ""
+    start = time.perf_counter()
+    transport = "subprocess"
+    result = "error"
+    try:
+        if _control is not None and _control.connected:
+            transport = "control"
+            try:
+                response = await _control.command(*args, timeout=timeout)
+                result = "ok" if response[0] == 0 else "error"
+                return response
+            except ConnectionError:
+                # 応答前に切断された: サブプロセスで実行し直す
+                transport = "subprocess"
+        try:
+            response = await _run_tmux_process(args, timeout)
+        except FileNotFoundError:
+            result = "not_found"
+            raise
+        result = "ok" if response[0] == 0 else "error"
+        return response
+    except asyncio.TimeoutError:
+        result = "timeout"
+        raise
+    finally:
+        TMUX_COMMANDS.inc(command, transport, result)
+        TMUX_COMMAND_DURATION.observe(time.perf_counter() - start, command, transport)
+
+
+async def _run_tmux_process(args: tuple[str, ...], timeout: float) -> tuple[int, str, str]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    await asyncio.wait_for(_tmux_slots.acquire(), timeout)
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "tmux", *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(), max(deadline - loop.time(), 0)
+            )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+    finally:
+        _tmux_slots.release()
+    return (
+        proc.returncode,
+        stdout.decode("utf-8", errors="replace"),
+        stderr.decode("utf-8", errors="replace"),
+    )
+
+
+class TmuxBackend:
+    """tmux サーバーのペイン（既定のバックエンド）
+
+    ペインの一覧・キャプチャ・キー送信はバックエンド経由で行い、set_backend で
+    差し替えられる。差し替え先は同じ3つのメソッド（list_panes / capture_pane /
+    send_keys）を持つオブジェクト（simulator.SimulatedBackend など）。
+    """
+
+    async def list_panes(self) -> dict[str, PaneInfo]:
+        """全ペインのペインID・PID・@agent_cliオプションを list-panes 1回で取得する
+
+        Returns:
+            ペインターゲット → PaneInfo。ターゲットは
+            "session:window_index.pane_index" と "session:window_name.pane_index"
+            の両方の形式で引ける。
+        """
+        returncode, stdout, _ = await run_tmux("list-panes", "-a", "-F", PANE_FORMAT)
+        if returncode != 0:
+            return {}
+
+        panes = {}
+        for line in stdout.splitlines():
+            fields = line.split("\t")
+            if len(fields) != 7:
+                continue
+            session, window_index, window_name, pane_index, pane_id, pane_pid, agent_cli = fields
+            info = PaneInfo(pane_id, pane_pid, agent_cli.strip())
+            panes[f"{session}:{window_index}.{pane_index}"] = info
+            panes[f"{session}:{window_name}.{pane_index}"] = info
+        return panes
+
+    async def capture_pane(self, target: str, start: int) -> PaneSample:
+        """1ペインの出力を capture-pane で取得する"""
+        try:
+            returncode, stdout, stderr = await run_tmux(
+                "capture-pane", "-t", target, "-p", "-S", str(start)
+            )
+        except asyncio.TimeoutError:
+            return PaneSample(target=target, error=TMUX_TIMEOUT_ERROR)
+        except FileNotFoundError:
+            return PaneSample(target=target, error=TMUX_NOT_FOUND_ERROR)
+
+        if returncode != 0:
+            return PaneSample(
+                target=target,
+                error=f"Failed to capture pane: {stderr.strip() or 'Pane not found'}",
+            )
+        return PaneSample(target=target, output=stdout)
+
+    async def send_keys(
+        self, target: str, *keys: str, timeout: float = TMUX_COMMAND_TIMEOUT
+    ) -> tuple[int, str, str]:
+        """ペインにキー入力を送る（run_tmux と同じ戻り値・例外）"""
+        return await run_tmux("send-keys", "-t", target, *keys, timeout=timeout)
+
+
+# ペインの一覧・キャプチャ・キー送信の実装
+_backend = TmuxBackend()
+
+
+def set_backend(backend) -> None:
+    """ペインのバックエンドを差し替える（None で tmux に戻す）"""
+    global _backend
+    _backend = backend if backend is not None else TmuxBackend()
+
+
+async def list_panes() -> dict[str, PaneInfo]:
+    """全ペインのペインID・PID・@agent_cliオプションを取得する（TmuxBackend.list_panes 参照）"""
+    return await _backend.list_panes()
+
+
+async def capture_pane(target: str, start: int) -> PaneSample:
+    """1ペインの出力を取得する"""
+    return await _backend.capture_pane(target, start)
+
+
+async def send_keys(target: str, *keys: str, timeout: float = TMUX_COMMAND_TIMEOUT) -> tuple[int, str, str]:
+    """ペインにキー入力を送る
+
+    Raises:
+        asyncio.TimeoutError: timeout 秒以内に終わらなかった場合
+        FileNotFoundError: tmux が見つからない場合
+    """
+    return await _backend.send_keys(target, *keys, timeout=timeout)
+
+
+class PaneInfoCache:
+    """list-panes の結果を TTL 付きで保持する
+
+    @agent_cli はエージェントの起動時にしか変わらないため、サンプリングや
+    CLI種別の取得のたびに tmux へ問い合わせず、PANE_INFO_TTL 秒ごとに
+    list-panes 1回でまとめて取り直す。ペインの作り直しや @agent_cli の変更を
+    知らされた場合（observe / invalidate）はその時点で破棄する。
+    """
+
+    def __init__(self, ttl: float = PANE_INFO_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._panes: dict[str, PaneInfo] = {}
+        self._by_id: dict[str, PaneInfo] = {}
+        self._fetched_at: Optional[float] = None
+        self._refreshing: Optional[asyncio.Task] = None
+
+    async def get(self) -> dict[str, PaneInfo]:
+        """ペインターゲット → PaneInfo（期限切れなら取り直す）"""
+        if self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl:
+            self.hits += 1
+            return self._panes
+        self.misses += 1
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._refresh())
+        return await asyncio.shield(self._refreshing)
+
+    async def agent_cli(self, target: str) -> str:
+        """ペインの@agent_cliオプションの値（ペインが無ければ空文字列）"""
+        info = (await self.get()).get(target)
+        return info.agent_cli if info is not None else ""
+
+    def invalidate(self) -> None:
+        """次回の get で取り直す"""
+        self._fetched_at = None
+
+    def observe(self, pane_id: str, pane_pid: str, agent_cli: str) -> None:
+        """ペインの現在の情報を受け取り、キャッシュと食い違えば破棄する"""
+        cached = self._by_id.get(pane_id)
+        if cached is None or cached != PaneInfo(pane_id, pane_pid, agent_cli.strip()):
+            self.invalidate()
+
+    async def _refresh(self) -> dict[str, PaneInfo]:
+        fetched_at = time.monotonic()
+        panes = await list_panes()
+        self._panes = panes
+        self._by_id = {info.pane_id: info for info in panes.values()}
+        # 取得に失敗した（tmux サーバーが無い等）結果はキャッシュしない
+        self._fetched_at = fetched_at if panes else None
+        return panes
+
+
+async def sample_panes(
+    targets: dict[str, int],
+    pane_info: Optional[PaneInfoCache] = None,
+) -> dict[str, PaneSample]:
+    """複数ペインの出力・ペインID・@agent_cliを一括取得する
+
+    capture-pane はペインごとに並行実行し、ペインIDと@agent_cli は list-panes 1回で
+    まとめて取得する。全体の所要時間は最も遅い tmux 呼び出し1回分に収まる。
+
+    Args:
+        targets: ペインターゲット → capture-pane の開始行（例: -50）
+        pane_info: 指定した場合は list-panes の代わりにこのキャッシュを使う
+
+    Returns:
+        ターゲット → PaneSample
+    """
+    results = await asyncio.gather(
+        pane_info.get() if pane_info is not None else list_panes(),
+        *(capture_pane(target, start) for target, start in targets.items()),
+        return_exceptions=True,
+    )
+    panes, captures = results[0], results[1:]
+    if isinstance(panes, BaseException):
+        panes = {}
+
+    captured_at = time.time()
+    samples = {}
+    for target, sample in zip(targets, captures):
+        if isinstance(sample, BaseException):
+            sample = PaneSample(target=target, error=str(sample) or type(sample).__name__)
+        info = panes.get(target)
+        if info is not None:
+            sample.pane_id, sample.agent_cli = info.pane_id, info.agent_cli
+        sample.captured_at = captured_at
+        samples[target] = sample
+    return samples
+
+
+class PaneSampler:
+    """全ペインを一定間隔でサンプリングし、最新スナップショットを保持する
+
+    各APIはtmuxを直接呼ばずにこのストアから読むため、閲覧中のブラウザタブが
+    何枚あってもtmuxの負荷は一定になる。しばらくアクセスがなければ
+    サンプリングを休止し、次のアクセス時に再開する。
+
+    内容が変化したペインにだけ新しいリビジョンを振り、サンプリングのたびに
+    登録されたリスナーへ変化したスナップショット（変化なしなら空）を通知する。
+
+    set_change_feed で変化通知（tmux -C の %output）を受けられる場合は、
+    通知のあったペインだけを取得し、通知が来るまでサンプリングを待つ。
+    取りこぼしに備えて FULL_RESAMPLE_INTERVAL ごとに全ペインを取得し直す。
+    """
+
+    def __init__(self, targets: dict[str, int], pane_info: Optional[PaneInfoCache] = None):
+        self.targets = dict(targets)
+        self.pane_info = pane_info
+        self.interval = 1.0
+        self.idle_timeout: Optional[float] = SAMPLER_IDLE_TIMEOUT
+        self.snapshots: dict[str, PaneSample] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        self._last_access = 0.0
+        self._revision = 0
+        self._listeners: list[Callable[[dict[str, PaneSample]], None]] = []
+        self._watching: Optional[Callable[[str], bool]] = None
+        self._pane_targets: dict[str, str] = {}
+        self._dirty: set[str] = set()
+        self._wake = asyncio.Event()
+        self._last_full = 0.0
+
+    def set_targets(self, targets: dict[str, int]) -> None:
+        """サンプリング対象を差し替える（構成の再読み込み時）"""
+        self.targets = dict(targets)
+        for target in list(self.snapshots):
+            if target not in self.targets:
+                del self.snapshots[target]
+        self.invalidate()
+
+    def set_change_feed(self, watching: Optional[Callable[[str], bool]]) -> None:
+        """変化通知を使ったサンプリングに切り替える
+
+        Args:
+            watching: ターゲットの変化が mark_pane_dirty で通知される状態かを返す関数
+                （None で通常の定期サンプリングに戻す）
+        """
+        self._watching = watching
+        self.invalidate()
+
+    def mark_pane_dirty(self, pane_id: str) -> None:
+        """ペインID（"%12" 等）の出力が変化したことを記録する"""
+        target = self._pane_targets.get(pane_id)
+        if target is not None and target not in self._dirty:
+            self._dirty.add(target)
+            self._wake.set()
+
+    def invalidate(self) -> None:
+        """次のサンプリングで全ペインを取得し直す（再接続時など）"""
+        self._last_full = 0.0
+        self._wake.set()
+
+    def add_listener(self, listener: Callable[[dict[str, PaneSample]], None]) -> None:
+        """サンプリングごとに内容が変化したペインを受け取るリスナーを登録する"""
+        self._listeners.append(listener)
+
+    def start(self, interval: float, idle_timeout: Optional[float] = SAMPLER_IDLE_TIMEOUT) -> None:
+        """バックグラウンドサンプリングを開始する
+
+        Args:
+            idle_timeout: アクセスがなくなってから休止するまでの秒数（None なら休止しない）
+        """
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """バックグラウンドサンプリングを停止する"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def touch(self) -> None:
+        """スナップショットの利用を記録する（休止中のサンプリングを再開させる）"""
+        self._last_access = time.monotonic()
+
+    async def refresh(self) -> None:
+        """全ペインを今すぐサンプリングする（同時呼び出しは1回のサンプリングを共有）"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._sample())
+        await asyncio.shield(self._refreshing)
+
+    def _watched(self, target: str) -> bool:
+        return self._watching is not None and self._watching(target)
+
+    async def _sample(self) -> None:
+        now = time.monotonic()
+        if self._watching is None or now - self._last_full >= FULL_RESAMPLE_INTERVAL:
+            targets = self.targets
+            self._last_full = now
+        else:
+            targets = {
+                target: start for target, start in self.targets.items()
+                if target in self._dirty or target not in self.snapshots or not self._watched(target)
+            }
+        # 取得中に届いた通知は次回に回す
+        self._dirty.difference_update(targets)
+        samples = await sample_panes(targets, self.pane_info) if targets else {}
+
+        for target, sample in samples.items():
+            if sample.pane_id:
+                self._pane_targets[sample.pane_id] = target
+        # 変化通知を受けているペインは、取得しなくても最新とみなす
+        captured_at = time.time()
+        for target, snapshot in self.snapshots.items():
+            if target not in samples and self._watched(target):
+                snapshot.captured_at = captured_at
+
+        changed = {}
+        for target, sample in samples.items():
+            previous = self.snapshots.get(target)
+            if previous is not None and previous.same_content(sample):
+                previous.captured_at = sample.captured_at
+                continue
+            self._revision += 1
+            sample.revision = self._revision
+            self.snapshots[target] = sample
+            changed[target] = sample
+
+        for listener in self._listeners:
+            listener(changed)
+
+    async def get(self, target: str) -> PaneSample:
+        """ペインの最新スナップショットを返す
+
+        サンプリングが休止していてスナップショットが古い場合はその場で取得する。
+        """
+        self.touch()
+        sample = self.snapshots.get(target)
+        if sample is None or not self._is_fresh(sample):
+            await self.refresh()
+            sample = self.snapshots[target]
+        return sample
+
+    async def get_many(self, targets: list[str]) -> dict[str, PaneSample]:
+        """複数ペインの最新スナップショットを返す（古いものがあってもサンプリングは1回）"""
+        self.touch()
+        if any(
+            target not in self.snapshots or not self._is_fresh(self.snapshots[target])
+            for target in targets
+        ):
+            await self.refresh()
+        return {target: self.snapshots[target] for target in targets if target in self.snapshots}
+
+    def _is_fresh(self, sample: PaneSample) -> bool:
+        # 全件取得前（接続直後など）は通知を受けていなかった間の変化がありうる
+        if self._last_full and self._watched(sample.target) and sample.target not in self._dirty:
+            return True
+        return time.time() - sample.captured_at <= self.interval * 2
+
+    async def _run(self) -> None:
+        while True:
+            active = (
+                self.idle_timeout is None
+                or time.monotonic() - self._last_access < self.idle_timeout
+            )
+            if active:
+                try:
+                    await self.refresh()
+                except Exception:
+                    pass
+            # interval は変化通知を受けている場合もサンプリング頻度の上限になる
+            await asyncio.sleep(self.interval)
+            if active and self._watching is not None:
+                await self._wait_for_changes()
+
+    async def _wait_for_changes(self) -> None:
+        """変化通知・監視外のペイン・全件取得の時刻のいずれかが来るまで待つ"""
+        self._wake.clear()
+        if self._dirty or not all(self._watched(target) for target in self.targets):
+            return
+        remaining = self._last_full + FULL_RESAMPLE_INTERVAL - time.monotonic()
+        try:
+            await asyncio.wait_for(self._wake.wait(), max(remaining, 0))
+        except asyncio.TimeoutError:
+            pass
+
+
+class PaneLog:
+    """ペイン出力の各行に通し番号を振り、カーソル以降の差分を返す
+
+    キャプチャは毎回「末尾N行の窓」なので、新しい窓の先頭行が前回の窓の
+    どこに来るかを探して行番号を引き継ぐ。窓が重ならない場合（/clear 等で
+    画面が消去された場合）は番号を振り直し、リセットとして記録する。
+
+    カーソルは "<epoch>:<revision>" 形式。epoch はプロセスごとに異なるため、
+    サーバー再起動前のカーソルは自動的にリセット扱いになる。
+    """
+
+    def __init__(self, history: int = PANE_LOG_HISTORY):
+        self.epoch = os.urandom(4).hex()
+        self.base = 0
+        self.lines: list[str] = []
+        self.revision = 0
+        # (revision, 変更された最初の行番号, リセットか)
+        self._changes: deque[tuple[int, int, bool]] = deque(maxlen=history)
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.epoch}:{self.revision}"
+
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def update(self, lines: list[str]) -> None:
+        """新しいキャプチャ（フィルタ済みの行）を取り込む"""
+        if lines == self.lines:
+            return
+
+        shift, common = self._align(lines)
+        if common == 0 and self.lines:
+            # 前回の窓と重ならない: 番号を振り直す
+            base = self.base + len(self.lines)
+            first_changed = base
+            reset = True
+        else:
+            base = self.base + shift
+            first_changed = base + common
+            reset = False
+
+        self.base = base
+        self.lines = lines
+        self.revision += 1
+        self._changes.append((self.revision, first_changed, reset))
+
+    def delta(self, cursor: Optional[str]) -> dict:
+        """カーソル以降の差分を返す
+
+        Returns:
+            base: 現在の窓の先頭行番号
+            from: この行番号以降を lines で置き換える
+            lines: 置き換える行
+            cursor: 次回のリクエストに渡すカーソル
+            reset: 手元の行をすべて捨てて lines で置き換えるべき場合 True
+        """
+        since = self._parse_cursor(cursor)
+        first_changed: Optional[int] = None
+        reset = since is None or since > self.revision
+        if not reset and since < self.revision:
+            oldest = self._changes[0][0] if self._changes else self.revision + 1
+            if since < oldest - 1:
+                # 履歴から追い出された変更がある
+                reset = True
+            else:
+                for revision, changed, was_reset in reversed(self._changes):
+                    if revision <= since:
+                        break
+                    reset = reset or was_reset
+                    first_changed = changed if first_changed is None else min(first_changed, changed)
+
+        end = self.base + len(self.lines)
+        if reset:
+            start = self.base
+        elif first_changed is None:
+            start = end
+        else:
+            start = max(first_changed, self.base)
+
+        return {
+            "base": self.base,
+            "from": start,
+            "lines": self.lines[start - self.base:],
+            "cursor": self.cursor,
+            "reset": reset,
+        }
+
+    def _parse_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        if not cursor:
+            return None
+        epoch, _, revision = cursor.partition(":")
+        if epoch != self.epoch or not revision.isdigit():
+            return None
+        return int(revision)
+
+    def _align(self, lines: list[str]) -> tuple[int, int]:
+        """新しい窓の先頭が前回の窓の何行目に当たるかを探す
+
+        Returns:
+            (ずれ行数, 前回の窓と一致している先頭からの行数)
+        """
+        old = self.lines
+        if not lines:
+            return len(old), 0
+        best_shift, best_common = len(old), 0
+        head = lines[0]
+        for shift, line in enumerate(old):
+            if line != head:
+                continue
+            common = 0
+            limit = min(len(old) - shift, len(lines))
+            while common < limit and old[shift + common] == lines[common]:
+                common += 1
+            if common > best_common:
+                best_shift, best_common = shift, common
+                if common == limit:
+                    break
+        return best_shift, best_common
@@ -1,28 +1,79 @@
 """dashboard.md パーサー"""
+import hashlib
+import json
+import os
 import re
+import threading
+import time
+from collections import deque
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import metrics
+from encoding import dumps
+
+# mtime がキャッシュ時刻からこの範囲内のファイルは、同一mtimeのまま再度
+# 書き換えられる可能性があるため、キャッシュヒット時に内容のハッシュも確認する
+RACY_MTIME_WINDOW_NS = 2_000_000_000
+
+# 差分API用に保持するパース結果の世代数
+DASHBOARD_HISTORY = 32
+
+# 最終更新時刻のマーカー
+LAST_UPDATED_MARKER = "最終更新:"
+
+
+# ===== 正規表現（import 時に1回だけコンパイルする） =====
+
+# 見出し先頭の絵文字等: ひらがな・カタカナ・漢字・漢字拡張A・ASCII 以外の文字の連続
+LEADING_SYMBOLS_PATTERN = re.compile(
+    "[^\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FFF\u3400-\u4DBF\x00-\x7F]+"
+)
+# 要対応: **【種別】タイトル**
+ACTION_BOLD_PATTERN = re.compile(r'^\*\*【(.+?)】(.+?)\*\*$')
+# 本日の戦果: ### cmd_XXX 完了報告
+REPORT_HEADER_PATTERN = re.compile(r"### (cmd_\d+) 完了報告")
+# スキル化候補: - **名前**（発見元）— 説明
+SKILL_BULLET_PATTERN = re.compile(r'^\s*-\s+\*\*(.+?)\*\*[（(](.+?)[）)]\s*[—\-]\s*(.+)$')
+# スキル名末尾の「（新規）」等の注釈
+SKILL_ANNOTATION_PATTERN = re.compile(r"（.+）$")
+
+# テーブルのカラム名（日本語） → 正規化キー
+TABLE_KEY_MAPPING = {
+    "時刻": "time",
+    "ID": "time",
+    "戦場": "project",
+    "プロジェクト": "project",
+    "任務": "task",
+    "タスク": "task",
+    "結果": "result",
+    "担当": "assignee",
+    "状態": "status",
+    "状況": "status",
+}
+
+# 差分計算で行を対応付けるフィールド（ここにないセクションは行全体で対応付ける）
+DIFF_ROW_KEYS = {
+    "action_required": ("title",),
+    "in_progress": ("project", "task"),
+    "completed_today": ("time", "project", "task"),
+    "completed_reports": ("cmd_id",),
+    "skill_candidates": ("name",),
+    "generated_skills": ("name",),
+}
+
+# セクション見出し → ハンドラの解決結果を覚えておく件数の上限
+SECTION_TITLE_CACHE_SIZE = 256
 
 
 def strip_emoji(text: str) -> str:
     """文字列先頭の絵文字を除去してテキスト部分のみ返す"""
-    # 先頭の絵文字とスペースを除去（日本語を含まない範囲のみ）
-    # emoji ライブラリを使わず、先頭の非ASCII文字を除去する簡易実装
+    # emoji ライブラリを使わず、先頭の日本語・ASCII以外の文字を除去する簡易実装
     result = text.lstrip()
-    # 先頭が日本語（ひらがな、カタカナ、漢字）またはASCIIでない場合、
-    # 日本語以外の文字をスキップ
-    while result:
-        char = result[0]
-        # 日本語の範囲: ひらがな、カタカナ、漢字、ASCII
-        if (
-            "\u3040" <= char <= "\u309F"  # ひらがな
-            or "\u30A0" <= char <= "\u30FF"  # カタカナ
-            or "\u4E00" <= char <= "\u9FFF"  # 漢字
-            or "\u3400" <= char <= "\u4DBF"  # 漢字拡張A
-            or char.isascii()
-        ):
-            break
-        result = result[1:]
+    match = LEADING_SYMBOLS_PATTERN.match(result)
+    if match:
+        result = result[match.end():]
     return result.strip()
 
 
@@ -40,25 +91,12 @@ def normalize_table_keys(rows: list[dict]) -> list[dict]:
     - 担当 → assignee
     - 状態/状況 → status
     """
-    key_mapping = {
-        "時刻": "time",
-        "ID": "time",
-        "戦場": "project",
-        "プロジェクト": "project",
-        "任務": "task",
-        "タスク": "task",
-        "結果": "result",
-        "担当": "assignee",
-        "状態": "status",
-        "状況": "status",
-    }
-
     normalized = []
     for row in rows:
         new_row = {}
         for key, value in row.items():
             # マッピングがあれば正規化キーを使用、なければ元のキーを保持
-            normalized_key = key_mapping.get(key, key)
+            normalized_key = TABLE_KEY_MAPPING.get(key, key)
             new_row[normalized_key] = value
         normalized.append(new_row)
 
@@ -71,9 +109,52 @@ def parse_dashboard(filepath: str) -> dict[str, Any]:
     if not path.exists():
         return {"error": f"File not found: {filepath}"}
 
-    content = path.read_text(encoding="utf-8")
+    with path.open(encoding="utf-8") as f:
+        return parse_dashboard_lines(_iter_lines(f))
+
+
+def parse_dashboard_content(content: str) -> dict[str, Any]:
+    """dashboard.md の本文をパースしてJSONに変換"""
+    return parse_dashboard_lines(content.split("\n"))
+
+
+def parse_dashboard_lines(lines: Iterable[str]) -> dict[str, Any]:
+    """dashboard.md を1行ずつ1回だけ走査してJSONに変換
+
+    "## " で始まる行でセクションを切り替え、セクション内の各行（見出し行を
+    含む）をそのセクションのハンドラへ流す。最終更新時刻は全行を通して探す。
+
+    Args:
+        lines: 改行を含まない行のイテラブル
+    """
+    result = _empty_result()
+
+    last_updated = _MarkerValue(LAST_UPDATED_MARKER)
+    handler: Optional[SectionHandler] = None
+
+    for index, line in enumerate(lines):
+        last_updated.feed(line)
+
+        if index == 0 or line.startswith("## "):
+            # セクションの最初の行から絵文字を除去してマッチング
+            if handler is not None:
+                handler.finish(result)
+            if index > 0:
+                line = line[3:]
+            handler = _create_section_handler(line)
 
-    result = {
+        if handler is not None:
+            handler.feed(line)
+
+    if handler is not None:
+        handler.finish(result)
+
+    result["last_updated"] = last_updated.value() or ""
+    return result
+
+
+def _empty_result() -> dict[str, Any]:
+    return {
         "last_updated": "",
         "action_required": [],
         "in_progress": [],
@@ -85,82 +166,495 @@ def parse_dashboard(filepath: str) -> dict[str, Any]:
         "inquiries": [],
     }
 
-    # 最終更新時刻
-    match = re.search(r"最終更新:\s*(.+)", content)
-    if match:
-        result["last_updated"] = match.group(1).strip()
-
-    # セクション分割
-    sections = re.split(r"\n## ", content)
-
-    for section in sections:
-        # セクションの最初の行から絵文字を除去してマッチング
-        first_line = section.split("\n")[0]
-        section_title = strip_emoji(first_line)
-        if section_title.startswith("要対応"):
-            result["action_required"] = parse_action_required(section)
-        elif section_title.startswith("進行中"):
-            result["in_progress"] = normalize_table_keys(parse_table(section))
-        elif section_title.startswith("本日の戦果"):
-            result["completed_today"] = normalize_table_keys(parse_table(section))
-            result["completed_reports"] = parse_completed_reports(section)
-        elif section_title.startswith("スキル化候補"):
-            result["skill_candidates"] = parse_skill_candidates(section)
-        elif section_title.startswith("生成されたスキル"):
-            result["generated_skills"] = parse_generated_skills(section)
-        elif section_title.startswith("待機中"):
-            result["waiting"] = parse_simple_list(section)
-        elif section_title.startswith("伺い事項"):
-            result["inquiries"] = parse_simple_list(section)
 
-    return result
+def _iter_lines(f) -> Iterator[str]:
+    """テキストファイルを content.split("\\n") と同じ行に分けて返す"""
+    line = ""
+    for line in f:
+        yield line[:-1] if line.endswith("\n") else line
+    # 末尾が改行で終わる（または空の）ファイルは split と同じく空行で終わる
+    if line == "" or line.endswith("\n"):
+        yield ""
 
 
-def parse_action_required(section: str) -> list[dict]:
-    """要対応セクションをパース"""
-    items = []
+def _create_section_handler(title: str) -> Optional["SectionHandler"]:
+    """セクション見出しに対応するハンドラを返す（対象外のセクションは None）"""
+    factory = resolve_section_handler(title)
+    return factory() if factory is not None else None
+
+
+class IncrementalDashboardParser:
+    """前回のパース結果をセクション単位で再利用するパーサー
+
+    本文を "## " 見出しでセクションに分け、内容のハッシュが前回と同じ
+    セクションはパースせずに前回の結果を使う。家老が dashboard.md を
+    書き換えても変わるのは通常1セクションだけなので、再パースはその分で済む。
+    結果は parse_dashboard_content と同一になる。
+    セクションハンドラが登録し直された場合は、すべてのセクションをパースし直す。
+    """
+
+    def __init__(self):
+        # (先頭セクションか, 本文のハッシュ) → そのセクションが結果に書き込む値
+        self._sections: dict[tuple[bool, bytes], dict[str, Any]] = {}
+        # _sections をパースした時のハンドラの登録の世代
+        self._generation = _section_handler_generation
+        self.reparsed = 0
+        self.reused = 0
+
+    def parse(self, content: str) -> dict[str, Any]:
+        """dashboard.md の本文をパースしてJSONに変換"""
+        lines = content.split("\n")
+        result = _empty_result()
+        sections = {}
+        self.reparsed = self.reused = 0
+        if self._generation != _section_handler_generation:
+            self._sections = {}
+            self._generation = _section_handler_generation
+
+        start = 0
+        for end in range(1, len(lines) + 1):
+            if end < len(lines) and not lines[end].startswith("## "):
+                continue
+            chunk = lines[start:end]
+            key = (
+                start == 0,
+                hashlib.blake2b("\n".join(chunk).encode("utf-8"), digest_size=16).digest(),
+            )
+            values = self._sections.get(key)
+            if values is None:
+                values = self._parse_section(chunk, start == 0)
+                self.reparsed += 1
+            else:
+                self.reused += 1
+            sections[key] = values
+            # 同じキーを持つセクションが複数あれば後のものが優先される（全体パースと同じ）
+            result.update(values)
+            start = end
+
+        # 前回の世代にしかないセクションは捨てる
+        self._sections = sections
+        result["last_updated"] = self._last_updated(content, lines)
+        return result
+
+    @staticmethod
+    def _parse_section(chunk: list[str], first: bool) -> dict[str, Any]:
+        title = chunk[0] if first else chunk[0][3:]
+        handler = _create_section_handler(title)
+        if handler is None:
+            return {}
+        handler.feed(title)
+        for line in chunk[1:]:
+            handler.feed(line)
+        values: dict[str, Any] = {}
+        handler.finish(values)
+        return values
+
+    @staticmethod
+    def _last_updated(content: str, lines: list[str]) -> str:
+        index = content.find(LAST_UPDATED_MARKER)
+        if index < 0:
+            return ""
+        # マーカーのある行から探し始める（値が次の行に続く場合もある）
+        marker = _MarkerValue(LAST_UPDATED_MARKER)
+        for line in lines[content.count("\n", 0, index):]:
+            marker.feed(line)
+            if marker.found:
+                break
+        return marker.value() or ""
+
+
+def _row_identity(key: str, row: Any) -> str:
+    """差分計算で行を対応付けるための識別子"""
+    fields = DIFF_ROW_KEYS.get(key)
+    if fields and isinstance(row, dict):
+        identity = [row.get(field) for field in fields]
+        if any(identity):
+            return json.dumps(identity, ensure_ascii=False)
+    return json.dumps(row, ensure_ascii=False, sort_keys=True)
 
-    # ### で始まるサブセクションを抽出（既存ロジック・後方互換）
-    subsections = re.split(r"\n### ", section)
-    for sub in subsections[1:]:  # 最初はヘッダー部分なのでスキップ
-        lines = sub.strip().split("\n")
-        if not lines:
+
+def diff_section(key: str, old_rows: list, new_rows: list) -> dict[str, list]:
+    """セクション1つ分の行の差分を返す
+
+    識別子（DIFF_ROW_KEYS）が同じ行を同じ行とみなし、内容が違えば changed、
+    片方にしかなければ added / removed とする。識別子が重複する行は出現順に対応付ける。
+
+    Returns:
+        added: 追加された行
+        removed: 削除された行
+        changed: {"before": 変更前, "after": 変更後} のリスト
+    """
+    old_by_identity: dict[str, deque] = {}
+    for row in old_rows:
+        old_by_identity.setdefault(_row_identity(key, row), deque()).append(row)
+
+    added, changed = [], []
+    for row in new_rows:
+        candidates = old_by_identity.get(_row_identity(key, row))
+        if not candidates:
+            added.append(row)
+            continue
+        before = candidates.popleft()
+        if before != row:
+            changed.append({"before": before, "after": row})
+
+    removed = [row for rows in old_by_identity.values() for row in rows]
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def diff_dashboards(old: dict[str, Any], new: dict[str, Any]) -> dict[str, dict]:
+    """2つのパース結果の差分をセクション（結果のキー）ごとに返す
+
+    変化のあったセクションだけを含み、各セクションには diff_section の結果に
+    加えて変更後の全行を rows として持たせる（カード単位の再描画用）。
+    """
+    sections = {}
+    for key in dict.fromkeys([*old, *new]):
+        old_rows, new_rows = old.get(key, []), new.get(key, [])
+        if not isinstance(old_rows, list) or not isinstance(new_rows, list):
+            continue
+        if old_rows == new_rows:
             continue
+        sections[key] = diff_section(key, old_rows, new_rows)
+        sections[key]["rows"] = new_rows
+    return sections
 
-        title = lines[0].strip()
-        content_lines = []
-        for line in lines[1:]:
-            if line.strip() and not line.startswith("---"):
-                content_lines.append(line.strip())
-
-        items.append({
-            "title": title,
-            "content": "\n".join(content_lines),
-        })
-
-    # ### でアイテムが見つからなかった場合のフォールバック
-    if not items:
-        lines = section.split("\n")
-        # ヘッダー行（「要対応」等）と区切り線をスキップ
-        body_lines = []
-        for line in lines[1:]:
+
+def make_etag(body: bytes) -> str:
+    """レスポンス本文のハッシュから強いETagを作る"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+DASHBOARD_CACHE_REQUESTS = metrics.counter(
+    "shogun_gui_dashboard_cache_requests_total",
+    "DashboardCache lookups by result (hit: file unchanged, miss: reloaded)",
+    ("result",),
+)
+PARSE_DURATION = metrics.histogram(
+    "shogun_gui_dashboard_parse_duration_seconds",
+    "dashboard.md parse duration (changed sections only)",
+)
+
+
+class DashboardCache:
+    """dashboard.md のパース結果キャッシュ
+
+    ファイルの (inode, mtime_ns, size) が変わるまで、前回のパース結果と
+    そのJSON本文を返す。tmpファイル + rename によるアトミックな書き換えは
+    inode の変化として検出する。キー判定には読み込んだファイルディスクリプタの
+    fstat を使うため、読み込み中に差し替えられても内容とキーがずれない。
+    同時に呼ばれた場合のパースは1回だけ行い、結果を共有する。
+    etag には現在のJSON本文に対応する強いETagを保持する。
+
+    再パースは IncrementalDashboardParser で変化したセクションだけ行う。
+    セクションハンドラが登録されると、ファイルが変わっていなくても再パースする。
+    直近 DASHBOARD_HISTORY 世代の結果を保持し、diff でカーソル
+    （"<epoch>:<version>"）以降の差分を返す。
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._key: Optional[tuple[int, int, int]] = None
+        self._digest = b""
+        self._racy = False
+        # 前回のパース時のセクションハンドラの登録の世代
+        self._generation = -1
+        self._data: dict[str, Any] = {}
+        self._body = b""
+        self.etag = ""
+        self.epoch = os.urandom(4).hex()
+        self._parser = IncrementalDashboardParser()
+        self._history: deque[tuple[int, dict[str, Any]]] = deque(maxlen=DASHBOARD_HISTORY)
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.epoch}:{self.version}"
+
+    def get(self) -> tuple[dict[str, Any], bytes]:
+        """(パース結果, JSON本文) を返す。ファイルが変わっていれば再パースする"""
+        if self._is_fresh():
+            self.hits += 1
+            DASHBOARD_CACHE_REQUESTS.inc("hit")
+            return self._data, self._body
+
+        with self._lock:
+            # ロック待ちの間に別スレッドが再パース済みならそれを使う
+            if self._is_fresh():
+                self.hits += 1
+                DASHBOARD_CACHE_REQUESTS.inc("hit")
+                return self._data, self._body
+            self.misses += 1
+            DASHBOARD_CACHE_REQUESTS.inc("miss")
+            self._load()
+            return self._data, self._body
+
+    def _stat_key(self) -> Optional[tuple[int, int, int]]:
+        try:
+            st = os.stat(self.filepath)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _is_fresh(self) -> bool:
+        if self._generation != _section_handler_generation:
+            return False
+        key = self._stat_key()
+        if key is None or key != self._key:
+            return False
+        if not self._racy:
+            return True
+        # キャッシュ直前に書き換えられたファイルは内容でも確認する
+        try:
+            raw = Path(self.filepath).read_bytes()
+        except OSError:
+            return False
+        if hashlib.blake2b(raw, digest_size=16).digest() != self._digest:
+            return False
+        self._racy = time.time_ns() - key[1] < RACY_MTIME_WINDOW_NS
+        return True
+
+    def _load(self) -> None:
+        try:
+            with open(self.filepath, "rb") as f:
+                st = os.fstat(f.fileno())
+                raw = f.read()
+        except OSError:
+            self._key = None
+            self._set({"error": f"File not found: {self.filepath}"}, b"")
+            return
+
+        self._key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self._racy = time.time_ns() - st.st_mtime_ns < RACY_MTIME_WINDOW_NS
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        generation = _section_handler_generation
+        if digest == self._digest and self._body and generation == self._generation:
+            # 内容が同じなら（touch のみ等）前回の結果をそのまま使う
+            return
+        self._generation = generation
+        # read_text と同じくユニバーサル改行に揃えてからパースする
+        content = raw.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+        with PARSE_DURATION.time():
+            data = self._parser.parse(content)
+        self._set(data, digest)
+
+    def _set(self, data: dict[str, Any], digest: bytes) -> None:
+        body = dumps(data)
+        self._digest = digest
+        if body == self._body:
+            return
+        self._data = data
+        self._body = body
+        self.etag = make_etag(body)
+        self.version += 1
+        self._history.append((self.version, data))
+
+    def diff(self, cursor: Optional[str]) -> dict[str, Any]:
+        """カーソル以降の差分を返す（呼び出し前に get で最新化しておくこと）
+
+        Returns:
+            since: 差分の起点にしたカーソル（reset の場合は None）
+            cursor: 次回のリクエストに渡すカーソル
+            reset: 差分を計算できない場合 True（dashboard に全体を入れる）
+            last_updated: 最終更新時刻
+            sections: 変化したセクション → diff_section の結果と変更後の全行
+        """
+        previous = None
+        epoch, _, version = (cursor or "").partition(":")
+        if epoch == self.epoch and version.isdigit():
+            for old_version, data in self._history:
+                if old_version == int(version):
+                    previous = data
+                    break
+
+        payload: dict[str, Any] = {
+            "since": cursor if previous is not None else None,
+            "cursor": self.cursor,
+            "reset": previous is None or "error" in previous or "error" in self._data,
+            "last_updated": self._data.get("last_updated", ""),
+            "sections": {},
+        }
+        if payload["reset"]:
+            payload["since"] = None
+            payload["dashboard"] = self._data
+        else:
+            payload["sections"] = diff_dashboards(previous, self._data)
+        return payload
+
+
+# ===== 行単位のパーツ =====
+
+class _MarkerValue:
+    """「**指令**:」等のマーカーに続く値を行単位で探す
+
+    re.search(marker + r"\\s*(.+)", text) と同じ結果になる: マーカーの後ろが
+    空白だけなら、空白を読み飛ばして次に文字のある行を値とする。
+    """
+
+    def __init__(self, marker: str):
+        self.marker = marker
+        self._value: Optional[str] = None
+        self._pending = False
+        # 値待ちの間に改行以外の空白文字があったか（末尾まで値がない場合に "" でマッチする）
+        self._saw_blank_char = False
+
+    def feed(self, line: str) -> None:
+        if self._value is not None:
+            return
+        if self._pending:
+            if line.strip():
+                self._value = line.strip()
+            elif line:
+                self._saw_blank_char = True
+            return
+
+        index = line.find(self.marker)
+        if index < 0:
+            return
+        rest = line[index + len(self.marker):]
+        if rest.strip():
+            self._value = rest.strip()
+        else:
+            self._pending = True
+            self._saw_blank_char = bool(rest)
+
+    @property
+    def found(self) -> bool:
+        """値が確定したか（以降の行で結果が変わらない）"""
+        return self._value is not None
+
+    def value(self) -> Optional[str]:
+        """見つかった値（マッチしなかった場合は None）"""
+        if self._value is None and self._pending and self._saw_blank_char:
+            return ""
+        return self._value
+
+
+class _TableParser:
+    """Markdownテーブルの行を1行ずつ受け取ってパースする"""
+
+    def __init__(self):
+        self.headers: list[str] = []
+        self.rows: list[dict] = []
+
+    def feed(self, line: str) -> None:
+        if "|" not in line or "---" in line:
+            return
+        cells = [c.strip() for c in line.split("|") if c.strip()]
+        if not self.headers:
+            self.headers = cells
+        elif len(cells) == len(self.headers):
+            if all(c == '-' for c in cells):
+                return
+            self.rows.append(dict(zip(self.headers, cells)))
+
+
+def _table_cells(line: str) -> Optional[list[str]]:
+    """「| 項目 | 内容 |」形式の行のセルを返す（テーブル行でなければ None）"""
+    if "|" in line and "---" not in line:
+        return [c.strip() for c in line.split("|") if c.strip()]
+    return None
+
+
+class _Subsection:
+    """### 見出しのサブセクション
+
+    見出しは "### " 直後から最初に文字のある行（前後の空白を除去）。
+    見出しが空白だけの場合は次に文字のある行が見出しになる。
+    """
+
+    def __init__(self, header_rest: str):
+        self.title: Optional[str] = None
+        self.lines: list[str] = []
+        self.feed(header_rest)
+
+    def feed(self, line: str) -> None:
+        if self.title is None:
+            if line.strip():
+                self.title = line.strip()
+            return
+        self.lines.append(line)
+
+    @property
+    def header(self) -> str:
+        return self.title or ""
+
+
+# ===== セクションハンドラ =====
+
+class SectionHandler:
+    """セクションの行（見出し行を含む）を1行ずつ受け取り、終了時に結果へ書き込む"""
+
+    def feed(self, line: str) -> None:
+        raise NotImplementedError
+
+    def finish(self, result: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+
+class _SubsectionHandler(SectionHandler):
+    """### 見出しで区切られたサブセクションを集めるハンドラの基底クラス"""
+
+    def __init__(self):
+        self.started = False
+        self.subsections: list[_Subsection] = []
+
+    def feed(self, line: str) -> None:
+        if self.started and line.startswith("### "):
+            self.subsections.append(_Subsection(line[4:]))
+        elif self.subsections:
+            self.subsections[-1].feed(line)
+        self.started = True
+
+
+class ActionRequiredHandler(_SubsectionHandler):
+    """要対応セクション"""
+
+    def __init__(self):
+        super().__init__()
+        # ### が無い場合のフォールバック用: 見出し行の次から最初の --- までの行
+        self.body_lines: list[str] = []
+        self.body_closed = False
+
+    def feed(self, line: str) -> None:
+        if self.started and not self.body_closed:
             if line.strip() == "---":
-                break
-            body_lines.append(line)
+                self.body_closed = True
+            else:
+                self.body_lines.append(line)
+        super().feed(line)
+
+    def items(self) -> list[dict]:
+        items = []
+
+        # ### で始まるサブセクションを抽出（既存ロジック・後方互換）
+        for sub in self.subsections:
+            content_lines = []
+            for line in sub.lines:
+                if line.strip() and not line.startswith("---"):
+                    content_lines.append(line.strip())
+            items.append({
+                "title": sub.header,
+                "content": "\n".join(content_lines),
+            })
+        if items:
+            return items
 
-        body = "\n".join(body_lines).strip()
+        # ### でアイテムが見つからなかった場合のフォールバック
+        body = "\n".join(self.body_lines).strip()
 
         # 「なし」のみの場合
         if not body or body == "なし":
             return []
 
         # **【...】...** パターンでアイテムを分割
-        bold_pattern = re.compile(r'^\*\*【(.+?)】(.+?)\*\*$')
         current_title = None
         current_lines = []
-
-        for line in body_lines:
-            match = bold_pattern.match(line.strip())
+        for line in self.body_lines:
+            match = ACTION_BOLD_PATTERN.match(line.strip())
             if match:
                 # 前のアイテムを保存
                 if current_title is not None:
@@ -187,147 +681,153 @@ def parse_action_required(section: str) -> list[dict]:
                 "content": body,
             })
 
-    return items
-
-
-def parse_table(section: str) -> list[dict]:
-    """Markdownテーブルをパース"""
-    rows = []
-    lines = section.split("\n")
-
-    headers = []
-    for i, line in enumerate(lines):
-        if "|" in line and "---" not in line:
-            cells = [c.strip() for c in line.split("|") if c.strip()]
-            if not headers:
-                headers = cells
-            else:
-                if len(cells) == len(headers):
-                    if all(c == '-' for c in cells):
-                        continue
-                    row = dict(zip(headers, cells))
-                    rows.append(row)
-
-    return rows
+        return items
 
+    def finish(self, result: dict[str, Any]) -> None:
+        result["action_required"] = self.items()
 
-def parse_completed_reports(section: str) -> list[dict]:
-    """完了報告の詳細をパース"""
-    reports = []
 
-    # ### cmd_XXX 完了報告 のパターンを探す
-    subsections = re.split(r"\n### (cmd_\d+) 完了報告", section)
+class TableSectionHandler(SectionHandler):
+    """テーブル1つを正規化キーのリストとして格納するセクション"""
 
-    for i in range(1, len(subsections), 2):
-        if i + 1 < len(subsections):
-            cmd_id = subsections[i]
-            content = subsections[i + 1]
+    def __init__(self, key: str):
+        self.key = key
+        self.table = _TableParser()
 
-            report = {"cmd_id": cmd_id, "content": {}}
+    def feed(self, line: str) -> None:
+        self.table.feed(line)
 
-            # 指令と結果を抽出
-            match = re.search(r"\*\*指令\*\*:\s*(.+)", content)
-            if match:
-                report["content"]["order"] = match.group(1).strip()
+    def finish(self, result: dict[str, Any]) -> None:
+        result[self.key] = normalize_table_keys(self.table.rows)
 
-            match = re.search(r"\*\*結果\*\*:\s*(.+)", content)
-            if match:
-                report["content"]["result"] = match.group(1).strip()
 
-            reports.append(report)
+class _CompletedReport:
+    """### cmd_XXX 完了報告 ブロック"""
 
-    return reports
+    def __init__(self, cmd_id: str):
+        self.cmd_id = cmd_id
+        self.order = _MarkerValue("**指令**:")
+        self.result = _MarkerValue("**結果**:")
 
+    def feed(self, line: str) -> None:
+        self.order.feed(line)
+        self.result.feed(line)
 
-def parse_skill_candidates(section: str) -> list[dict]:
-    """スキル化候補をパース
+    def to_dict(self) -> dict:
+        report = {"cmd_id": self.cmd_id, "content": {}}
+        order = self.order.value()
+        if order is not None:
+            report["content"]["order"] = order
+        result = self.result.value()
+        if result is not None:
+            report["content"]["result"] = result
+        return report
 
-    dashboard.md 形式（2パターン対応）:
 
-    パターン1（テーブル形式）:
-    ### skill-name（新規）
-    | 項目 | 内容 |
-    |------|------|
-    | 名前 | skill-name |
-    | 説明 | 説明文 |
-    | 発見元 | cmd_XXX |
+class CompletedTodayHandler(SectionHandler):
+    """本日の戦果セクション（戦果テーブルと完了報告の詳細）"""
 
-    パターン2（箇条書き形式）:
-    - **skill-name**（cmd_XXX / 発見元）— 説明文
-    - **skill-name**（cmd_XXX / 発見元）- 説明文
-    """
-    candidates = []
+    def __init__(self):
+        self.started = False
+        self.table = _TableParser()
+        self.reports: list[_CompletedReport] = []
 
-    # 却下済み部分は除外
-    main_section = section.split("### 却下済み")[0]
+    def feed(self, line: str) -> None:
+        self.table.feed(line)
 
-    # 「なし」のみの場合は空リストを返す
-    if re.search(r"^\s*なし\s*$", main_section, re.MULTILINE):
-        return []
+        match = REPORT_HEADER_PATTERN.match(line) if self.started else None
+        self.started = True
+        if match:
+            self.reports.append(_CompletedReport(match.group(1)))
+            # 見出しの残り部分も報告本文の一部として扱う
+            line = line[match.end():]
+        if self.reports:
+            self.reports[-1].feed(line)
 
-    # パターン1: ### で始まるスキル名を探す（既存ロジック・後方互換）
-    subsections = re.split(r"\n### ", main_section)
-    for sub in subsections[1:]:
-        lines = sub.strip().split("\n")
-        if not lines:
-            continue
+    def finish(self, result: dict[str, Any]) -> None:
+        result["completed_today"] = normalize_table_keys(self.table.rows)
+        result["completed_reports"] = [report.to_dict() for report in self.reports]
 
-        # スキル名（### の後の行）
-        header = lines[0].strip()
-        # 「（新規）」などの注釈を除去してスキル名を取得
-        skill_name = re.sub(r"（.+）$", "", header).strip()
 
-        skill_info = {
-            "name": skill_name,
-            "description": "",
-            "source": "",
-            "status": "承認待ち",
-        }
+class SkillCandidatesHandler(_SubsectionHandler):
+    """スキル化候補セクション
 
-        # テーブルから詳細を抽出
-        for line in lines[1:]:
-            if "|" in line and "---" not in line:
-                cells = [c.strip() for c in line.split("|") if c.strip()]
-                if len(cells) >= 2:
-                    key = cells[0]
-                    value = cells[1]
-                    if key == "名前":
-                        skill_info["name"] = value
-                    elif key == "説明":
-                        skill_info["description"] = value
-                    elif key == "発見元":
-                        skill_info["source"] = value
-                    elif key == "汎用性":
-                        skill_info["generality"] = value
-
-        candidates.append(skill_info)
-
-    # パターン2: 箇条書き形式のフォールバック（### 形式が見つからなかった場合）
-    if not candidates:
-        # - **name**（source）— description または - **name**（source）- description
-        # emダッシュ（—）とハイフン（-）の両方に対応
-        bullet_pattern = re.compile(r'^\s*-\s+\*\*(.+?)\*\*[（(](.+?)[）)]\s*[—\-]\s*(.+)$')
-
-        lines = main_section.split("\n")
-        for line in lines:
-            # 取り消し線のある行は除外（却下済み）
-            if "~~" in line:
-                continue
+    3形式に対応: ### 見出し + 項目テーブル / 箇条書き / 一覧テーブル。
+    「### 却下済み」以降は読み飛ばす。
+    """
 
-            match = bullet_pattern.match(line)
+    def __init__(self):
+        super().__init__()
+        self.rejected = False
+        self.none = False
+        self.bullets: list[dict] = []
+        self.table = _TableParser()
+
+    def feed(self, line: str) -> None:
+        if self.rejected:
+            return
+        # 却下済み部分は除外
+        index = line.find("### 却下済み")
+        if index >= 0:
+            self.rejected = True
+            line = line[:index]
+
+        if line.strip() == "なし":
+            self.none = True
+
+        super().feed(line)
+
+        # 箇条書き形式（取り消し線のある行は却下済みとして除外）
+        if "~~" not in line:
+            match = SKILL_BULLET_PATTERN.match(line)
             if match:
-                skill_info = {
+                self.bullets.append({
                     "name": match.group(1).strip(),
                     "source": match.group(2).strip(),
                     "description": match.group(3).strip(),
                     "status": "承認待ち",
-                }
-                candidates.append(skill_info)
+                })
+
+        self.table.feed(line)
+
+    def candidates(self) -> list[dict]:
+        # 「なし」のみの場合は空リストを返す
+        if self.none:
+            return []
+
+        # パターン1: ### で始まるスキル名
+        candidates = []
+        for sub in self.subsections:
+            # 「（新規）」などの注釈を除去してスキル名を取得
+            skill_info = {
+                "name": SKILL_ANNOTATION_PATTERN.sub("", sub.header).strip(),
+                "description": "",
+                "source": "",
+                "status": "承認待ち",
+            }
+            for line in sub.lines:
+                cells = _table_cells(line)
+                if cells is None or len(cells) < 2:
+                    continue
+                key, value = cells[0], cells[1]
+                if key == "名前":
+                    skill_info["name"] = value
+                elif key == "説明":
+                    skill_info["description"] = value
+                elif key == "発見元":
+                    skill_info["source"] = value
+                elif key == "汎用性":
+                    skill_info["generality"] = value
+            candidates.append(skill_info)
+        if candidates:
+            return candidates
+
+        # パターン2: 箇条書き形式
+        if self.bullets:
+            return self.bullets
 
-    # パターン3: テーブル形式のフォールバック（| スキル名 | 概要 | ... |）
-    if not candidates:
-        rows = parse_table(main_section)
-        for row in rows:
+        # パターン3: テーブル形式（| スキル名 | 概要 | ... |）
+        for row in self.table.rows:
             name = row.get("スキル名", row.get("名前", ""))
             if not name:
                 continue
@@ -341,58 +841,184 @@ def parse_skill_candidates(section: str) -> list[dict]:
             if generality:
                 skill_info["generality"] = generality
             candidates.append(skill_info)
+        return candidates
 
-    return candidates
+    def finish(self, result: dict[str, Any]) -> None:
+        result["skill_candidates"] = self.candidates()
 
 
-def parse_generated_skills(section: str) -> list[dict]:
-    """生成されたスキルをパース"""
-    skills = []
+class GeneratedSkillsHandler(_SubsectionHandler):
+    """生成されたスキルセクション"""
 
-    # ### で始まるスキル名を探す
-    subsections = re.split(r"\n### ", section)
-    for sub in subsections[1:]:
-        lines = sub.strip().split("\n")
-        if not lines:
-            continue
+    FIELDS = {
+        "設計書": "design_doc",
+        "説明": "description",
+        "対応言語": "languages",
+        "生成日": "created_at",
+    }
+
+    def skills(self) -> list[dict]:
+        skills = []
+        for sub in self.subsections:
+            skill_info = {"name": sub.header}
+            # テーブルから詳細を抽出
+            for line in sub.lines:
+                cells = _table_cells(line)
+                if cells is None or len(cells) < 2:
+                    continue
+                field = self.FIELDS.get(cells[0])
+                if field:
+                    skill_info[field] = cells[1]
+            skills.append(skill_info)
+        return skills
+
+    def finish(self, result: dict[str, Any]) -> None:
+        result["generated_skills"] = self.skills()
+
+
+class SimpleListHandler(SectionHandler):
+    """「- 項目」形式のリスト（「なし」があれば空リスト）"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.items: list[str] = []
+        self.none = False
+
+    def feed(self, line: str) -> None:
+        if self.none:
+            return
+        line = line.strip()
+        if line.startswith("- "):
+            self.items.append(line[2:])
+        elif line == "なし":
+            self.none = True
 
-        skill_name = lines[0].strip()
-        skill_info = {"name": skill_name}
+    def finish(self, result: dict[str, Any]) -> None:
+        result[self.key] = [] if self.none else self.items
 
-        # テーブルから詳細を抽出
-        for line in lines[1:]:
-            if "|" in line and "---" not in line:
-                cells = [c.strip() for c in line.split("|") if c.strip()]
-                if len(cells) >= 2:
-                    key = cells[0]
-                    value = cells[1]
-                    if key == "設計書":
-                        skill_info["design_doc"] = value
-                    elif key == "説明":
-                        skill_info["description"] = value
-                    elif key == "対応言語":
-                        skill_info["languages"] = value
-                    elif key == "生成日":
-                        skill_info["created_at"] = value
 
-        skills.append(skill_info)
+# ===== セクションハンドラの登録 =====
 
-    return skills
+# (絵文字を除去した見出しの接頭辞, ハンドラのファクトリ)。先に登録したものから前方一致で判定する
+_section_handlers: list[tuple[str, Callable[[], SectionHandler]]] = []
+# 見出し行 → 解決したファクトリ（対象外は None）
+_section_title_cache: dict[str, Optional[Callable[[], SectionHandler]]] = {}
+# 登録のたびに増やす。パース結果のキャッシュはこれが変わると作り直す
+_section_handler_generation = 0
 
 
-def parse_simple_list(section: str) -> list[str]:
-    """シンプルなリストをパース"""
-    items = []
-    lines = section.split("\n")
+def register_section_handler(
+    prefix: str,
+    factory: Callable[[], SectionHandler],
+    first: bool = False,
+) -> None:
+    """セクションハンドラを登録する
+
+    モジュール外から独自セクションのパースを追加するためのフック。
+    ハンドラは finish で結果dictに任意のキーを書き込める。
+    最初のパースの後に登録してもよい（IncrementalDashboardParser・DashboardCache は
+    次のパースで全体を作り直す）。
+
+    Args:
+        prefix: セクション見出しの接頭辞（先頭の絵文字は無視される）
+        factory: 引数なしで SectionHandler を返す呼び出し可能オブジェクト（クラス等）
+        first: True なら登録済みのハンドラより優先する
+    """
+    global _section_handler_generation
+    entry = (strip_emoji(prefix), factory)
+    if first:
+        _section_handlers.insert(0, entry)
+    else:
+        _section_handlers.append(entry)
+    _section_title_cache.clear()
+    _section_handler_generation += 1
+
+
+def resolve_section_handler(title: str) -> Optional[Callable[[], SectionHandler]]:
+    """セクション見出し（"## " を除いた部分）に対応するファクトリを返す"""
+    try:
+        return _section_title_cache[title]
+    except KeyError:
+        pass
+
+    normalized = strip_emoji(title)
+    factory = None
+    for prefix, candidate in _section_handlers:
+        if normalized.startswith(prefix):
+            factory = candidate
+            break
+
+    if len(_section_title_cache) >= SECTION_TITLE_CACHE_SIZE:
+        _section_title_cache.clear()
+    _section_title_cache[title] = factory
+    return factory
+
+
+register_section_handler("要対応", ActionRequiredHandler)
+register_section_handler("進行中", partial(TableSectionHandler, "in_progress"))
+register_section_handler("本日の戦果", CompletedTodayHandler)
+register_section_handler("スキル化候補", SkillCandidatesHandler)
+register_section_handler("生成されたスキル", GeneratedSkillsHandler)
+register_section_handler("待機中", partial(SimpleListHandler, "waiting"))
+register_section_handler("伺い事項", partial(SimpleListHandler, "inquiries"))
+
+
+# ===== セクション単位のパース関数（セクション本文の文字列を受け取る） =====
+
+def _feed_section(handler, section: str):
+    for line in section.split("\n"):
+        handler.feed(line)
+    return handler
+
+
+def parse_action_required(section: str) -> list[dict]:
+    """要対応セクションをパース"""
+    return _feed_section(ActionRequiredHandler(), section).items()
+
+
+def parse_table(section: str) -> list[dict]:
+    """Markdownテーブルをパース"""
+    return _feed_section(_TableParser(), section).rows
+
+
+def parse_completed_reports(section: str) -> list[dict]:
+    """完了報告の詳細をパース"""
+    handler = _feed_section(CompletedTodayHandler(), section)
+    return [report.to_dict() for report in handler.reports]
+
+
+def parse_skill_candidates(section: str) -> list[dict]:
+    """スキル化候補をパース
+
+    dashboard.md 形式（3パターン対応）:
+
+    パターン1（### 見出し + 項目テーブル形式）:
+    ### skill-name（新規）
+    | 項目 | 内容 |
+    |------|------|
+    | 名前 | skill-name |
+    | 説明 | 説明文 |
+    | 発見元 | cmd_XXX |
+
+    パターン2（箇条書き形式）:
+    - **skill-name**（cmd_XXX / 発見元）— 説明文
+    - **skill-name**（cmd_XXX / 発見元）- 説明文
+
+    パターン3（一覧テーブル形式）:
+    | スキル名 | 概要 | 検出元 | 状態 |
+    """
+    return _feed_section(SkillCandidatesHandler(), section).candidates()
 
-    for line in lines:
-        line = line.strip()
-        if line.startswith("- "):
-            items.append(line[2:])
-        elif line == "なし":
-            return []
 
-    return items
+def parse_generated_skills(section: str) -> list[dict]:
+    """生成されたスキルをパース"""
+    return _feed_section(GeneratedSkillsHandler(), section).skills()
+
+
+def parse_simple_list(section: str) -> list[str]:
+    """シンプルなリストをパース"""
+    handler = _feed_section(SimpleListHandler("items"), section)
+    return [] if handler.none else handler.items
 
 
 if __name__ == "__main__":
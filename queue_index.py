@@ -0,0 +1,310 @@
+"""queue/ 配下のYAML（指示・タスク・報告）のメモリ上のインデックス
+
+家老の手順書は「parent_cmd: cmd_XXX」を grep -l で全タスクYAMLから探すが、
+GUIではファイルごとのパース結果を保持し、cmd → サブタスク → 報告、
+ステータス、担当者の索引から問い合わせに答える。
+
+ファイルの変化は (inode, mtime_ns, size) の比較で検出し、変わったファイルだけを
+再パースする（DashboardCache と同じ方式。inotify は標準ライブラリにないため
+使わない）。走査は QUEUE_SCAN_INTERVAL 秒に1回までで、その間の問い合わせは
+索引だけで答える。stat と YAML のパースはファイル数に比例して時間がかかるため、
+サーバーからは refresh をスレッドで呼ぶ。
+"""
+import datetime
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import yaml
+
+import metrics
+
+# この秒数以内に走査済みならファイルを stat せずに索引を使う
+QUEUE_SCAN_INTERVAL = 1.0
+
+# 指示キュー・タスク・報告のパス（queue ディレクトリからの相対）
+COMMANDS_FILE = "shogun_to_karo.yaml"
+TASKS_DIR = "tasks"
+REPORTS_DIR = "reports"
+
+# 報告ファイル名 "ashigaru3_report.yaml" の末尾
+REPORT_SUFFIX = "_report.yaml"
+
+# 一覧に含めるタスクYAMLの項目
+TASK_FIELDS = (
+    "task_id", "parent_cmd", "status", "description", "target_path",
+    "bloom_level", "blocked_by", "timestamp",
+)
+
+# 一覧に含める指示の項目（command 本文は /api/commands/{id} だけで返す）
+COMMAND_FIELDS = ("id", "status", "purpose", "priority", "project", "timestamp")
+
+# C実装のローダーがあれば使う（Python実装より数倍速い）
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+QUEUE_FILE_PARSES = metrics.counter(
+    "shogun_gui_queue_file_parses_total",
+    "queue/ YAML files re-parsed after a change, by result (ok, error)",
+    ("result",),
+)
+
+_ASSIGNEE_PATTERN = re.compile(r"^(.*?)(?:_report)?\.ya?ml$")
+
+
+def _plain(value: Any) -> Any:
+    """YAMLの値をJSONにできる形にする（日時は ISO 8601 文字列に）"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _assignee(path: Path) -> str:
+    """"ashigaru3.yaml" / "ashigaru3_report.yaml" → "ashigaru3" """
+    match = _ASSIGNEE_PATTERN.match(path.name)
+    return match.group(1) if match else path.stem
+
+
+def _load_yaml(path: Path) -> Any:
+    with open(path, encoding="utf-8") as f:
+        return yaml.load(f, Loader=_YAML_LOADER)
+
+
+def _parse_commands(raw: Any) -> list[dict]:
+    """shogun_to_karo.yaml の指示（トップレベルのリスト、または queue / commands キーのリスト）"""
+    if isinstance(raw, dict):
+        raw = raw.get("queue", raw.get("commands"))
+    if not isinstance(raw, list):
+        return []
+    return [_plain(item) for item in raw if isinstance(item, dict) and item.get("id")]
+
+
+def _parse_tasks(raw: Any, assignee: str) -> list[dict]:
+    """タスクYAMLのタスク（task キーの1件、または tasks キーのリスト。task_id が null なら空）"""
+    if not isinstance(raw, dict):
+        return []
+    items = raw.get("tasks") if isinstance(raw.get("tasks"), list) else [raw.get("task")]
+    tasks = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get("task_id"):
+            continue
+        task = {field: _plain(item.get(field)) for field in TASK_FIELDS}
+        task["task_id"] = str(task["task_id"])
+        task["assignee"] = assignee
+        tasks.append(task)
+    return tasks
+
+
+def _parse_report(raw: Any, assignee: str) -> Optional[dict]:
+    """報告YAML（task_id が null の初期状態なら None）"""
+    if not isinstance(raw, dict) or not raw.get("task_id"):
+        return None
+    result = raw.get("result")
+    return {
+        "task_id": str(raw["task_id"]),
+        "parent_cmd": _plain(raw.get("parent_cmd")),
+        "worker_id": _plain(raw.get("worker_id")) or assignee,
+        "status": _plain(raw.get("status")),
+        "timestamp": _plain(raw.get("timestamp")),
+        "summary": _plain(result.get("summary")) if isinstance(result, dict) else _plain(result),
+        "result": _plain(result),
+        "skill_candidate": _plain(raw.get("skill_candidate")),
+    }
+
+
+class QueueIndex:
+    """queue/ の指示・タスク・報告の索引
+
+    ファイルごとのパース結果を保持し、どれかが変わった時だけ索引
+    （cmd → タスクID、ステータス → タスクID、担当者 → タスクID）を作り直す。
+    索引の作り直しはパース済みのレコードをたどるだけで、YAMLは読まない。
+    問い合わせは索引の集合の共通部分を取るため、結果の件数に比例した時間で答える。
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.revision = 0
+        # 読めなかったファイル（queue からの相対パス） → エラー
+        self.errors: dict[str, str] = {}
+        # パス → ((inode, mtime_ns, size), パース結果)
+        self._files: dict[Path, tuple[tuple[int, int, int], Any]] = {}
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+        self.commands: dict[str, dict] = {}
+        self.tasks: dict[str, dict] = {}
+        self.reports: dict[str, dict] = {}
+        self._by_cmd: dict[str, set[str]] = {}
+        self._by_status: dict[str, set[str]] = {}
+        self._by_assignee: dict[str, set[str]] = {}
+
+    @property
+    def due(self) -> bool:
+        """前回の走査から QUEUE_SCAN_INTERVAL 秒が過ぎているか"""
+        return time.monotonic() - self._scanned_at >= QUEUE_SCAN_INTERVAL
+
+    def refresh(self, force: bool = False) -> None:
+        """変化したファイルを再パースする（QUEUE_SCAN_INTERVAL 以内なら何もしない）"""
+        if not force and not self.due:
+            return
+        with self._lock:
+            if not force and not self.due:
+                return
+            changed = False
+            seen = set()
+            for path, kind in self._candidates():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                seen.add(path)
+                key = (st.st_ino, st.st_mtime_ns, st.st_size)
+                previous = self._files.get(path)
+                if previous is not None and previous[0] == key:
+                    continue
+                parsed = self._parse(path, kind)
+                if parsed is None and previous is not None:
+                    # 書き込み途中などで読めない場合は前回の内容を使い続ける
+                    self._files[path] = (key, previous[1])
+                    continue
+                self._files[path] = (key, parsed)
+                changed = True
+            for path in [path for path in self._files if path not in seen]:
+                del self._files[path]
+                self.errors.pop(self._name(path), None)
+                changed = True
+            if changed:
+                self._rebuild()
+            self._scanned_at = time.monotonic()
+
+    def _candidates(self) -> Iterable[tuple[Path, str]]:
+        yield self.root / COMMANDS_FILE, "commands"
+        for directory, kind in ((TASKS_DIR, "tasks"), (REPORTS_DIR, "reports")):
+            try:
+                entries = list(os.scandir(self.root / directory))
+            except OSError:
+                continue
+            for entry in entries:
+                name = entry.name
+                if not name.endswith((".yaml", ".yml")) or not entry.is_file():
+                    continue
+                if (kind == "reports") != name.endswith(REPORT_SUFFIX):
+                    continue
+                yield Path(entry.path), kind
+
+    def _name(self, path: Path) -> str:
+        """errors のキー（queue ディレクトリからの相対パス）"""
+        return path.relative_to(self.root).as_posix()
+
+    def _parse(self, path: Path, kind: str) -> Optional[tuple[str, Any]]:
+        """1ファイルをパースする（読めない場合は errors に記録して None）"""
+        try:
+            raw = _load_yaml(path)
+        except (OSError, UnicodeDecodeError, yaml.YAMLError) as e:
+            self.errors[self._name(path)] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            QUEUE_FILE_PARSES.inc("error")
+            return None
+        self.errors.pop(self._name(path), None)
+        QUEUE_FILE_PARSES.inc("ok")
+        if kind == "commands":
+            return kind, _parse_commands(raw)
+        if kind == "tasks":
+            return kind, _parse_tasks(raw, _assignee(path))
+        return kind, _parse_report(raw, _assignee(path))
+
+    def _rebuild(self) -> None:
+        commands, tasks, reports = {}, {}, {}
+        for _, parsed in self._files.values():
+            if parsed is None:
+                continue
+            kind, value = parsed
+            if kind == "commands":
+                commands.update((str(command["id"]), command) for command in value)
+            elif kind == "tasks":
+                tasks.update((task["task_id"], task) for task in value)
+            elif value is not None:
+                reports[value["task_id"]] = value
+
+        # 報告だけが残っているタスク（担当者が次のタスクに移った後など）も一覧に含める
+        for task_id, report in reports.items():
+            if task_id not in tasks:
+                tasks[task_id] = {
+                    **{field: None for field in TASK_FIELDS},
+                    "task_id": task_id,
+                    "parent_cmd": report["parent_cmd"],
+                    "status": report["status"],
+                    "timestamp": report["timestamp"],
+                    "assignee": report["worker_id"],
+                }
+
+        by_cmd: dict[str, set[str]] = {}
+        by_status: dict[str, set[str]] = {}
+        by_assignee: dict[str, set[str]] = {}
+        for task_id, task in tasks.items():
+            by_cmd.setdefault(str(task["parent_cmd"]), set()).add(task_id)
+            by_status.setdefault(str(task["status"]), set()).add(task_id)
+            by_assignee.setdefault(str(task["assignee"]), set()).add(task_id)
+
+        self.commands, self.tasks, self.reports = commands, tasks, reports
+        self._by_cmd, self._by_status, self._by_assignee = by_cmd, by_status, by_assignee
+        self.revision += 1
+
+    def task_view(self, task_id: str) -> dict:
+        """タスクと、その報告（あれば）"""
+        return {**self.tasks[task_id], "report": self.reports.get(task_id)}
+
+    def find_tasks(
+        self,
+        cmd: Optional[str] = None,
+        status: Optional[Iterable[str]] = None,
+        assignee: Optional[Iterable[str]] = None,
+    ) -> list[dict]:
+        """条件に合うタスクを task_id 順に返す（status / assignee は複数指定で OR）"""
+        sets = []
+        if cmd is not None:
+            sets.append(self._by_cmd.get(cmd, set()))
+        for values, index in ((status, self._by_status), (assignee, self._by_assignee)):
+            if values is not None:
+                sets.append(set().union(*(index.get(value, set()) for value in values)))
+        if sets:
+            sets.sort(key=len)
+            task_ids = sets[0].intersection(*sets[1:])
+        else:
+            task_ids = self.tasks.keys()
+        return [self.task_view(task_id) for task_id in sorted(task_ids)]
+
+    def command_summary(self, cmd_id: str) -> dict:
+        """指示の主な項目と、サブタスクのステータスごとの件数"""
+        command = self.commands.get(cmd_id, {"id": cmd_id})
+        progress: dict[str, int] = {}
+        for task_id in self._by_cmd.get(cmd_id, ()):
+            status = str(self.tasks[task_id]["status"])
+            progress[status] = progress.get(status, 0) + 1
+        summary = {field: command.get(field) for field in COMMAND_FIELDS}
+        summary["id"] = cmd_id
+        summary["subtasks"] = sum(progress.values())
+        summary["progress"] = dict(sorted(progress.items()))
+        return summary
+
+    def find_commands(self, status: Optional[Iterable[str]] = None) -> list[dict]:
+        """指示の一覧（shogun_to_karo.yaml の順。status は複数指定で OR）"""
+        statuses = set(status) if status is not None else None
+        return [
+            self.command_summary(cmd_id) for cmd_id, command in self.commands.items()
+            if statuses is None or str(command.get("status")) in statuses
+        ]
+
+    def command_detail(self, cmd_id: str) -> Optional[dict]:
+        """指示の全項目とサブタスク（報告付き）。指示にもタスクにもなければ None"""
+        if cmd_id not in self.commands and cmd_id not in self._by_cmd:
+            return None
+        return {
+            **self.commands.get(cmd_id, {}),
+            **self.command_summary(cmd_id),
+            "tasks": self.find_tasks(cmd=cmd_id),
+        }
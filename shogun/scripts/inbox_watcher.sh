@@ -24,6 +24,8 @@ CLI_TYPE="${3:-claude}"  # CLI種別（claude/codex/copilot）。未指定→cla
 
 INBOX="$SCRIPT_DIR/queue/inbox/${AGENT_ID}.yaml"
 LOCKFILE="${INBOX}.lock"
+# GUI の追記型ストア（既読カーソル以降だけを走査する）。無ければ従来の方式で読む
+INBOX_PY="${SHOGUN_INBOX_PY:-$SCRIPT_DIR/../inbox.py}"
 SEND_KEYS_TIMEOUT=5  # seconds — prevents hang (PID 274337 incident)
 
 if [ -z "$AGENT_ID" ] || [ -z "$PANE_TARGET" ]; then
@@ -48,6 +50,11 @@ fi
 # ─── Extract unread message info (with flock for write safety) ───
 # Returns JSON lines: {"count": N, "has_special": true/false, "specials": [...]}
 get_unread_info() {
+    if [ -f "$INBOX_PY" ]; then
+        python3 "$INBOX_PY" unread "$INBOX" --take-specials 2>/dev/null \
+            || echo '{"count": 0, "specials": []}'
+        return
+    fi
     (
         flock -x -w 5 200 || { echo '{"count": 0, "specials": []}'; exit 0; }
         INBOX_PATH="$INBOX" python3 -c '
@@ -219,4 +226,9 @@ while true; do
     sleep 0.3
 
     process_unread
+
+    # 待ち時間切れ（静かな時）に古い既読メッセージを整理する
+    if [ "$rc" -eq 2 ] && [ -f "$INBOX_PY" ]; then
+        python3 "$INBOX_PY" compact "$INBOX" >/dev/null 2>&1 || true
+    fi
 done
@@ -14,12 +14,29 @@ FROM="${4:-unknown}"
 INBOX="$SCRIPT_DIR/queue/inbox/${TARGET}.yaml"
 LOCKFILE="${INBOX}.lock"
 
+# GUI の追記型ストア（ファイル全体を読み書きしない）。無ければ従来の方式で書く
+INBOX_PY="${SHOGUN_INBOX_PY:-$SCRIPT_DIR/../inbox.py}"
+
 # Validate arguments
 if [ -z "$TARGET" ] || [ -z "$CONTENT" ]; then
     echo "Usage: inbox_write.sh <target_agent> <content> [type] [from]" >&2
     exit 1
 fi
 
+if [ -f "$INBOX_PY" ]; then
+    # inbox.py が同じ ${INBOX}.lock で排他する（ロック待ちは5秒・3回まで再試行）
+    attempt=0
+    while [ $attempt -lt 3 ]; do
+        if python3 "$INBOX_PY" write "$INBOX" "$CONTENT" --type "$TYPE" --from "$FROM" >/dev/null; then
+            exit 0
+        fi
+        attempt=$((attempt + 1))
+        [ $attempt -lt 3 ] && sleep 1
+    done
+    echo "[inbox_write] Failed to write $INBOX after 3 attempts" >&2
+    exit 1
+fi
+
 # Initialize inbox if not exists
 if [ ! -f "$INBOX" ]; then
     mkdir -p "$(dirname "$INBOX")"
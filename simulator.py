@@ -0,0 +1,230 @@
+"""tmux を使わずにエージェントのペインを模擬するバックエンド（負荷試験・再現用）"""
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterable, Optional
+
+from panes import TMUX_COMMAND_TIMEOUT, TMUX_TIMEOUT, TMUX_TIMEOUT_ERROR, PaneInfo, PaneSample
+
+# ペインごとに保持する出力の行数
+SIMULATED_HISTORY = 2000
+
+# ペインに割り当てるCLI種別（ターゲットの順に巡回する。将軍は claude）
+SIMULATED_CLIS = ("claude", "codex", "copilot", "kimi")
+
+# 1回の advance で生成する行数の上限（長時間キャプチャされなかったペイン用）
+MAX_LINES_PER_ADVANCE = 500
+
+SPINNER_FRAMES = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+
+# CLI種別ごとの出力の見た目（ステータス判定が実機と同じ結果になる書式）
+CLI_STYLES = {
+    "claude": {
+        "busy": "{spinner} Thinking… ({elapsed}s · esc to interrupt)",
+        "idle": ["─" * 60, "❯ ", "─" * 60, "  ⏵⏵ bypass permissions on (shift+tab to cycle)"],
+        "logs": ["⏺ Read(src/{module}.py)", "  ⎿  Read {count} lines", "⏺ Update(src/{module}.py)",
+                 "  ⎿  Updated src/{module}.py with {count} additions", "⏺ Bash(pytest -q)",
+                 "  ⎿  {count} passed"],
+        "prompt": "❯ ",
+    },
+    "codex": {
+        "busy": "{spinner} Working ({elapsed}s) - running",
+        "idle": ["", "> "],
+        "logs": ["• Ran rg -n {module} src", "  └ {count} matches", "• Edited src/{module}.py (+{count} -2)",
+                 "• Ran python -m pytest -q", "  └ {count} passed"],
+        "prompt": "> ",
+    },
+    "copilot": {
+        "busy": "{spinner} Thinking ({elapsed}s)",
+        "idle": ["", "> "],
+        "logs": ["✓ Read src/{module}.py", "✓ Edit src/{module}.py", "$ npm test", "  {count} passing"],
+        "prompt": "> ",
+    },
+    "kimi": {
+        "busy": "{spinner} thinking ({elapsed}s)",
+        "idle": ["", "❯ "],
+        "logs": ["Used ReadFile (src/{module}.py)", "Used StrReplaceFile (src/{module}.py)",
+                 "Used Shell (make test)", "  {count} tests ok"],
+        "prompt": "❯ ",
+    },
+}
+
+
+@dataclass
+class SimulationConfig:
+    """模擬バックエンドの設定
+
+    latency/jitter: tmux 呼び出し1回の遅延（latency + 0〜jitter 秒）
+    stall_rate/stall: stall_rate の確率で呼び出しが stall 秒止まる（tmux のハングの再現）
+    churn: busy のペインが1秒あたりに出力する行数
+    busy/idle: busy・idle が続く平均秒数（指数分布。0 より大きいこと）
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    stall_rate: float = 0.0
+    stall: float = 5.0
+    churn: float = 2.0
+    busy: float = 20.0
+    idle: float = 30.0
+    seed: Optional[int] = None
+
+
+def parse_simulation_spec(spec: str) -> SimulationConfig:
+    """"latency=0.01,churn=5,stall_rate=0.01" 形式の設定を解釈する
+
+    Raises:
+        ValueError: 未知のキー・数値でない値・負の値がある場合
+    """
+    config = SimulationConfig()
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, sep, value = item.partition("=")
+        key = key.strip()
+        if not sep or key not in SimulationConfig.__dataclass_fields__:
+            raise ValueError(f"Invalid simulation option: {item}")
+        try:
+            number = int(value) if key == "seed" else float(value)
+        except ValueError:
+            raise ValueError(f"Invalid simulation option: {item}")
+        if number < 0 or (key in ("busy", "idle") and number == 0):
+            raise ValueError(f"Invalid simulation option: {item}")
+        setattr(config, key, number)
+    return config
+
+
+@dataclass
+class SimulatedPane:
+    """1ペイン分の模擬状態"""
+    target: str
+    pane_id: str
+    cli_type: str
+    lines: deque = field(default_factory=lambda: deque(maxlen=SIMULATED_HISTORY))
+    busy: bool = False
+    state_since: float = 0.0
+    state_until: float = 0.0
+    advanced_at: float = 0.0
+    pending_lines: float = 0.0
+    pending_input: str = ""
+
+
+class SimulatedBackend:
+    """CLI種別ごとの実機に似た出力を生成する、メモリ上の模擬ペイン
+
+    ペインは busy と idle を指数分布の時間で行き来し、busy の間は churn 行/秒で
+    ツール呼び出し風のログを出力する。末尾には busy ならスピナー、idle なら
+    プロンプトとステータスバーを表示するため、detect_pane_status は実機と同じ
+    判定をする。状態は呼び出し時に経過時間分だけ進めるので、バックグラウンドの
+    タスクは持たない。
+
+    send_keys で送った指示はプロンプト行として出力に残り、Enter でペインが busy になる。
+    """
+
+    def __init__(self, targets: Iterable[str], config: Optional[SimulationConfig] = None):
+        self.config = config or SimulationConfig()
+        self._random = random.Random(self.config.seed)
+        self.panes: dict[str, SimulatedPane] = {}
+        self.set_targets(targets)
+
+    def set_targets(self, targets: Iterable[str]) -> None:
+        """模擬するペインを揃える（既存のペインの状態は保つ）"""
+        now = time.time()
+        for target in targets:
+            if target in self.panes:
+                continue
+            number = len(self.panes)
+            cli_type = "claude" if number == 0 else SIMULATED_CLIS[(number - 1) % len(SIMULATED_CLIS)]
+            pane = SimulatedPane(target, f"%{number}", cli_type, state_since=now, advanced_at=now)
+            self._switch_state(pane, now, busy=self._random.random() < 0.5)
+            self.panes[target] = pane
+
+    async def list_panes(self) -> dict[str, PaneInfo]:
+        await self._delay(TMUX_TIMEOUT)
+        return {
+            target: PaneInfo(pane.pane_id, str(10000 + int(pane.pane_id[1:])), pane.cli_type)
+            for target, pane in self.panes.items()
+        }
+
+    async def capture_pane(self, target: str, start: int) -> PaneSample:
+        try:
+            await self._delay(TMUX_TIMEOUT)
+        except asyncio.TimeoutError:
+            return PaneSample(target=target, error=TMUX_TIMEOUT_ERROR)
+        pane = self.panes.get(target)
+        if pane is None:
+            return PaneSample(target=target, error="Failed to capture pane: can't find pane")
+        now = time.time()
+        self._advance(pane, now)
+        return PaneSample(target=target, output=self._render(pane, now, -start))
+
+    async def send_keys(
+        self, target: str, *keys: str, timeout: float = TMUX_COMMAND_TIMEOUT
+    ) -> tuple[int, str, str]:
+        await self._delay(timeout)
+        pane = self.panes.get(target)
+        if pane is None:
+            return 1, "", f"can't find pane: {target}"
+        now = time.time()
+        self._advance(pane, now)
+        for key in keys:
+            if key == "Enter":
+                pane.lines.append(CLI_STYLES[pane.cli_type]["prompt"] + pane.pending_input)
+                pane.pending_input = ""
+                self._switch_state(pane, now, busy=True)
+            else:
+                pane.pending_input += key
+        return 0, "", ""
+
+    async def _delay(self, timeout: float) -> None:
+        """tmux 呼び出し1回分の遅延を再現する（timeout を超える場合は TimeoutError）"""
+        config = self.config
+        delay = config.latency + self._random.random() * config.jitter
+        if config.stall_rate and self._random.random() < config.stall_rate:
+            delay += config.stall
+        if delay > timeout:
+            await asyncio.sleep(timeout)
+            raise asyncio.TimeoutError
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _switch_state(self, pane: SimulatedPane, now: float, busy: bool) -> None:
+        if pane.busy and not busy:
+            pane.lines.append(f"✔ Task finished in {int(now - pane.state_since)}s")
+            pane.lines.append("")
+        pane.busy = busy
+        pane.state_since = now
+        mean = self.config.busy if busy else self.config.idle
+        pane.state_until = now + self._random.expovariate(1 / mean)
+
+    def _advance(self, pane: SimulatedPane, now: float) -> None:
+        """前回から now までの出力と状態の遷移を生成する"""
+        generated = 0
+        while pane.advanced_at < now and generated < MAX_LINES_PER_ADVANCE:
+            until = min(now, pane.state_until)
+            if pane.busy:
+                pane.pending_lines += (until - pane.advanced_at) * self.config.churn
+                while pane.pending_lines >= 1 and generated < MAX_LINES_PER_ADVANCE:
+                    pane.lines.append(self._log_line(pane.cli_type))
+                    pane.pending_lines -= 1
+                    generated += 1
+            pane.advanced_at = until
+            if until >= pane.state_until:
+                self._switch_state(pane, until, busy=not pane.busy)
+                generated += 1
+        pane.advanced_at = now
+
+    def _log_line(self, cli_type: str) -> str:
+        template = self._random.choice(CLI_STYLES[cli_type]["logs"])
+        return template.format(module=f"module_{self._random.randrange(40)}", count=self._random.randrange(1, 300))
+
+    def _render(self, pane: SimulatedPane, now: float, line_count: int) -> str:
+        style = CLI_STYLES[pane.cli_type]
+        if pane.busy:
+            frame = SPINNER_FRAMES[int(now * 10) % len(SPINNER_FRAMES)]
+            tail = ["", style["busy"].format(spinner=frame, elapsed=int(now - pane.state_since))]
+        else:
+            tail = list(style["idle"])
+        history = min(max(line_count - len(tail), 0), len(pane.lines))
+        lines = list(islice(pane.lines, len(pane.lines) - history, None))
+        return "\n".join(lines + tail) + "\n"
@@ -3,28 +3,45 @@
  */
 
 const API_ENDPOINT = '/api/dashboard';
-const REFRESH_INTERVAL = 5000; // 5秒
+const STREAM_ENDPOINT = '/api/stream';
+const STREAM_TOPICS = 'dashboard_diff,ashigaru_status,shogun,karo';
 
-let refreshTimer = null;
+let dashboardStream = null; // ダッシュボード・将軍・家老・足軽ステータスのプッシュ購読
+let autoRefreshEnabled = true;
 let cachedSkillCandidates = []; // スキル候補データをキャッシュ
-let karoRefreshTimer = null;
-const KARO_REFRESH_INTERVAL = 5000;
-
-// 通知用の前回カウント
-let prevActionRequiredCount = null;
-let prevCompletedTodayCount = null;
+let dashboardData = null; // ストリームで受信中のダッシュボード（差分の適用先）
 let notificationsEnabled = false;
 
+// 条件付きリクエスト用: URL → { etag, data }
+const etagCache = new Map();
+
+/**
+ * ETag付きでJSONを取得する（304 Not Modified なら前回のデータを返す）
+ */
+async function fetchJson(url) {
+    const cached = etagCache.get(url);
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    const response = await fetch(url, { headers, cache: 'no-store' });
+    if (response.status === 304 && cached) {
+        return cached.data;
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP error: ${response.status}`);
+    }
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        etagCache.set(url, { etag, data });
+    }
+    return data;
+}
+
 /**
  * ダッシュボードデータを取得
  */
 async function fetchDashboard() {
     try {
-        const response = await fetch(API_ENDPOINT);
-        if (!response.ok) {
-            throw new Error(`HTTP error: ${response.status}`);
-        }
-        return await response.json();
+        return await fetchJson(API_ENDPOINT);
     } catch (error) {
         console.error('Failed to fetch dashboard:', error);
         return null;
@@ -463,6 +480,16 @@ async function updateDashboard() {
     const data = await fetchDashboard();
     if (!data) return;
 
+    renderDashboard(data);
+
+    // 足軽ステータスバーを更新
+    fetchAshigaruStatus();
+}
+
+/**
+ * ダッシュボードデータを描画
+ */
+function renderDashboard(data) {
     if (data.error) {
         console.error('Dashboard error:', data.error);
         return;
@@ -481,12 +508,50 @@ async function updateDashboard() {
     renderGeneratedSkills(data.generated_skills);
     renderWaiting(data.waiting);
     renderInquiries(data.inquiries);
+}
 
-    // 足軽ステータスバーを更新
-    fetchAshigaruStatus();
+// 差分で変化したセクション（パース結果のキー）→ そのカードの描画
+const SECTION_RENDERERS = {
+    in_progress: (data) => renderInProgress(data.in_progress),
+    completed_today: (data) => renderCompletedToday(data.completed_today),
+    generated_skills: (data) => renderGeneratedSkills(data.generated_skills),
+    waiting: (data) => renderWaiting(data.waiting),
+    inquiries: (data) => renderInquiries(data.inquiries),
+};
+
+/**
+ * ダッシュボードの差分（/api/dashboard/diff 形式）を適用し、変化したカードだけ描画する
+ */
+function applyDashboardDiff(diff) {
+    if (diff.reset) {
+        dashboardData = diff.dashboard;
+        if (autoRefreshEnabled) renderDashboard(dashboardData);
+        return;
+    }
+    if (!dashboardData) return;
+
+    const sections = diff.sections || {};
+    const data = Object.assign({}, dashboardData, { last_updated: diff.last_updated });
+    for (const [key, section] of Object.entries(sections)) {
+        data[key] = section.rows;
+    }
+    dashboardData = data;
+    if (!autoRefreshEnabled) return;
+
+    document.getElementById('last-updated').textContent = data.last_updated || '-';
+    if (sections.skill_candidates) {
+        renderSkillCandidates(data.skill_candidates);
+    }
+    // 要対応カードにはスキル候補バッジも含まれる
+    if (sections.action_required || sections.skill_candidates) {
+        renderActionRequired(data.action_required, data.skill_candidates);
+    }
+    for (const key of Object.keys(sections)) {
+        if (SECTION_RENDERERS[key]) SECTION_RENDERERS[key](data);
+    }
 
     // ブラウザ通知チェック
-    checkAndNotify(data);
+    notifyDashboardDiff(sections);
 }
 
 /**
@@ -497,13 +562,27 @@ async function fetchAshigaruStatus() {
     if (!container) return;
 
     try {
-        const response = await fetch('/api/pane/ashigaru/status');
-        if (!response.ok) {
-            throw new Error(`HTTP error: ${response.status}`);
-        }
+        renderAshigaruStatus(await fetchJson('/api/pane/ashigaru/status'));
+    } catch (error) {
+        console.error('Failed to fetch ashigaru status:', error);
+        container.innerHTML = '<div class="empty">' + t('empty.none') + '</div>';
+    }
+}
+
+// 足軽ID → 表示番号（足軽の数と番号はサーバーの構成に従う）
+const ashigaruNums = {};
+
+/**
+ * 足軽ステータスバーを描画
+ */
+function renderAshigaruStatus(data) {
+    const container = document.getElementById('ashigaru-status-bar');
+    if (!container) return;
 
-        const data = await response.json();
-        const statuses = data.statuses || [];
+    const statuses = data.statuses || [];
+    for (const ash of statuses) {
+        ashigaruNums[ash.id] = ash.num;
+    }
 
         // 足軽アイコンを生成（CLI種別バッジ付き）
         const iconsHtml = statuses.map(ash => {
@@ -516,7 +595,7 @@ async function fetchAshigaruStatus() {
             const title = `${t('modal.ashigaruTitle').replace('{N}', ash.num)} - ${statusText} (${cliLabel})`;
 
             return `
-                <div class="ashigaru-icon ${statusClass}" onclick="openModal('${ash.id}')" title="${escapeHtml(title)}">
+                <div class="ashigaru-icon ${statusClass}" onclick="openModal('${escapeHtml(ash.id)}')" title="${escapeHtml(title)}">
                     <span class="ashigaru-num">${ash.num}</span>
                     <span class="cli-badge cli-${cliType}">${cliLabel}</span>
                     <span class="ashigaru-status-dot"></span>
@@ -524,30 +603,81 @@ async function fetchAshigaruStatus() {
             `;
         }).join('');
 
-        container.innerHTML = iconsHtml;
-    } catch (error) {
-        console.error('Failed to fetch ashigaru status:', error);
-        container.innerHTML = '<div class="empty">' + t('empty.none') + '</div>';
-    }
+    container.innerHTML = iconsHtml;
 }
 
 /**
  * 自動更新の開始/停止
  */
 function toggleAutoRefresh(enabled) {
+    autoRefreshEnabled = enabled;
     if (enabled) {
-        refreshTimer = setInterval(updateDashboard, REFRESH_INTERVAL);
+        // 停止中に届かなかった変更を取り込む
+        updateDashboard();
+    }
+}
+
+// ===== Push Stream Functions =====
+
+// ストリームで受信中のペイン出力: トピック → { base, lines }
+const paneStates = {};
+
+/**
+ * ペイン出力の差分（base/from/lines/reset）を手元の行に適用し、
+ * 出力全体を output に入れたデータを返す
+ */
+function applyPaneDelta(topic, data) {
+    if (data.error || !Array.isArray(data.lines)) {
+        delete paneStates[topic];
+        return data;
+    }
+
+    const prev = paneStates[topic];
+    let lines;
+    if (data.reset || !prev) {
+        lines = data.lines.slice();
     } else {
-        if (refreshTimer) {
-            clearInterval(refreshTimer);
-            refreshTimer = null;
-        }
+        // 窓から外れた行（base より前）を捨て、from 以降を差し替える
+        const keepStart = Math.max(0, data.base - prev.base);
+        const keepEnd = Math.max(keepStart, data.from - prev.base);
+        lines = prev.lines.slice(keepStart, keepEnd).concat(data.lines);
     }
+    paneStates[topic] = { base: data.base, lines };
+    return Object.assign({}, data, { output: lines.join('\n') });
+}
+
+/**
+ * サーバーからの変更プッシュを購読する（変化があった時だけイベントが届く）
+ */
+function connectDashboardStream() {
+    if (dashboardStream) return;
+
+    dashboardStream = new EventSource(`${STREAM_ENDPOINT}?topics=${STREAM_TOPICS}`);
+    dashboardStream.addEventListener('dashboard_diff', (e) => {
+        // 差分は描画の有無にかかわらず適用しておく
+        applyDashboardDiff(JSON.parse(e.data));
+    });
+    dashboardStream.addEventListener('ashigaru_status', (e) => {
+        if (autoRefreshEnabled) renderAshigaruStatus(JSON.parse(e.data));
+    });
+    dashboardStream.addEventListener('shogun', (e) => {
+        // 差分は描画の有無にかかわらず適用しておく
+        const data = applyPaneDelta('shogun', JSON.parse(e.data));
+        if (shogunAutoRefreshEnabled) renderShogunOutput(data);
+    });
+    dashboardStream.addEventListener('karo', (e) => {
+        renderKaroOutput(applyPaneDelta('karo', JSON.parse(e.data)));
+    });
+    dashboardStream.onerror = () => {
+        // EventSource が自動で再接続する
+        console.warn('Stream disconnected, reconnecting...');
+    };
 }
 
 // ===== Modal Functions =====
 
 let currentAshigaruId = null;
+let modalStream = null; // 表示中の足軽出力のプッシュ購読
 
 /**
  * モーダルを開く
@@ -559,7 +689,7 @@ function openModal(ashigaruId) {
     const output = document.getElementById('modal-output');
 
     // タイトルを設定
-    const ashigaruNum = ashigaruId.replace('ashigaru', '');
+    const ashigaruNum = ashigaruNums[ashigaruId] ?? ashigaruId.replace('ashigaru', '');
     title.textContent = t('modal.ashigaruTitle').replace('{N}', ashigaruNum);
 
     // ローディング状態
@@ -570,8 +700,14 @@ function openModal(ashigaruId) {
     // モーダルを表示
     modal.setAttribute('aria-hidden', 'false');
 
-    // 足軽出力を取得
-    fetchAshigaruOutput(ashigaruId);
+    // 足軽出力を購読（接続直後に現在の出力が届く）
+    if (modalStream) modalStream.close();
+    delete paneStates[ashigaruId];
+    modalStream = new EventSource(`${STREAM_ENDPOINT}?topics=${encodeURIComponent(ashigaruId)}`);
+    modalStream.addEventListener('ashigaru_output', (e) => {
+        const data = applyPaneDelta(ashigaruId, JSON.parse(e.data));
+        if (data.ashigaru_id === currentAshigaruId) renderAshigaruOutput(data);
+    });
 }
 
 /**
@@ -581,6 +717,10 @@ function closeModal() {
     const modal = document.getElementById('ashigaru-modal');
     modal.setAttribute('aria-hidden', 'true');
     currentAshigaruId = null;
+    if (modalStream) {
+        modalStream.close();
+        modalStream = null;
+    }
 }
 
 /**
@@ -590,26 +730,7 @@ async function fetchAshigaruOutput(ashigaruId) {
     const output = document.getElementById('modal-output');
 
     try {
-        const response = await fetch(`/api/ashigaru/${ashigaruId}/output`);
-        if (!response.ok) {
-            throw new Error(`HTTP error: ${response.status}`);
-        }
-
-        const data = await response.json();
-
-        output.classList.remove('loading');
-
-        if (data.error) {
-            output.textContent = `${t('modal.error')} ${data.error}`;
-            output.classList.add('error');
-        } else if (!data.output || data.output.trim() === '') {
-            output.textContent = t('modal.noOutput');
-        } else {
-            output.textContent = data.output;
-            output.classList.remove('error');
-            // 最下部にスクロール
-            output.scrollTop = output.scrollHeight;
-        }
+        renderAshigaruOutput(await fetchJson(`/api/ashigaru/${ashigaruId}/output`));
     } catch (error) {
         console.error('Failed to fetch ashigaru output:', error);
         output.classList.remove('loading');
@@ -618,6 +739,27 @@ async function fetchAshigaruOutput(ashigaruId) {
     }
 }
 
+/**
+ * 足軽ペインの出力を描画
+ */
+function renderAshigaruOutput(data) {
+    const output = document.getElementById('modal-output');
+
+    output.classList.remove('loading');
+
+    if (data.error) {
+        output.textContent = `${t('modal.error')} ${data.error}`;
+        output.classList.add('error');
+    } else if (!data.output || data.output.trim() === '') {
+        output.textContent = t('modal.noOutput');
+    } else {
+        output.textContent = data.output;
+        output.classList.remove('error');
+        // 最下部にスクロール
+        output.scrollTop = output.scrollHeight;
+    }
+}
+
 /**
  * 進行中テーブルにクリックイベントを追加
  */
@@ -667,20 +809,13 @@ function initModalEvents() {
  * 初期化
  */
 document.addEventListener('DOMContentLoaded', () => {
-    // 初回データ取得
-    updateDashboard();
-
     // 自動更新チェックボックス
     const autoRefreshCheckbox = document.getElementById('auto-refresh');
+    autoRefreshEnabled = autoRefreshCheckbox.checked;
     autoRefreshCheckbox.addEventListener('change', (e) => {
         toggleAutoRefresh(e.target.checked);
     });
 
-    // 自動更新を開始
-    if (autoRefreshCheckbox.checked) {
-        toggleAutoRefresh(true);
-    }
-
     // モーダルイベント初期化
     initModalEvents();
 
@@ -710,12 +845,19 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // ブラウザ通知初期化
     initNotifications();
+
+    // 変更プッシュの購読を開始（接続直後に現在の状態が届く）
+    connectDashboardStream();
 });
 
 // ===== Command Input Functions =====
 
+// 送信キューの状態を確認する間隔（ミリ秒）
+const COMMAND_STATUS_POLL_MS = 1000;
+
 /**
- * 将軍への指示を送信
+ * 将軍への指示を送信キューに入れる
+ * （戻り値の id で waitForCommandDelivery を呼ぶと送信完了を待てる）
  */
 async function sendCommand(command) {
     try {
@@ -728,7 +870,9 @@ async function sendCommand(command) {
         });
 
         if (!response.ok) {
-            throw new Error(`HTTP error: ${response.status}`);
+            // 429（キューが満杯）等はサーバーの detail を表示する
+            const body = await response.json().catch(() => ({}));
+            throw new Error(body.detail || `HTTP error: ${response.status}`);
         }
 
         return await response.json();
@@ -738,6 +882,32 @@ async function sendCommand(command) {
     }
 }
 
+/**
+ * キューに入れた指示が送信される（または失敗する）まで待つ
+ * @param {string} commandId - sendCommand の戻り値の id
+ * @param {function} onProgress - 待機中の状態を受け取るコールバック
+ */
+async function waitForCommandDelivery(commandId, onProgress) {
+    while (true) {
+        let status;
+        try {
+            const response = await fetch(`/api/command/queue/${encodeURIComponent(commandId)}`, { cache: 'no-store' });
+            if (!response.ok) {
+                throw new Error(`HTTP error: ${response.status}`);
+            }
+            status = await response.json();
+        } catch (error) {
+            console.error('Failed to fetch command status:', error);
+            return { status: 'failed', error: error.message };
+        }
+        if (status.status === 'delivered' || status.status === 'failed') {
+            return status;
+        }
+        if (onProgress) onProgress(status);
+        await new Promise(resolve => setTimeout(resolve, COMMAND_STATUS_POLL_MS));
+    }
+}
+
 // ===== Approval Functions =====
 
 /**
@@ -861,10 +1031,20 @@ function initCommandInput() {
         submitBtn.innerHTML = '<span class="button-icon">⚔</span> ' + t('command.submit');
 
         if (result.success) {
-            showCommandFeedback(t('command.success'), true);
             saveCommandHistory(command);
             renderCommandHistory();
             textarea.value = '';
+            // 将軍が作業中の間はキューで待ち、idle になってから送信される
+            const delivery = await waitForCommandDelivery(result.id, (status) => {
+                // ステータスを判定できない間は、idle を待たずに送るまでの猶予中であることを示す
+                const key = status.pane_status === 'unknown' ? 'command.queuedUnknown' : 'command.queued';
+                showCommandFeedback(t(key).replace('{N}', status.position ?? 0), true);
+            });
+            if (delivery.status === 'delivered') {
+                showCommandFeedback(t('command.success'), true);
+            } else {
+                showCommandFeedback(`${t('command.failure')} ${delivery.error || t('skill.unknownSource')}`, false);
+            }
         } else {
             showCommandFeedback(`${t('command.failure')} ${result.error || t('skill.unknownSource')}`, false);
         }
@@ -881,8 +1061,7 @@ function initCommandInput() {
 
 // ===== Shogun Output Functions =====
 
-let shogunRefreshTimer = null;
-const SHOGUN_REFRESH_INTERVAL = 5000;
+let shogunAutoRefreshEnabled = true;
 
 /**
  * 将軍ペインの出力を取得
@@ -891,36 +1070,7 @@ async function fetchShogunOutput() {
     const terminal = document.getElementById('shogun-terminal');
 
     try {
-        const response = await fetch('/api/pane/shogun');
-        if (!response.ok) {
-            throw new Error(`HTTP error: ${response.status}`);
-        }
-
-        const data = await response.json();
-
-        terminal.classList.remove('loading');
-
-        if (data.error) {
-            terminal.textContent = `${t('shogun.error')} ${data.error}`;
-            terminal.classList.add('error');
-        } else if (!data.output || data.output.trim() === '') {
-            terminal.textContent = t('shogun.noOutput');
-            terminal.classList.remove('error');
-        } else {
-            // 行ごとに分割してハイライト処理
-            const lines = data.output.split('\n');
-            const htmlLines = lines.map(line => {
-                // 行が「❯ 」で始まる場合、コマンドラインとしてハイライト
-                if (line.startsWith('❯ ')) {
-                    return `<span class="command-line">${escapeHtml(line)}</span>`;
-                }
-                return escapeHtml(line);
-            });
-            terminal.innerHTML = htmlLines.join('<br>');
-            terminal.classList.remove('error');
-            // 最下部にスクロール
-            terminal.scrollTop = terminal.scrollHeight;
-        }
+        renderShogunOutput(await fetchJson('/api/pane/shogun'));
     } catch (error) {
         console.error('Failed to fetch shogun output:', error);
         terminal.classList.remove('loading');
@@ -929,20 +1079,46 @@ async function fetchShogunOutput() {
     }
 }
 
+/**
+ * 将軍ペインの出力を描画
+ */
+function renderShogunOutput(data) {
+    const terminal = document.getElementById('shogun-terminal');
+    if (!terminal) return;
+
+    terminal.classList.remove('loading');
+
+    if (data.error) {
+        terminal.textContent = `${t('shogun.error')} ${data.error}`;
+        terminal.classList.add('error');
+    } else if (!data.output || data.output.trim() === '') {
+        terminal.textContent = t('shogun.noOutput');
+        terminal.classList.remove('error');
+    } else {
+        // 行ごとに分割してハイライト処理
+        const lines = data.output.split('\n');
+        const htmlLines = lines.map(line => {
+            // 行が「❯ 」で始まる場合、コマンドラインとしてハイライト
+            if (line.startsWith('❯ ')) {
+                return `<span class="command-line">${escapeHtml(line)}</span>`;
+            }
+            return escapeHtml(line);
+        });
+        terminal.innerHTML = htmlLines.join('<br>');
+        terminal.classList.remove('error');
+        // 最下部にスクロール
+        terminal.scrollTop = terminal.scrollHeight;
+    }
+}
+
 /**
  * 将軍出力の自動更新を制御
  */
 function toggleShogunAutoRefresh(enabled) {
+    shogunAutoRefreshEnabled = enabled;
     if (enabled) {
-        // 即座に1回取得
+        // 停止中に届かなかった変更を取り込む
         fetchShogunOutput();
-        // 定期更新開始
-        shogunRefreshTimer = setInterval(fetchShogunOutput, SHOGUN_REFRESH_INTERVAL);
-    } else {
-        if (shogunRefreshTimer) {
-            clearInterval(shogunRefreshTimer);
-            shogunRefreshTimer = null;
-        }
     }
 }
 
@@ -956,9 +1132,8 @@ function initShogunOutput() {
 
     if (!refreshBtn || !autoRefreshCheckbox || !terminal) return;
 
-    // 初回読み込み
+    // 初回はストリーム接続直後の出力を待つ
     terminal.classList.add('loading');
-    fetchShogunOutput();
 
     // 手動更新ボタン
     refreshBtn.addEventListener('click', () => {
@@ -968,61 +1143,20 @@ function initShogunOutput() {
     });
 
     // 自動更新チェックボックス
+    shogunAutoRefreshEnabled = autoRefreshCheckbox.checked;
     autoRefreshCheckbox.addEventListener('change', (e) => {
         toggleShogunAutoRefresh(e.target.checked);
     });
-
-    // 自動更新を開始
-    if (autoRefreshCheckbox.checked) {
-        toggleShogunAutoRefresh(true);
-    }
 }
 
 // ===== Karo Output Functions =====
 
 async function fetchKaroOutput() {
-    const terminal = document.getElementById('karo-terminal');
     const badge = document.getElementById('karo-status-badge');
     const statusText = document.getElementById('karo-status-text');
 
     try {
-        const response = await fetch('/api/pane/karo');
-        if (!response.ok) throw new Error(`HTTP error: ${response.status}`);
-        const data = await response.json();
-
-        // バッジのステータス更新（CLI種別表示付き）
-        const karoCli = data.cli_type || 'claude';
-        const karoCliLabel = getCliLabel(karoCli);
-        if (data.status === 'busy') {
-            badge.className = 'karo-badge badge-busy';
-            statusText.textContent = `${t('karo.busy')} [${karoCliLabel}]`;
-        } else {
-            badge.className = 'karo-badge badge-idle';
-            statusText.textContent = `${t('karo.idle')} [${karoCliLabel}]`;
-        }
-
-        // ターミナル出力更新
-        if (terminal) {
-            terminal.classList.remove('loading');
-            if (data.error) {
-                terminal.textContent = `${t('karo.error')} ${data.error}`;
-                terminal.classList.add('error');
-            } else if (!data.output || data.output.trim() === '') {
-                terminal.textContent = t('karo.noOutput');
-            } else {
-                // 将軍と同じハイライト処理
-                const lines = data.output.split('\n');
-                const htmlLines = lines.map(line => {
-                    if (line.startsWith('❯ ')) {
-                        return `<span class="command-line">${escapeHtml(line)}</span>`;
-                    }
-                    return escapeHtml(line);
-                });
-                terminal.innerHTML = htmlLines.join('<br>');
-                terminal.classList.remove('error');
-                terminal.scrollTop = terminal.scrollHeight;
-            }
-        }
+        renderKaroOutput(await fetchJson('/api/pane/karo'));
     } catch (error) {
         console.error('Failed to fetch karo output:', error);
         if (badge) {
@@ -1032,6 +1166,47 @@ async function fetchKaroOutput() {
     }
 }
 
+function renderKaroOutput(data) {
+    const terminal = document.getElementById('karo-terminal');
+    const badge = document.getElementById('karo-status-badge');
+    const statusText = document.getElementById('karo-status-text');
+    if (!badge) return;
+
+    // バッジのステータス更新（CLI種別表示付き）
+    const karoCli = data.cli_type || 'claude';
+    const karoCliLabel = getCliLabel(karoCli);
+    if (data.status === 'busy') {
+        badge.className = 'karo-badge badge-busy';
+        statusText.textContent = `${t('karo.busy')} [${karoCliLabel}]`;
+    } else {
+        badge.className = 'karo-badge badge-idle';
+        statusText.textContent = `${t('karo.idle')} [${karoCliLabel}]`;
+    }
+
+    // ターミナル出力更新
+    if (terminal) {
+        terminal.classList.remove('loading');
+        if (data.error) {
+            terminal.textContent = `${t('karo.error')} ${data.error}`;
+            terminal.classList.add('error');
+        } else if (!data.output || data.output.trim() === '') {
+            terminal.textContent = t('karo.noOutput');
+        } else {
+            // 将軍と同じハイライト処理
+            const lines = data.output.split('\n');
+            const htmlLines = lines.map(line => {
+                if (line.startsWith('❯ ')) {
+                    return `<span class="command-line">${escapeHtml(line)}</span>`;
+                }
+                return escapeHtml(line);
+            });
+            terminal.innerHTML = htmlLines.join('<br>');
+            terminal.classList.remove('error');
+            terminal.scrollTop = terminal.scrollHeight;
+        }
+    }
+}
+
 function toggleKaroCollapse() {
     const collapse = document.getElementById('karo-output-collapse');
     const expanded = collapse.getAttribute('aria-expanded') === 'true';
@@ -1056,11 +1231,7 @@ function initKaroOutput() {
         closeBtn.addEventListener('click', toggleKaroCollapse);
     }
 
-    // 初回取得（バッジステータスのみ更新）
-    fetchKaroOutput();
-
-    // 定期更新開始
-    karoRefreshTimer = setInterval(fetchKaroOutput, KARO_REFRESH_INTERVAL);
+    // 以降の更新はストリームから届く（connectDashboardStream）
 }
 
 // ===== Completed Today Collapse Functions =====
@@ -1343,32 +1514,19 @@ async function toggleNotifications() {
 }
 
 /**
- * データ変化をチェックして通知
+ * ダッシュボードの差分で行が追加されていれば通知
  */
-function checkAndNotify(data) {
-    if (!data) return;
-
-    var actionCount = (data.action_required || []).length;
-    var completedCount = (data.completed_today || []).length;
+function notifyDashboardDiff(sections) {
+    if (!notificationsEnabled) return;
 
-    // 初回は初期化のみ（通知しない）
-    if (prevActionRequiredCount === null) {
-        prevActionRequiredCount = actionCount;
-        prevCompletedTodayCount = completedCount;
-        return;
+    var actionRequired = sections.action_required;
+    var completedToday = sections.completed_today;
+    if (actionRequired && actionRequired.added.length > 0) {
+        sendBrowserNotification(t('notification.title'), t('notification.actionRequired'));
     }
-
-    if (notificationsEnabled) {
-        if (actionCount > prevActionRequiredCount) {
-            sendBrowserNotification(t('notification.title'), t('notification.actionRequired'));
-        }
-        if (completedCount > prevCompletedTodayCount) {
-            sendBrowserNotification(t('notification.title'), t('notification.taskCompleted'));
-        }
+    if (completedToday && completedToday.added.length > 0) {
+        sendBrowserNotification(t('notification.title'), t('notification.taskCompleted'));
     }
-
-    prevActionRequiredCount = actionCount;
-    prevCompletedTodayCount = completedCount;
 }
 
 /**
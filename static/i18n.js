@@ -22,6 +22,8 @@
             'command.emptyWarning': 'ご命令をお書きください',
             'command.success': 'ご下命を将軍にお伝えいたしました',
             'command.failure': '送信失敗:',
+            'command.queued': '将軍の手が空くのを待っております（先に{N}件）',
+            'command.queuedUnknown': '将軍の様子が分かりませぬ。間もなくお伝えいたします（先に{N}件）',
 
             'shogun.title': '将軍 進行状況',
             'shogun.refresh': '更新',
@@ -143,6 +145,8 @@
             'command.emptyWarning': 'Please enter your orders',
             'command.success': 'Your orders have been delivered to the Shogun',
             'command.failure': 'Send failed:',
+            'command.queued': 'Waiting for the Shogun to be free ({N} ahead)',
+            'command.queuedUnknown': 'Shogun status unknown; sending shortly ({N} ahead)',
 
             'shogun.title': 'Shogun Status',
             'shogun.refresh': 'Refresh',
@@ -0,0 +1,178 @@
+"""静的ファイル（static/）のメモリ上のキャッシュ
+
+起動時に static/ のファイルを読み込み、内容のハッシュから ETag と版（version）を
+求め、テキスト系のファイルは gzip（brotli があれば br も）で圧縮しておく。
+リクエストごとにはディスクを読まず、ファイルの (inode, mtime_ns, size) を
+STATIC_CHECK_INTERVAL 秒に1回だけ確認し、変わっていれば読み直す。
+
+index.html の "/static/..." への参照は "?v=<版>" 付きのURLに書き換えて返す。
+版付きのURLは内容が変わるとURLも変わるため、ブラウザに immutable として
+長期間キャッシュさせられる（再読み込みや新しい閲覧者の取得はほぼ index.html の
+304 だけになる）。
+"""
+import gzip
+import mimetypes
+import os
+import re
+import stat
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import encoding
+from parser import make_etag
+
+# ファイルの変化を確認する間隔（秒）
+STATIC_CHECK_INTERVAL = 1.0
+
+# 事前に1回だけ圧縮するため、圧縮率を優先する
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# URLに付ける版の長さ（ETag のハッシュの先頭）
+VERSION_LENGTH = 12
+
+# 版付きURLのキャッシュ指定（1年・再検証しない）
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+INDEX_FILE = "index.html"
+
+# index.html の静的ファイルへの参照（src="/static/app.js" 等）
+_STATIC_REFERENCE = re.compile(r'((?:src|href)=")/static/([^"?#]+)(")')
+
+
+@dataclass
+class StaticAsset:
+    """読み込み済みの静的ファイル1つ"""
+    path: str
+    body: bytes
+    media_type: str
+    etag: str
+    # (inode, mtime_ns, size)。index.html を書き換えたものは None
+    key: Optional[tuple[int, int, int]] = None
+    # 圧縮方式 → 圧縮した本文（元より小さくなった方式だけ）
+    variants: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def version(self) -> str:
+        return self.etag.strip('"')[:VERSION_LENGTH]
+
+
+def _compress(body: bytes, name: str) -> bytes:
+    if name == "br":
+        return encoding.brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def build_asset(path: str, body: bytes, key: Optional[tuple[int, int, int]] = None) -> StaticAsset:
+    """本文から ETag と圧縮した本文を求める"""
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    asset = StaticAsset(path, body, media_type, make_etag(body), key)
+    if media_type.startswith(COMPRESSIBLE_TYPES):
+        for name in encoding.ENCODINGS:
+            compressed = _compress(body, name)
+            if len(compressed) < len(body):
+                asset.variants[name] = compressed
+    return asset
+
+
+class StaticAssets:
+    """static/ のファイルと、版付きURLに書き換えた index.html
+
+    Args:
+        root: static ディレクトリ
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root).resolve()
+        # static/ からの相対パス → ファイル
+        self._assets: dict[str, StaticAsset] = {}
+        # 相対パス → 最後に stat した時刻（time.monotonic()）
+        self._checked: dict[str, float] = {}
+        # ((index.html の ETag, 参照先の版...), 参照先の相対パス, 書き換えた index.html)
+        self._index: Optional[tuple[tuple, tuple[str, ...], StaticAsset]] = None
+
+    def load_all(self) -> None:
+        """static/ 配下のファイルをすべて読み込む（起動時）"""
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                self.get((Path(directory) / name).relative_to(self.root).as_posix())
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        """static/ からの相対パスのファイル（無ければ None）
+
+        Raises:
+            PermissionError: static/ の外を指すパスの場合
+        """
+        asset = self._assets.get(path)
+        if asset is not None and time.monotonic() - self._checked[path] < STATIC_CHECK_INTERVAL:
+            return asset
+
+        file_path = (self.root / path).resolve()
+        if not file_path.is_relative_to(self.root):
+            raise PermissionError(path)
+        name = file_path.relative_to(self.root).as_posix()
+        asset = self._assets.get(name)
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            self._assets.pop(name, None)
+            self._checked.pop(name, None)
+            return None
+
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if asset is None or asset.key != key:
+            try:
+                with open(file_path, "rb") as f:
+                    st = os.fstat(f.fileno())
+                    body = f.read()
+            except OSError:
+                return None
+            asset = self._assets[name] = build_asset(name, body, (st.st_ino, st.st_mtime_ns, st.st_size))
+        self._checked[name] = time.monotonic()
+        return asset
+
+    def index(self) -> Optional[StaticAsset]:
+        """"/static/..." への参照を版付きURLにした index.html（無ければ None）
+
+        書き換えた結果と参照先のパスを覚えておき、index.html と参照先の版が
+        変わるまでは本文をデコード・走査せずに使い回す。
+        """
+        page = self.get(INDEX_FILE)
+        if page is None:
+            return None
+        if self._index is not None:
+            state, names, rendered = self._index
+            if state == self._index_state(page, names):
+                return rendered
+
+        text = page.body.decode("utf-8")
+        names = tuple(dict.fromkeys(match.group(2) for match in _STATIC_REFERENCE.finditer(text)))
+        state = self._index_state(page, names)
+        references = dict(zip(names, state[1]))
+
+        def versioned(match: re.Match) -> str:
+            version = references[match.group(2)]
+            if version is None:
+                return match.group(0)
+            return f"{match.group(1)}/static/{match.group(2)}?v={version}{match.group(3)}"
+
+        rendered = build_asset(INDEX_FILE, _STATIC_REFERENCE.sub(versioned, text).encode("utf-8"))
+        self._index = (state, names, rendered)
+        return rendered
+
+    def _index_state(self, page: StaticAsset, names: tuple[str, ...]) -> tuple:
+        """index.html の ETag と参照先の版（無い・static/ の外なら None）"""
+        versions = []
+        for name in names:
+            try:
+                asset = self.get(name)
+            except PermissionError:
+                asset = None
+            versions.append(asset.version if asset is not None else None)
+        return page.etag, tuple(versions)
@@ -0,0 +1,183 @@
+"""エージェントのステータス遷移の履歴（固定サイズのリングバッファ）"""
+import time
+from array import array
+from typing import Iterable, Optional
+
+# 既定で保持する遷移の件数（1件あたり約11バイト）
+STATUS_HISTORY_CAPACITY = 8192
+
+# /api/status/history の既定の集計期間（秒）
+DEFAULT_HISTORY_WINDOWS = (300, 3600, 86400)
+
+# 記録するステータス（配列にはこの並びの番号で格納する）
+STATUSES = ("unknown", "idle", "busy")
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+class StatusHistory:
+    """全エージェントのステータス遷移を記録する
+
+    ステータスが変わった時だけ (時刻, エージェント番号, ステータス番号) を
+    array で確保した固定長のリングに書き込む。いっぱいになると古い遷移から
+    上書きするため、長時間動かしてもメモリ使用量は capacity で頭打ちになる。
+    エージェントごとの現在のステータスはリングとは別に保持するため、遷移が
+    上書きされても「最後の遷移から現在まで」の区間は失われない。
+    """
+
+    def __init__(self, capacity: int = STATUS_HISTORY_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._agents = array("H", bytes(2 * capacity))
+        self._codes = array("B", bytes(capacity))
+        self._start = 0
+        self._size = 0
+        self._agent_ids: list[str] = []
+        self._agent_numbers: dict[str, int] = {}
+        # エージェント番号 → (最後の遷移の時刻, ステータス番号)
+        self._current: dict[int, tuple[float, int]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def record(self, agent_id: str, status: str, at: Optional[float] = None) -> bool:
+        """ステータスを記録する
+
+        Returns:
+            前回と異なるステータスで、遷移として書き込んだ場合 True
+        """
+        code = _STATUS_CODES.get(status, 0)
+        number = self._agent_numbers.get(agent_id)
+        if number is None:
+            number = len(self._agent_ids)
+            self._agent_ids.append(agent_id)
+            self._agent_numbers[agent_id] = number
+        current = self._current.get(number)
+        if current is not None and current[1] == code:
+            return False
+
+        at = time.time() if at is None else at
+        index = (self._start + self._size) % self.capacity
+        if self._size == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._size += 1
+        self._times[index] = at
+        self._agents[index] = number
+        self._codes[index] = code
+        self._current[number] = (at, code)
+        return True
+
+    def current(self, agent_id: str) -> Optional[tuple[float, str]]:
+        """エージェントの (最後の遷移の時刻, 現在のステータス)"""
+        number = self._agent_numbers.get(agent_id)
+        if number is None or number not in self._current:
+            return None
+        at, code = self._current[number]
+        return at, STATUSES[code]
+
+    def oldest(self) -> Optional[float]:
+        """リングに残っている最も古い遷移の時刻"""
+        return self._times[self._start] if self._size else None
+
+    def transitions(self, agent_id: str, since: float = 0.0) -> list[tuple[float, str]]:
+        """エージェントの since 以降の遷移（古い順）"""
+        number = self._agent_numbers.get(agent_id)
+        if number is None:
+            return []
+        result = []
+        for i in range(self._size):
+            index = (self._start + i) % self.capacity
+            if self._agents[index] == number and self._times[index] >= since:
+                result.append((self._times[index], STATUSES[self._codes[index]]))
+        return result
+
+    def _segments(self, now: float) -> dict[int, list[tuple[float, float, int]]]:
+        """エージェント番号 → 記録が残っている区間 (開始, 終了, ステータス番号) の一覧"""
+        segments: dict[int, list[tuple[float, float, int]]] = {}
+        last: dict[int, tuple[float, int]] = {}
+        for i in range(self._size):
+            index = (self._start + i) % self.capacity
+            number, at, code = self._agents[index], self._times[index], self._codes[index]
+            if number in last:
+                start, previous = last[number]
+                segments.setdefault(number, []).append((start, at, previous))
+            last[number] = (at, code)
+        for number, (at, code) in self._current.items():
+            # 最後の遷移がリングから消えていても現在のステータスの区間は分かる
+            segments.setdefault(number, []).append((at, now, code))
+        return segments
+
+    def summary(
+        self,
+        windows: Iterable[float] = DEFAULT_HISTORY_WINDOWS,
+        agent_ids: Optional[Iterable[str]] = None,
+        now: Optional[float] = None,
+    ) -> dict[str, dict[str, dict]]:
+        """エージェントごと・集計期間ごとの稼働状況
+
+        Args:
+            windows: 集計期間（秒）。直近 window 秒を集計する
+            agent_ids: 対象のエージェント（省略時は記録のある全エージェント）
+
+        Returns:
+            エージェントID → 期間（秒の文字列） → 集計結果。集計結果は
+            observed（記録のある秒数）、seconds（ステータス → 秒数）、
+            utilization（observed のうち busy の割合 %）、
+            busy_streaks / idle_gaps（件数・最長・平均の秒数）。
+            busy_streaks の current は現在 busy ならその継続秒数（それ以外は 0）。
+        """
+        now = time.time() if now is None else now
+        segments = self._segments(now)
+        if agent_ids is None:
+            agent_ids = self._agent_ids
+
+        result = {}
+        for agent_id in agent_ids:
+            number = self._agent_numbers.get(agent_id)
+            agent_segments = segments.get(number, []) if number is not None else []
+            current = self._current.get(number) if number is not None else None
+            result[agent_id] = {
+                str(int(window)): _summarize(agent_segments, now - window, now, current)
+                for window in windows
+            }
+        return result
+
+
+def _summarize(
+    segments: list[tuple[float, float, int]],
+    window_start: float,
+    now: float,
+    current: Optional[tuple[float, int]],
+) -> dict:
+    seconds = [0.0] * len(STATUSES)
+    runs: dict[int, list[float]] = {_STATUS_CODES["busy"]: [], _STATUS_CODES["idle"]: []}
+    for start, end, code in segments:
+        start, end = max(start, window_start), min(end, now)
+        if end <= start:
+            continue
+        seconds[code] += end - start
+        if code in runs:
+            runs[code].append(end - start)
+
+    observed = sum(seconds)
+    busy = _STATUS_CODES["busy"]
+    return {
+        "observed": round(observed, 3),
+        "seconds": {status: round(seconds[code], 3) for code, status in enumerate(STATUSES)},
+        "utilization": round(seconds[busy] / observed * 100, 1) if observed else None,
+        "busy_streaks": {
+            **_run_stats(runs[busy]),
+            "current": round(now - current[0], 3) if current and current[1] == busy else 0,
+        },
+        "idle_gaps": _run_stats(runs[_STATUS_CODES["idle"]]),
+    }
+
+
+def _run_stats(lengths: list[float]) -> dict:
+    return {
+        "count": len(lengths),
+        "longest": round(max(lengths), 3) if lengths else 0,
+        "mean": round(sum(lengths) / len(lengths), 3) if lengths else 0,
+    }
@@ -0,0 +1,92 @@
+"""Server-Sent Events による変更プッシュ配信"""
+import asyncio
+from typing import Any, AsyncIterator, Callable, Optional
+
+from encoding import dumps
+
+# 無通信時にコメント行を送る間隔（秒）。プロキシによる切断防止と生存確認を兼ねる
+KEEPALIVE_INTERVAL = 15
+
+
+def format_event(event: str, data: str) -> str:
+    """SSEのイベント1件を組み立てる（data はJSON文字列＝改行を含まない）"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+class StreamHub:
+    """トピックごとの最新ペイロードを保持し、変化があった時だけ購読者へ配信する
+
+    ペイロードは publish 時に1回だけJSON化し、前回と同一なら破棄する。
+    購読者は保持しているリビジョンより新しいトピックだけを受け取るため、
+    何も変わっていない間は通信もシリアライズも発生しない。
+    """
+
+    def __init__(self):
+        self._topics: dict[str, tuple[int, str, str]] = {}
+        self._revision = 0
+        self._changed = asyncio.Event()
+        self.subscribers = 0
+
+    def publish(self, topic: str, event: str, payload: Any) -> bool:
+        """トピックの最新ペイロードを登録する
+
+        Returns:
+            内容が変化して配信対象になった場合 True
+        """
+        return self.publish_json(topic, event, dumps(payload).decode("utf-8"))
+
+    def publish_json(self, topic: str, event: str, data: str) -> bool:
+        """JSON化済みのペイロードを登録する（キャッシュ済みの本文をそのまま配信する場合）"""
+        current = self._topics.get(topic)
+        if current is not None and current[2] == data:
+            return False
+
+        self._revision += 1
+        self._topics[topic] = (self._revision, event, data)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        return True
+
+    def latest(self, topic: str) -> Optional[tuple[int, str, str]]:
+        """トピックの (リビジョン, イベント名, JSON文字列) を返す"""
+        return self._topics.get(topic)
+
+    async def subscribe(
+        self,
+        topics: list[str],
+        on_wake: Optional[Callable[[], None]] = None,
+        transform: Optional[Callable[[str, str, dict], str]] = None,
+    ) -> AsyncIterator[str]:
+        """購読者1人分のSSEストリームを生成する
+
+        Args:
+            topics: 購読するトピック名
+            on_wake: 待機から復帰するたびに呼ぶコールバック（サンプラーの延命など）
+            transform: 送信直前にペイロードを購読者ごとに差し替える関数
+                (topic, JSON文字列, 購読者ごとの状態dict) -> JSON文字列
+        """
+        sent: dict[str, int] = {}
+        state: dict = {}
+        self.subscribers += 1
+        try:
+            while True:
+                # 走査前にイベントを掴んでおき、yield 中の publish を取りこぼさない
+                changed = self._changed
+                for topic in topics:
+                    latest = self._topics.get(topic)
+                    if latest is None or sent.get(topic) == latest[0]:
+                        continue
+                    revision, event, data = latest
+                    sent[topic] = revision
+                    if transform is not None:
+                        data = transform(topic, data, state)
+                    yield format_event(event, data)
+
+                try:
+                    await asyncio.wait_for(changed.wait(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                if on_wake is not None:
+                    on_wake()
+        finally:
+            self.subscribers -= 1
@@ -0,0 +1,283 @@
+"""tmux コントロールモード（tmux -C）の常駐クライアント"""
+import asyncio
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+# 切断されたクライアントの再接続を試みる間隔（秒）
+CONTROL_RECONNECT_INTERVAL = 5
+
+# 接続時に送る refresh-client -B（サブスクリプション登録）のタイムアウト（秒）
+CONTROL_SUBSCRIBE_TIMEOUT = 2
+
+# コントロールモードの1行の上限（%output は長くなることがある）
+CONTROL_LINE_LIMIT = 16 * 1024 * 1024
+
+# ダブルクォート内で tmux のコマンドパーサーが特別扱いする文字
+_QUOTE_ESCAPES = {
+    "\\": "\\\\",
+    '"': '\\"',
+    "$": "\\$",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\t": "\\t",
+}
+
+
+def quote_argument(arg: str) -> str:
+    """引数がそのまま1つの引数として解釈されるよう、tmux のコマンド構文でクォートする"""
+    return '"' + "".join(_QUOTE_ESCAPES.get(char, char) for char in arg) + '"'
+
+
+class TmuxControlClient:
+    """1セッションにアタッチした tmux -C クライアント
+
+    コマンドは1本のパイプで順に送り、%begin〜%end/%error のブロックを
+    送信順に対応付けて返す。%output 通知を受けるとペインID（"%12" 等）を
+    on_output に渡す。通知はアタッチしたセッションのペインの分だけ届く。
+    それ以外の通知（%layout-change、%subscription-changed 等）は
+    on_notification に (通知名, 残りの部分) として渡す。
+
+    subscriptions には接続のたびに refresh-client -B で登録するサブスクリプションを
+    名前 → (対象, フォーマット) で指定する（tmux 3.2 以降。未対応なら無視される）。
+    """
+
+    def __init__(
+        self,
+        session: str,
+        on_output: Optional[Callable[[str], None]] = None,
+        on_notification: Optional[Callable[[str, str], None]] = None,
+        subscriptions: Optional[dict[str, tuple[str, str]]] = None,
+    ):
+        self.session = session
+        self.on_output = on_output
+        self.on_notification = on_notification
+        self.subscriptions = dict(subscriptions or {})
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending: deque[asyncio.Future] = deque()
+
+    @property
+    def connected(self) -> bool:
+        return (
+            self._proc is not None
+            and self._proc.returncode is None
+            and self._reader is not None
+            and not self._reader.done()
+        )
+
+    async def start(self) -> None:
+        """セッションにアタッチする
+
+        Raises:
+            FileNotFoundError: tmux が見つからない場合
+        """
+        self._proc = await asyncio.create_subprocess_exec(
+            "tmux", "-C", "attach-session", "-t", self.session,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=CONTROL_LINE_LIMIT,
+        )
+        self._reader = asyncio.create_task(self._read())
+
+        for name, (what, fmt) in self.subscriptions.items():
+            try:
+                await self.command(
+                    "refresh-client", "-B", f"{name}:{what}:{fmt}", timeout=CONTROL_SUBSCRIBE_TIMEOUT
+                )
+            except (ConnectionError, asyncio.TimeoutError):
+                break
+
+    async def close(self) -> None:
+        """デタッチしてプロセスを終了する"""
+        if self._proc is not None and self._proc.returncode is None:
+            # 標準入力を閉じると tmux はデタッチして終了する
+            self._proc.stdin.close()
+            try:
+                await asyncio.wait_for(self._proc.wait(), 1)
+            except asyncio.TimeoutError:
+                self._proc.kill()
+                await self._proc.wait()
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending()
+
+    async def command(self, *args: str, timeout: float) -> tuple[int, str, str]:
+        """tmux コマンドを1つ実行する
+
+        Returns:
+            run_tmux と同じ (終了コード, stdout, stderr)。%error の場合は
+            終了コード 1 とし、エラーメッセージを stderr に入れる。
+
+        Raises:
+            ConnectionError: 接続していない、または応答前に切断された場合
+            asyncio.TimeoutError: timeout 秒以内に応答がなかった場合
+        """
+        if not self.connected:
+            raise ConnectionError(f"tmux control client for {self.session} is not connected")
+
+        future = asyncio.get_running_loop().create_future()
+        # 書き込みと登録の間に await を挟まないため、応答の順序と一致する
+        self._pending.append(future)
+        self._proc.stdin.write(
+            (" ".join(quote_argument(arg) for arg in args) + "\n").encode("utf-8")
+        )
+        return await asyncio.wait_for(future, timeout)
+
+    async def _read(self) -> None:
+        block: Optional[tuple[str, bool]] = None
+        lines: list[str] = []
+        try:
+            while True:
+                raw = await self._proc.stdout.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", errors="replace").rstrip("\n")
+
+                if block is not None:
+                    # ペイン内容が偶然 "%end" で始まっても取り違えないよう、番号まで照合する
+                    fields = line.split(" ")
+                    if fields[0] in ("%end", "%error") and len(fields) >= 3 and fields[2] == block[0]:
+                        if block[1]:
+                            self._resolve(fields[0] == "%error", lines)
+                        block, lines = None, []
+                    else:
+                        lines.append(line)
+                    continue
+
+                if line.startswith("%begin "):
+                    fields = line.split(" ")
+                    # flags が 1 のブロックはこのクライアントが送ったコマンドの応答
+                    block = (fields[2], fields[3:4] == ["1"])
+                elif line.startswith(("%output ", "%extended-output ")):
+                    if self.on_output is not None:
+                        self.on_output(line.split(" ", 2)[1])
+                elif line.startswith("%exit"):
+                    break
+                elif line.startswith("%") and self.on_notification is not None:
+                    kind, _, rest = line.partition(" ")
+                    self.on_notification(kind, rest)
+        except (ValueError, ConnectionError):
+            # 行が長すぎる・パイプ切断: 接続を捨てて再接続に任せる
+            pass
+        finally:
+            if self._proc.returncode is None:
+                try:
+                    self._proc.kill()
+                except ProcessLookupError:
+                    pass
+            self._fail_pending()
+
+    def _resolve(self, error: bool, lines: list[str]) -> None:
+        if not self._pending:
+            return
+        future = self._pending.popleft()
+        if future.done():
+            # タイムアウト済みのコマンドの応答
+            return
+        if error:
+            future.set_result((1, "", "\n".join(lines)))
+        else:
+            future.set_result((0, "".join(line + "\n" for line in lines), ""))
+
+    def _fail_pending(self) -> None:
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(ConnectionError("tmux control client disconnected"))
+
+
+class TmuxControl:
+    """セッションごとの tmux -C クライアントを管理する
+
+    %output 通知はアタッチしたセッションの分しか届かないため、監視対象の
+    セッションごとに1クライアントを保持し、切断されたら定期的に再接続する。
+    コマンドは接続中のいずれかのクライアントで実行する（対象はセッションを問わない）。
+    """
+
+    def __init__(
+        self,
+        sessions: Iterable[str],
+        on_output: Optional[Callable[[str], None]] = None,
+        on_connect: Optional[Callable[[], None]] = None,
+        on_notification: Optional[Callable[[str, str], None]] = None,
+        subscriptions: Optional[dict[str, tuple[str, str]]] = None,
+    ):
+        self.on_output = on_output
+        self.on_notification = on_notification
+        self.subscriptions = subscriptions
+        self.clients = {session: self._new_client(session) for session in sessions}
+        self.on_connect = on_connect
+        self._task: Optional[asyncio.Task] = None
+
+    def _new_client(self, session: str) -> TmuxControlClient:
+        return TmuxControlClient(session, self.on_output, self.on_notification, self.subscriptions)
+
+    async def set_sessions(self, sessions: Iterable[str]) -> None:
+        """監視するセッションを差し替える（新しいセッションには次の再接続周期で接続する）"""
+        sessions = list(sessions)
+        for session in list(self.clients):
+            if session not in sessions:
+                await self.clients.pop(session).close()
+        for session in sessions:
+            if session not in self.clients:
+                self.clients[session] = self._new_client(session)
+        if self._task is not None:
+            # 再接続ループを起こし直してすぐに接続する
+            self._task.cancel()
+            self._task = None
+            self.start()
+
+    def start(self) -> None:
+        """接続と再接続のバックグラウンドタスクを開始する"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for client in self.clients.values():
+            await client.close()
+
+    @property
+    def connected(self) -> bool:
+        return any(client.connected for client in self.clients.values())
+
+    def watching(self, target: str) -> bool:
+        """ペインターゲットの変化が %output で通知される状態か"""
+        client = self.clients.get(target.split(":", 1)[0])
+        return client is not None and client.connected
+
+    async def command(self, *args: str, timeout: float) -> tuple[int, str, str]:
+        """接続中のクライアントで tmux コマンドを実行する（TmuxControlClient.command と同じ）"""
+        for client in self.clients.values():
+            if client.connected:
+                return await client.command(*args, timeout=timeout)
+        raise ConnectionError("no tmux control client is connected")
+
+    async def _run(self) -> None:
+        while True:
+            connected = False
+            for client in self.clients.values():
+                if client.connected:
+                    continue
+                await client.close()
+                try:
+                    await client.start()
+                except OSError:
+                    continue
+                # アタッチ直後に切断される（セッションが無い等）場合を除く
+                await asyncio.sleep(0.1)
+                connected = connected or client.connected
+            if connected and self.on_connect is not None:
+                self.on_connect()
+            await asyncio.sleep(CONTROL_RECONNECT_INTERVAL)
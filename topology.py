@@ -0,0 +1,168 @@
+"""エージェント構成（将軍・家老・足軽と tmux ペインの対応）"""
+import asyncio
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import yaml
+
+from panes import run_tmux
+
+# capture-pane で取得する行数（ペインごとの開始行は負の値）
+SHOGUN_CAPTURE_LINES = 100
+AGENT_CAPTURE_LINES = 50
+
+# tmux から構成を探すときに読むペインオプション（shutsujin_departure.sh が設定する）
+DISCOVERY_FORMAT = "#{session_name}:#{window_index}.#{pane_index}\t#{@agent_id}"
+
+ASHIGARU_ID_PATTERN = re.compile(r"^ashigaru(\d+)$")
+
+# 足軽IDはストリームのトピック名にもなるため、既存のトピック名とは重複させない
+RESERVED_IDS = {"shogun", "karo", "dashboard", "dashboard_diff", "ashigaru_status"}
+
+
+@dataclass
+class Agent:
+    """1エージェント分の設定"""
+    id: str
+    role: str
+    target: str
+    num: int = 0
+
+
+@dataclass
+class Topology:
+    """将軍・家老と任意の数の足軽"""
+    shogun: Agent
+    karo: Agent
+    ashigaru: list[Agent] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.ashigaru_by_id = {agent.id: agent for agent in self.ashigaru}
+
+    def agents(self) -> list[Agent]:
+        return [self.shogun, self.karo, *self.ashigaru]
+
+    def capture_targets(self) -> dict[str, int]:
+        """ペインターゲット → capture-pane の開始行（PaneSampler に渡す形）"""
+        targets = {agent.target: -AGENT_CAPTURE_LINES for agent in self.agents()}
+        targets[self.shogun.target] = -SHOGUN_CAPTURE_LINES
+        return targets
+
+    def sessions(self) -> list[str]:
+        """ペインのある tmux セッション名"""
+        return sorted({agent.target.split(":", 1)[0] for agent in self.agents()})
+
+
+def default_topology() -> Topology:
+    """shutsujin_departure.sh が作る標準構成（足軽8体）"""
+    return Topology(
+        shogun=Agent("shogun", "shogun", "shogun:0.0"),
+        karo=Agent("karo", "karo", "multiagent:0.0"),
+        ashigaru=[
+            Agent(f"ashigaru{i}", "ashigaru", f"multiagent:agents.{i}", i)
+            for i in range(1, 9)
+        ],
+    )
+
+
+def load_topology(filepath: str) -> Topology:
+    """YAML から構成を読み込む
+
+    例:
+        shogun: shogun:0.0
+        karo: multiagent:0.0
+        ashigaru:
+          - multiagent:agents.1              # 文字列なら ashigaru{順番} になる
+          - {id: ashigaru9, target: fleet2:agents.1}
+
+    省略した項目は標準構成の値を使う。
+
+    Raises:
+        ValueError: 内容が不正な場合
+    """
+    try:
+        raw = yaml.safe_load(Path(filepath).read_text(encoding="utf-8")) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise ValueError(f"Failed to load topology {filepath}: {e}")
+    if not isinstance(raw, dict):
+        raise ValueError(f"Invalid topology {filepath}: top level must be a mapping")
+
+    default = default_topology()
+    shogun = Agent("shogun", "shogun", str(raw.get("shogun", default.shogun.target)))
+    karo = Agent("karo", "karo", str(raw.get("karo", default.karo.target)))
+
+    entries = raw.get("ashigaru")
+    if entries is None:
+        return Topology(shogun, karo, default.ashigaru)
+    if not isinstance(entries, list):
+        raise ValueError(f"Invalid topology {filepath}: ashigaru must be a list")
+
+    ashigaru = []
+    for index, entry in enumerate(entries, start=1):
+        ashigaru.append(_ashigaru_from_entry(entry, index, filepath))
+    _check_unique(ashigaru, filepath)
+    return Topology(shogun, karo, ashigaru)
+
+
+def _ashigaru_from_entry(entry: Any, index: int, filepath: str) -> Agent:
+    if isinstance(entry, str):
+        entry = {"target": entry}
+    if not isinstance(entry, dict) or not entry.get("target"):
+        raise ValueError(f"Invalid topology {filepath}: ashigaru #{index} needs a target")
+
+    agent_id = str(entry.get("id", f"ashigaru{index}"))
+    match = ASHIGARU_ID_PATTERN.match(agent_id)
+    num = entry.get("num", match.group(1) if match else index)
+    try:
+        num = int(num)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid topology {filepath}: ashigaru #{index} has invalid num {num!r}")
+    return Agent(agent_id, "ashigaru", str(entry["target"]), num)
+
+
+def _check_unique(ashigaru: list[Agent], filepath: str) -> None:
+    seen = set()
+    for agent in ashigaru:
+        if agent.id in RESERVED_IDS:
+            raise ValueError(f"Invalid topology {filepath}: reserved ashigaru id {agent.id}")
+        if agent.id in seen:
+            raise ValueError(f"Invalid topology {filepath}: duplicate ashigaru id {agent.id}")
+        seen.add(agent.id)
+
+
+async def discover_topology() -> Optional[Topology]:
+    """tmux の全ペインの @agent_id から構成を組み立てる
+
+    @agent_id が "shogun" / "karo" / "ashigaru{N}" のペインを拾う。足軽は番号順に並べる。
+    将軍・家老が見つからない場合は標準構成のペインを使う。
+
+    Returns:
+        足軽が1体も見つからなければ None
+    """
+    try:
+        returncode, stdout, _ = await run_tmux("list-panes", "-a", "-F", DISCOVERY_FORMAT)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    if returncode != 0:
+        return None
+
+    default = default_topology()
+    shogun, karo = default.shogun, default.karo
+    ashigaru = {}
+    for line in stdout.splitlines():
+        target, _, agent_id = line.partition("\t")
+        agent_id = agent_id.strip()
+        if agent_id == "shogun":
+            shogun = Agent("shogun", "shogun", target)
+        elif agent_id == "karo":
+            karo = Agent("karo", "karo", target)
+        else:
+            match = ASHIGARU_ID_PATTERN.match(agent_id)
+            if match and agent_id not in ashigaru:
+                ashigaru[agent_id] = Agent(agent_id, "ashigaru", target, int(match.group(1)))
+
+    if not ashigaru:
+        return None
+    return Topology(shogun, karo, sorted(ashigaru.values(), key=lambda agent: agent.num))